@@ -1,3 +1,31 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ApiToken, SavedSearch, SavedSearchChange, SavedSearchSnapshot
+
+
+@admin.register(SavedSearch)
+class SavedSearchAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "active", "max_pages", "refresh_count", "last_refreshed_at")
+    list_filter = ("active",)
+
+
+@admin.register(SavedSearchSnapshot)
+class SavedSearchSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "saved_search", "created_at", "total_entries", "pages_fetched")
+    exclude = ("pages",)
+
+
+@admin.register(SavedSearchChange)
+class SavedSearchChangeAdmin(admin.ModelAdmin):
+    list_display = ("id", "saved_search", "organization_id", "kind", "created_at")
+    list_filter = ("kind",)
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "prefix", "created_at", "expires_at", "last_used_at", "revoked_at")
+    # Tokens are created with `manage.py api_tokens create` (the plaintext is only shown there)
+    readonly_fields = ("prefix", "token_hash", "last_used_at")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,95 @@
+"""
+API tokens for scripted clients: `Authorization: Bearer <token>` on /api/* instead of the
+login-form session dance (GET /login/, scrape the CSRF token, POST credentials, send
+X-CSRFToken on every call). See config/middleware.py.
+
+Tokens are random (secrets.token_urlsafe) and shown once, at creation; the database keeps only
+their SHA-256, which is enough for high-entropy secrets and cheap to check. Verified hashes are
+cached in process memory for API_TOKEN_CACHE_TTL seconds (unknown ones for a few seconds), so
+a warm instance checks a token without a query. Revoking clears the local cache at once; other
+instances notice within the TTL.
+
+    python manage.py api_tokens create "nightly export"
+    python manage.py api_tokens list
+    python manage.py api_tokens revoke <prefix>
+"""
+
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+from django.utils import timezone
+
+from .models import ApiToken
+
+logger = logging.getLogger(__name__)
+
+API_TOKEN_CACHE_TTL = float(os.getenv("API_TOKEN_CACHE_TTL", "60"))
+# Unknown / revoked tokens: short, so a newly created token works almost at once everywhere
+API_TOKEN_NEGATIVE_TTL = float(os.getenv("API_TOKEN_NEGATIVE_TTL", "5"))
+TOKEN_PREFIX = "ari_"
+# Bounds memory when clients send lots of unknown tokens
+MAX_CACHED = 10000
+
+# token hash -> (token id or None, monotonic expiry)
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def create_token(name: str, expires_at=None) -> tuple:
+    """(ApiToken, plaintext token); the plaintext is not stored anywhere."""
+    token = TOKEN_PREFIX + secrets.token_urlsafe(32)
+    api_token = ApiToken.objects.create(
+        name=name,
+        prefix=token[: len(TOKEN_PREFIX) + 6],
+        token_hash=hash_token(token),
+        expires_at=expires_at,
+    )
+    return api_token, token
+
+
+def revoke_tokens(tokens) -> int:
+    """Revoke the given ApiToken queryset; returns how many were still active."""
+    count = tokens.filter(revoked_at__isnull=True).update(revoked_at=timezone.now())
+    clear_cache()
+    return count
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def verify_token(token: str) -> Optional[int]:
+    """ID of the active ApiToken for this plaintext token, else None."""
+    if not token.startswith(TOKEN_PREFIX):
+        return None
+    digest = hash_token(token)
+    now = time.monotonic()
+    with _cache_lock:
+        entry = _cache.get(digest)
+    if entry is not None and entry[1] > now:
+        return entry[0]
+
+    api_token = ApiToken.objects.filter(token_hash=digest, revoked_at__isnull=True).first()
+    token_id = None
+    if api_token is not None and (api_token.expires_at is None or api_token.expires_at > timezone.now()):
+        token_id = api_token.id
+        # Once per cache period, not per request
+        ApiToken.objects.filter(id=token_id).update(last_used_at=timezone.now())
+    ttl = API_TOKEN_CACHE_TTL if token_id is not None else API_TOKEN_NEGATIVE_TTL
+    if api_token is not None and api_token.expires_at is not None and token_id is not None:
+        ttl = min(ttl, max(0.0, (api_token.expires_at - timezone.now()).total_seconds()))
+    with _cache_lock:
+        if len(_cache) >= MAX_CACHED:
+            _cache.clear()
+        _cache[digest] = (token_id, now + ttl)
+    return token_id
@@ -1,24 +1,123 @@
+import hashlib
 import json
 import logging
 import os
+import threading
 import time
 from typing import Optional
 
 import requests
+from django.core.cache import cache
 
-APOLLO_COMPANY_SEARCH_URL = "https://api.apollo.io/api/v1/mixed_companies/search"
+from config.log_utils import KeyValues, LazyJson
+from config.metrics import counter, histogram
+from config.timing import phase, record, timed
+
+from .circuit_breaker import CircuitOpenError, get_breaker
+from .deadline import MIN_CALL_SECONDS, DeadlineExceeded, clamp_timeout, remaining_time
+from .key_pool import ApiKeysExhausted, get_key_pool
+from .recording import record_fixture
+from .scheduler import (
+    BULK,
+    INTERACTIVE_RATE_RESERVE,
+    QUEUE_TIMEOUTS,
+    SchedulerRejected,
+    current_priority,
+    get_scheduler,
+)
+
+# Base URLs. Point both at a local stand-in (manage.py fake_apollo) for offline testing.
+APOLLO_API_BASE_URL = os.getenv(
+    "APOLLO_API_BASE_URL", "https://api.apollo.io/api/v1"
+).rstrip("/")
+APOLLO_APP_BASE_URL = os.getenv(
+    "APOLLO_APP_BASE_URL", "https://app.apollo.io/api/v1"
+).rstrip("/")
+
+APOLLO_COMPANY_SEARCH_URL = APOLLO_API_BASE_URL + "/mixed_companies/search"
 # mixed_people/search is deprecated and can return 422; api_search is the supported endpoint.
-APOLLO_PEOPLE_SEARCH_URL = "https://api.apollo.io/api/v1/mixed_people/api_search"
-APOLLO_PEOPLE_BULK_ENRICH_URL = "https://api.apollo.io/api/v1/people/bulk_match"
+APOLLO_PEOPLE_SEARCH_URL = APOLLO_API_BASE_URL + "/mixed_people/api_search"
+APOLLO_PEOPLE_BULK_ENRICH_URL = APOLLO_API_BASE_URL + "/people/bulk_match"
 # Undocumented: used to fetch industry/tag IDs for filters (e.g. industry_tags).
-APOLLO_TAGS_SEARCH_URL = "https://app.apollo.io/api/v1/tags/search"
+APOLLO_TAGS_SEARCH_URL = APOLLO_APP_BASE_URL + "/tags/search"
+
+# Apollo credits (estimated) – logged per API request, used by the planner (planner.py)
+CREDITS_COMPANY_SEARCH = 1
+CREDITS_PEOPLE_SEARCH = 1
+CREDITS_TAGS_SEARCH = 0
+CREDITS_ENRICH_PER_PERSON = 1  # bulk_match: ~1 credit per contact
+# bulk_match takes up to this many people per call
+ENRICH_BATCH_SIZE = 10
 
 # Timeout in seconds (Apollo can be slow on large result sets). Override via APOLLO_REQUEST_TIMEOUT.
 DEFAULT_TIMEOUT = int(os.getenv("APOLLO_REQUEST_TIMEOUT", "120"))
 MAX_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 2
+# tags/search and bulk_match are quick calls
+SHORT_TIMEOUT = 30
+
+# Short endpoint names (circuit breakers, status API)
+ENDPOINT_NAMES = {
+    APOLLO_COMPANY_SEARCH_URL: "mixed_companies/search",
+    APOLLO_PEOPLE_SEARCH_URL: "mixed_people/api_search",
+    APOLLO_PEOPLE_BULK_ENRICH_URL: "people/bulk_match",
+    APOLLO_TAGS_SEARCH_URL: "tags/search",
+}
+
+# Connections kept open per host by the shared HTTP session (>= concurrent Apollo calls per process)
+HTTP_POOL_SIZE = int(os.getenv("APOLLO_HTTP_POOL_SIZE", "16"))
+
+# Last good search responses, served (marked "_stale") while an endpoint's circuit is open.
+STALE_CACHE_TTL = int(os.getenv("APOLLO_STALE_CACHE_TTL", "86400"))
 
 logger = logging.getLogger(__name__)
 
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide session for Apollo calls: keeps TCP/TLS connections open between requests."""
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=4, pool_maxsize=HTTP_POOL_SIZE
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+
+APOLLO_REQUESTS = counter(
+    "apollo_requests_total",
+    "Apollo HTTP calls by endpoint and status (HTTP code, or timeout / error without a response)",
+    ["endpoint", "status"],
+)
+APOLLO_LATENCY = histogram(
+    "apollo_request_duration_seconds", "Apollo HTTP call latency", ["endpoint"]
+)
+APOLLO_QUEUE_WAIT = histogram(
+    "apollo_queue_wait_seconds",
+    "Wait for an Apollo scheduler slot",
+    ["priority"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 120.0),
+)
+APOLLO_ENRICH_BATCH_SIZE = histogram(
+    "apollo_enrich_batch_size",
+    "People ids per bulk_match call",
+    buckets=(1, 2, 5, 8, 10),
+)
+APOLLO_ENRICH_MATCHES = counter(
+    "apollo_enrich_matches_total", "People returned by bulk_match"
+)
+CACHE_REQUESTS = counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit / miss)", ["cache", "result"]
+)
+
 
 def _mask_api_key(key: str) -> str:
     """Mask API key for logging (show last 4 chars only)."""
@@ -33,92 +132,216 @@ def _log_apollo_request(
     query_params: Optional[dict] = None,
     req_body: Optional[dict] = None,
 ):
-    """Log Apollo API call: endpoint, headers (key masked), query params, body."""
+    """
+    Debug-log an Apollo call: endpoint, headers (key masked), query params, body.
+    Skipped entirely unless DEBUG is on for this logger; the JSON (long id lists truncated)
+    is only built when the background log handler writes the record.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
     log_headers = dict(headers)
     if "X-Api-Key" in log_headers:
         log_headers["X-Api-Key"] = _mask_api_key(log_headers["X-Api-Key"])
-    lines = [
-        "-------- Apollo API request --------",
-        "Endpoint: %s" % endpoint,
-        "Headers: %s" % json.dumps(log_headers, sort_keys=True),
-    ]
-    if query_params:
-        lines.append("Query params: %s" % json.dumps(query_params, sort_keys=True))
-    if req_body is not None:
-        lines.append("Request body: %s" % json.dumps(req_body, sort_keys=True, default=str))
-    lines.append("--------------------------------")
-    msg = "\n".join(lines)
-    logger.info(msg)
-    print(msg)
+    logger.debug(
+        "Apollo request %s headers=%s params=%s body=%s",
+        ENDPOINT_NAMES.get(endpoint, endpoint),
+        LazyJson(log_headers),
+        LazyJson(query_params),
+        LazyJson(req_body),
+    )
 
 
-def _log_apollo_response(endpoint: str, data: dict, extra: Optional[dict] = None):
-    """Log Apollo API response counts: companies, people, tags, or bulk_match."""
-    lines = ["-------- Apollo API response --------"]
-    if "mixed_companies" in endpoint or "mixed_companies/search" in endpoint:
+def _response_summary(endpoint: str, data: dict) -> tuple:
+    """(endpoint name, counts) for an Apollo response: companies, people, tags, or bulk_match."""
+    if "mixed_companies" in endpoint:
         orgs = data.get("organizations") or data.get("accounts") or []
         total = (data.get("pagination") or {}).get("total_entries") or len(orgs)
-        lines.append("Endpoint: mixed_companies/search")
-        lines.append("Companies in this page: %s" % len(orgs))
-        lines.append("Total entries (pagination): %s" % total)
-    elif "mixed_people" in endpoint or "api_search" in endpoint:
+        return "mixed_companies/search", {"companies": len(orgs), "total_entries": total}
+    if "mixed_people" in endpoint or "api_search" in endpoint:
         people = data.get("people") or []
         pag = data.get("pagination") or {}
         total = pag.get("total_entries") or pag.get("total_count") or data.get("total_entries") or data.get("total_count") or len(people)
-        lines.append("Endpoint: mixed_people/api_search")
-        lines.append("People in this page: %s" % len(people))
-        lines.append("Total entries (pagination): %s" % total)
-    elif "bulk_match" in endpoint or "people/bulk" in endpoint:
-        matches = data.get("matches") or []
-        lines.append("Endpoint: people/bulk_match")
-        lines.append("Enriched count: %s" % len(matches))
-    elif "tags" in endpoint:
-        tags = data.get("tags") or []
-        lines.append("Endpoint: tags/search")
-        lines.append("Tags count: %s" % len(tags))
-    else:
-        lines.append("Endpoint: %s" % endpoint)
-        lines.append("Response keys: %s" % list(data.keys())[:10])
+        return "mixed_people/api_search", {"people": len(people), "total_entries": total}
+    if "bulk_match" in endpoint or "people/bulk" in endpoint:
+        return "people/bulk_match", {"enriched": len(data.get("matches") or [])}
+    if "tags" in endpoint:
+        return "tags/search", {"tags": len(data.get("tags") or [])}
+    return endpoint, {"keys": list(data.keys())[:10]}
+
+
+def _log_apollo_response(endpoint: str, data: dict, extra: Optional[dict] = None):
+    """Log Apollo API response counts (one line): companies, people, tags, or bulk_match."""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    name, summary = _response_summary(endpoint, data)
     if extra:
-        for k, v in extra.items():
-            lines.append("%s: %s" % (k, v))
-    lines.append("--------------------------------")
-    msg = "\n".join(lines)
-    logger.info(msg)
-    print(msg)
+        summary.update(extra)
+    logger.info(
+        "Apollo response %s %s", name, KeyValues(summary), extra={"apollo_endpoint": name, "apollo": summary}
+    )
 
 
 def _get_headers():
-    """Get headers for Apollo API requests."""
-    api_key = os.getenv("APOLLO_API_KEY")
-    if not api_key:
-        raise RuntimeError("Missing APOLLO_API_KEY in environment")
+    """
+    Get headers for Apollo API requests. The X-Api-Key is filled in per attempt by
+    _post_with_retry from the key pool (APOLLO_API_KEYS, or APOLLO_API_KEY).
+    """
+    if not len(get_key_pool()):
+        raise RuntimeError("Missing APOLLO_API_KEY (or APOLLO_API_KEYS) in environment")
     return {
         "Content-Type": "application/json",
         "Cache-Control": "no-cache",
-        "X-Api-Key": api_key,
     }
 
 
+def _acquire_key(pool, tried_keys: tuple):
+    """
+    Pool key for one attempt. Bulk calls leave INTERACTIVE_RATE_RESERVE of each key's
+    per-minute budget to interactive calls, waiting (within the deadline and the bulk
+    queue timeout) for budget to free up.
+    """
+    if current_priority() != BULK:
+        return pool.acquire(exclude=tried_keys)
+    give_up_at = time.monotonic() + QUEUE_TIMEOUTS[BULK]
+    while True:
+        try:
+            return pool.acquire(exclude=tried_keys, reserve=INTERACTIVE_RATE_RESERVE)
+        except ApiKeysExhausted as e:
+            wait = min(e.retry_after, 5.0)
+            left = remaining_time()
+            if time.monotonic() + wait > give_up_at or (
+                left is not None and left - wait < MIN_CALL_SECONDS
+            ):
+                raise
+            time.sleep(wait)
+
+
 def _post_with_retry(
-    url: str, json: dict, headers: dict, timeout: int = DEFAULT_TIMEOUT
+    url: str,
+    json: dict,
+    headers: dict,
+    timeout: int = DEFAULT_TIMEOUT,
+    params: Optional[dict] = None,
+    retries: int = MAX_RETRIES,
 ) -> requests.Response:
-    """POST with retries on read/connect timeout."""
+    """
+    POST with retries on read/connect timeout. Each attempt (and the sleep before a retry)
+    is capped to the remaining request deadline, if one is set. Goes through the endpoint's
+    circuit breaker: raises CircuitOpenError without calling Apollo while it is open.
+    Each attempt uses the pool key with the most budget left; on 429/403 the key is rested
+    and the call is repeated with another key (ApiKeysExhausted when none is left).
+    The HTTP call itself holds a scheduler slot for the current priority class.
+    Slot waits and HTTP calls are timed as the `apollo-queue` / `apollo` request phases.
+    """
+    breaker = get_breaker(ENDPOINT_NAMES.get(url, url))
+    pool = get_key_pool()
+    scheduler = get_scheduler()
+    tried_keys = ()
     last_error = None
-    for attempt in range(MAX_RETRIES + 1):
+    attempt = 0
+    while True:
+        clamp_timeout(timeout)  # fail fast before queueing when the budget is spent
+        breaker.before_call()
+        key = None
         try:
-            r = requests.post(url, json=json, headers=headers, timeout=timeout)
-            return r
-        except (
-            requests.exceptions.ReadTimeout,
-            requests.exceptions.ConnectTimeout,
-        ) as e:
+            key = _acquire_key(pool, tried_keys)
+            queued = time.monotonic()
+            with scheduler.slot():
+                started = time.monotonic()
+                record("apollo-queue", started - queued)
+                APOLLO_QUEUE_WAIT.observe(started - queued, priority=current_priority())
+                with phase("apollo"):
+                    r = get_http_session().post(
+                        url,
+                        json=json,
+                        params=params,
+                        headers={**headers, "X-Api-Key": key.key},
+                        timeout=clamp_timeout(timeout),
+                    )
+        except (ApiKeysExhausted, SchedulerRejected, DeadlineExceeded):
+            # Raised before the request went out: the key's reserved call wasn't used
+            breaker.cancel_call()
+            if key is not None:
+                pool.release(key)
+            raise
+        except requests.exceptions.RequestException as e:
+            elapsed = time.monotonic() - started
+            breaker.record_failure(elapsed, e)
+            is_timeout = isinstance(
+                e, (requests.exceptions.ReadTimeout, requests.exceptions.ConnectTimeout)
+            )
+            APOLLO_REQUESTS.inc(endpoint=breaker.name, status="timeout" if is_timeout else "error")
+            APOLLO_LATENCY.observe(elapsed, endpoint=breaker.name)
+            if not is_timeout:
+                raise
             last_error = e
-            if attempt < MAX_RETRIES:
-                time.sleep(2)
-            else:
+            if attempt >= retries:
                 raise last_error
-    raise last_error
+            attempt += 1
+            left = remaining_time()
+            if left is not None and left <= RETRY_BACKOFF_SECONDS:
+                raise DeadlineExceeded(
+                    "Request time budget exhausted after %s attempt(s)" % attempt
+                ) from e
+            time.sleep(RETRY_BACKOFF_SECONDS)
+            continue
+        except BaseException:
+            # Anything else: no outcome to record, but free a half-open probe slot
+            breaker.cancel_call()
+            raise
+        elapsed = time.monotonic() - started
+        APOLLO_REQUESTS.inc(endpoint=breaker.name, status=str(r.status_code))
+        APOLLO_LATENCY.observe(elapsed, endpoint=breaker.name)
+        pool.report(key, r.status_code, r.headers)
+        if r.status_code >= 500:
+            breaker.record_failure(elapsed, "HTTP %s" % r.status_code)
+        else:
+            breaker.record_success(elapsed)
+        if r.status_code in (429, 403) and len(tried_keys) + 1 < len(pool):
+            logger.warning(
+                "Apollo %s returned %s for key %s, switching key",
+                ENDPOINT_NAMES.get(url, url),
+                r.status_code,
+                _mask_api_key(key.key),
+            )
+            tried_keys += (key.key,)
+            continue
+        return r
+
+
+def _stale_cache_key(url: str, body: Optional[dict], params: Optional[dict] = None) -> str:
+    raw = json.dumps([url, body, params], sort_keys=True, default=str)
+    return "apollo:stale:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _remember_response(url: str, body: Optional[dict], params: Optional[dict], data: dict):
+    """Keep a good response so it can be served stale during an outage."""
+    try:
+        cache.set(_stale_cache_key(url, body, params), data, STALE_CACHE_TTL)
+    except Exception:
+        logger.warning("Apollo stale cache write failed for %s", url, exc_info=True)
+
+
+def cached_response(url: str, body: Optional[dict], params: Optional[dict] = None) -> Optional[dict]:
+    """Last good response for this exact request, or None (read-only; for planning)."""
+    try:
+        return cache.get(_stale_cache_key(url, body, params))
+    except Exception:
+        return None
+
+
+def _stale_response(url: str, body: Optional[dict], params: Optional[dict], error: Exception) -> dict:
+    """Last good response for this exact request, marked `_stale`; re-raise `error` if none."""
+    try:
+        data = cache.get(_stale_cache_key(url, body, params))
+    except Exception:
+        data = None
+    CACHE_REQUESTS.inc(cache="apollo_stale", result="miss" if data is None else "hit")
+    if data is None:
+        raise error
+    logger.warning("Apollo %s unavailable, serving stale response", ENDPOINT_NAMES.get(url, url))
+    data["_stale"] = True
+    return data
 
 
 def search_tags(q_tag_fuzzy_name: str) -> dict:
@@ -135,16 +358,22 @@ def search_tags(q_tag_fuzzy_name: str) -> dict:
         query_params=params,
         req_body={},
     )
-    r = requests.post(
-        APOLLO_TAGS_SEARCH_URL,
-        json={},
-        params=params,
-        headers=headers,
-        timeout=30,
-    )
+    try:
+        r = _post_with_retry(
+            APOLLO_TAGS_SEARCH_URL,
+            {},
+            headers,
+            timeout=SHORT_TIMEOUT,
+            params=params,
+            retries=0,
+        )
+    except CircuitOpenError as e:
+        return _stale_response(APOLLO_TAGS_SEARCH_URL, {}, params, e)
     r.raise_for_status()
     data = r.json()
     _log_apollo_response(APOLLO_TAGS_SEARCH_URL, data)
+    record_fixture(ENDPOINT_NAMES[APOLLO_TAGS_SEARCH_URL], {}, params, r.status_code, data)
+    _remember_response(APOLLO_TAGS_SEARCH_URL, {}, params, data)
     return data
 
 
@@ -152,7 +381,10 @@ def search_companies(payload: dict) -> dict:
     """Search for companies using Apollo API. Consumes Apollo credits."""
     headers = _get_headers()
     _log_apollo_request(APOLLO_COMPANY_SEARCH_URL, headers, req_body=payload)
-    r = _post_with_retry(APOLLO_COMPANY_SEARCH_URL, payload, headers)
+    try:
+        r = _post_with_retry(APOLLO_COMPANY_SEARCH_URL, payload, headers)
+    except CircuitOpenError as e:
+        return _stale_response(APOLLO_COMPANY_SEARCH_URL, payload, None, e)
     if r.status_code == 422:
         try:
             err_body = r.json()
@@ -164,6 +396,8 @@ def search_companies(payload: dict) -> dict:
     r.raise_for_status()
     data = r.json()
     _log_apollo_response(APOLLO_COMPANY_SEARCH_URL, data)
+    record_fixture(ENDPOINT_NAMES[APOLLO_COMPANY_SEARCH_URL], payload, None, r.status_code, data)
+    _remember_response(APOLLO_COMPANY_SEARCH_URL, payload, None, data)
     return data
 
 
@@ -171,13 +405,19 @@ def search_people(payload: dict) -> dict:
     """Search for people/contacts using Apollo API. Consumes Apollo credits."""
     headers = _get_headers()
     _log_apollo_request(APOLLO_PEOPLE_SEARCH_URL, headers, req_body=payload)
-    r = _post_with_retry(APOLLO_PEOPLE_SEARCH_URL, payload, headers)
+    try:
+        r = _post_with_retry(APOLLO_PEOPLE_SEARCH_URL, payload, headers)
+    except CircuitOpenError as e:
+        return _stale_response(APOLLO_PEOPLE_SEARCH_URL, payload, None, e)
     r.raise_for_status()
     data = r.json()
     _log_apollo_response(APOLLO_PEOPLE_SEARCH_URL, data)
+    record_fixture(ENDPOINT_NAMES[APOLLO_PEOPLE_SEARCH_URL], payload, None, r.status_code, data)
+    _remember_response(APOLLO_PEOPLE_SEARCH_URL, payload, None, data)
     return data
 
 
+@timed("enrich")
 def enrich_people_bulk(
     person_ids: list[str],
     reveal_personal_emails: bool = False,
@@ -185,7 +425,8 @@ def enrich_people_bulk(
 ) -> dict[str, dict]:
     """
     Enrich up to 10 people at a time via bulk_match. Returns dict of person_id -> enriched person (email, linkedin_url, etc.).
-    Consumes credits. Skips empty ids; batches of 10.
+    Consumes credits. Skips empty ids; batches of 10. If the request deadline runs out,
+    returns what was enriched so far.
     """
     if not person_ids:
         return {}
@@ -193,14 +434,15 @@ def enrich_people_bulk(
     if not ids_clean:
         return {}
     result_by_id = {}
-    for i in range(0, len(ids_clean), 10):
-        batch = ids_clean[i : i + 10]
+    for i in range(0, len(ids_clean), ENRICH_BATCH_SIZE):
+        batch = ids_clean[i : i + ENRICH_BATCH_SIZE]
         payload = {"details": [{"id": pid} for pid in batch]}
         params = {
             "reveal_personal_emails": str(reveal_personal_emails).lower(),
             "reveal_phone_number": str(reveal_phone_number).lower(),
         }
         headers = _get_headers()
+        APOLLO_ENRICH_BATCH_SIZE.observe(len(batch))
         _log_apollo_request(
             APOLLO_PEOPLE_BULK_ENRICH_URL,
             headers,
@@ -208,20 +450,40 @@ def enrich_people_bulk(
             req_body=payload,
         )
         try:
-            r = requests.post(
+            r = _post_with_retry(
                 APOLLO_PEOPLE_BULK_ENRICH_URL,
-                json=payload,
+                payload,
+                headers,
+                timeout=SHORT_TIMEOUT,
                 params=params,
-                headers=headers,
-                timeout=30,
+                retries=0,
             )
             r.raise_for_status()
             data = r.json()
             _log_apollo_response(APOLLO_PEOPLE_BULK_ENRICH_URL, data)
-            for match in data.get("matches") or []:
+            record_fixture(
+                ENDPOINT_NAMES[APOLLO_PEOPLE_BULK_ENRICH_URL],
+                payload,
+                params,
+                r.status_code,
+                data,
+            )
+            matches = data.get("matches") or []
+            APOLLO_ENRICH_MATCHES.inc(len(matches))
+            for match in matches:
                 pid = match.get("id")
                 if pid is not None:
                     result_by_id[str(pid)] = match
+        except DeadlineExceeded:
+            logger.warning(
+                "bulk_match: deadline reached, %s of %s ids enriched",
+                len(result_by_id),
+                len(ids_clean),
+            )
+            break
+        except CircuitOpenError as e:
+            logger.warning("bulk_match: %s", e)
+            break
         except Exception:
             # Don't fail the whole flow if enrichment fails for a batch
             pass
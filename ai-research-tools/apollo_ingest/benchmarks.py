@@ -0,0 +1,207 @@
+"""
+Microbenchmarks for the pure per-request functions in apollo_ingest.views.
+
+Each benchmark builds a synthetic Apollo-shaped input of a given size with the fake_apollo
+builders (so the shapes match what the API really returns), then measures:
+
+- time per call: best and median of several timed rounds (timeit)
+- allocations per call: peak bytes allocated during one call, and allocated blocks (tracemalloc)
+
+Run with `python manage.py bench_hotpaths`; results are compared with a saved baseline and the
+command fails when a tracked function regresses past the threshold.
+"""
+
+import gc
+import statistics
+import timeit
+import tracemalloc
+
+from . import views
+from .fake_apollo import _object_id, fake_match, fake_organization, fake_person
+
+SIZES = (25, 100, 1000, 10000)
+
+
+def _organizations(size: int) -> list:
+    return [fake_organization(_object_id("bench-org", i)) for i in range(size)]
+
+
+def _people(size: int) -> list:
+    org = fake_organization(_object_id("bench-org", 0))
+    people = []
+    for i in range(size):
+        person = fake_person(_object_id("bench-person", i), org)
+        # api_search often carries the full name / location for revealed contacts
+        if i % 2:
+            person["name"] = "%s Person%d" % (person["first_name"], i)
+            person["city"] = "Austin"
+            person["country"] = "United States"
+        people.append(person)
+    return people
+
+
+def _id_list(prefix: str, size: int) -> list:
+    return [_object_id(prefix, i) for i in range(size)]
+
+
+def case_normalize_companies(size: int):
+    accounts = _organizations(size)
+    return views.normalize_companies, (accounts,)
+
+
+def case_normalize_people(size: int):
+    people = _people(size)
+    return views.normalize_people, (people,)
+
+
+def case_build_apollo_payload(size: int):
+    """Company search form with `size` entries spread over the list-valued filters."""
+    domains = ["company%d.com" % i for i in range(size)]
+    data = {
+        "page": "2",
+        "per_page": "100",
+        "company_name": "  Acme  ",
+        "domains": ", ".join(domains),
+        "locations_included": ["Pakistan", " United States ", "Germany"] * max(1, size // 30),
+        "locations_excluded": "india, china",
+        "employees_min": 11,
+        "employees_max": 500,
+        "revenue_min": 1,
+        "revenue_max": 50,
+        "organization_keyword": ",".join("keyword %d" % i for i in range(size // 4 or 1)),
+        "organization_job_titles": ["engineer", "sales manager"],
+        "organization_job_locations": "lahore, karachi",
+        "lookalike_organization_ids": _id_list("bench-lookalike", min(size, 100)),
+        "industries": _id_list("bench-industry", size // 4 or 1),
+        "industries_exclude": ",".join(_id_list("bench-industry-x", size // 10 or 1)),
+    }
+    return views.build_apollo_payload, (data,)
+
+
+def case_build_people_payload(size: int):
+    """People search for `size` organization ids plus title/seniority filters."""
+    data = {
+        "page": 1,
+        "per_page": 100,
+        "organization_ids": _id_list("bench-org", size),
+        "domains": ", ".join("company%d.com" % i for i in range(size // 4 or 1)),
+        "job_titles": [" CEO ", "VP Sales", "Head of Marketing", "", None] * max(1, size // 50),
+        "seniorities": ["c_suite", "vp", "owner", ""],
+    }
+    return views.build_people_payload, (data,)
+
+
+def case_merge_enriched_into_people(size: int):
+    """Merge bulk_match results into `size` normalized people (every person enriched)."""
+    people = views.normalize_people(_people(size))
+    enriched_by_id = {
+        str(p["id"]): fake_match(p["id"], reveal_phone_number=bool(i % 2))
+        for i, p in enumerate(people)
+    }
+    # Idempotent after the first call, so the same list can be reused across rounds
+    return views._merge_enriched_into_people, (people, enriched_by_id)
+
+
+def case_sanitize_filename(size: int):
+    """Sanitize the filenames of a `size`-company export."""
+    names = [
+        fake_organization(_object_id("bench-org", i))["name"] + (' / "Holdings": %d?' % i if i % 3 == 0 else "")
+        for i in range(size)
+    ]
+    names.append("x" * 300)
+    sanitize = views._sanitize_filename
+
+    def sanitize_all(names):
+        return [sanitize(n) for n in names]
+
+    return sanitize_all, (names,)
+
+
+BENCHMARKS = {
+    "normalize_companies": case_normalize_companies,
+    "normalize_people": case_normalize_people,
+    "build_apollo_payload": case_build_apollo_payload,
+    "build_people_payload": case_build_people_payload,
+    "_merge_enriched_into_people": case_merge_enriched_into_people,
+    "_sanitize_filename": case_sanitize_filename,
+}
+
+
+def _calls_per_round(func, args, min_seconds: float = 0.05) -> int:
+    """Calls per timed round so that a round lasts at least `min_seconds`."""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: func(*args), number=number)
+        if elapsed >= min_seconds or number >= 1_000_000:
+            return number
+        number *= 2 if elapsed > min_seconds / 10 else 10
+
+
+def measure_allocations(func, args) -> dict:
+    """Peak bytes and number of blocks allocated by one call."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        result = func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, "filename") if stat.count_diff > 0
+    )
+    return {"alloc_peak_bytes": max(0, peak - base), "alloc_blocks": blocks}
+
+
+def run_benchmark(name: str, size: int, rounds: int = 5) -> dict:
+    """Time and allocation stats for one function at one input size."""
+    func, args = BENCHMARKS[name](size)
+    func(*args)  # warm up (and settle in-place functions)
+    number = _calls_per_round(func, args)
+    gc.collect()
+    timings = [
+        t / number for t in timeit.repeat(lambda: func(*args), number=number, repeat=rounds)
+    ]
+    result = {
+        "name": name,
+        "size": size,
+        "calls_per_round": number,
+        "best_us": round(min(timings) * 1e6, 3),
+        "median_us": round(statistics.median(timings) * 1e6, 3),
+    }
+    result.update(measure_allocations(func, args))
+    return result
+
+
+def compare(results: list, baseline: dict, time_threshold: float, alloc_threshold: float) -> list:
+    """
+    Regressions of `results` against `baseline` ({"results": [...]} as written by the command).
+    Time compares best-of-rounds; allocations compare peak bytes. Returns a list of messages.
+    """
+    base = {(r["name"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        b = base.get((r["name"], r["size"]))
+        if not b:
+            continue
+        if b["best_us"] and r["best_us"] > b["best_us"] * (1 + time_threshold):
+            regressions.append(
+                "%s[%d] time %.1fus -> %.1fus (+%.0f%%)"
+                % (r["name"], r["size"], b["best_us"], r["best_us"], (r["best_us"] / b["best_us"] - 1) * 100)
+            )
+        if b["alloc_peak_bytes"] and r["alloc_peak_bytes"] > b["alloc_peak_bytes"] * (1 + alloc_threshold):
+            regressions.append(
+                "%s[%d] peak alloc %d -> %d bytes (+%.0f%%)"
+                % (
+                    r["name"],
+                    r["size"],
+                    b["alloc_peak_bytes"],
+                    r["alloc_peak_bytes"],
+                    (r["alloc_peak_bytes"] / b["alloc_peak_bytes"] - 1) * 100,
+                )
+            )
+    return regressions
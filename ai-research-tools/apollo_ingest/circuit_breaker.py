@@ -0,0 +1,189 @@
+"""
+Per-endpoint circuit breakers for Apollo calls.
+
+Each Apollo endpoint gets a breaker that watches a rolling window of recent calls. When too
+many fail (timeouts, connection errors, 5xx) or run slow, it opens and calls fail fast with
+CircuitOpenError instead of tying up a worker for the full timeout-and-retry cycle. After
+APOLLO_CB_OPEN_SECONDS it goes half-open and lets a few probe calls through; if they succeed
+it closes again, otherwise it re-opens.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Tunables (override via env)
+FAILURE_RATE_THRESHOLD = float(os.getenv("APOLLO_CB_FAILURE_RATE", "0.5"))
+SLOW_CALL_SECONDS = float(os.getenv("APOLLO_CB_SLOW_CALL_SECONDS", "20"))
+SLOW_CALL_RATE_THRESHOLD = float(os.getenv("APOLLO_CB_SLOW_CALL_RATE", "0.8"))
+WINDOW_SIZE = int(os.getenv("APOLLO_CB_WINDOW", "20"))
+MIN_CALLS = int(os.getenv("APOLLO_CB_MIN_CALLS", "5"))
+OPEN_SECONDS = float(os.getenv("APOLLO_CB_OPEN_SECONDS", "30"))
+HALF_OPEN_MAX_CALLS = int(os.getenv("APOLLO_CB_HALF_OPEN_CALLS", "1"))
+
+
+class CircuitOpenError(RuntimeError):
+    """Apollo endpoint is marked unavailable; the call was not attempted."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(
+            "Apollo %s is temporarily unavailable (circuit open, retry in %.0fs)"
+            % (name, retry_after)
+        )
+
+
+class CircuitBreaker:
+    """Rolling-window breaker: closed → open → half_open → closed/open."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = FAILURE_RATE_THRESHOLD,
+        slow_call_seconds: float = SLOW_CALL_SECONDS,
+        slow_call_rate_threshold: float = SLOW_CALL_RATE_THRESHOLD,
+        window_size: int = WINDOW_SIZE,
+        min_calls: int = MIN_CALLS,
+        open_seconds: float = OPEN_SECONDS,
+        half_open_max_calls: int = HALF_OPEN_MAX_CALLS,
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._lock = threading.Lock()
+        # (failed, slow) per finished call
+        self._window = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._times_opened = 0
+        self._rejected = 0
+        self._last_error = None
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not be attempted; otherwise admit it."""
+        with self._lock:
+            if self._state == OPEN:
+                waited = time.monotonic() - self._opened_at
+                if waited < self.open_seconds:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds - waited)
+                self._state = HALF_OPEN
+                self._half_open_in_flight = 0
+            if self._state == HALF_OPEN:
+                if self._half_open_in_flight >= self.half_open_max_calls:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.name, 1.0)
+                self._half_open_in_flight += 1
+
+    def cancel_call(self) -> None:
+        """Undo before_call() for a call that was admitted but never made."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def record_success(self, duration: float) -> None:
+        self._record(False, duration)
+
+    def record_failure(self, duration: float, error=None) -> None:
+        self._record(True, duration, error)
+
+    def _record(self, failed: bool, duration: float, error=None) -> None:
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if failed:
+                self._last_error = str(error) if error is not None else "failure"
+            if self._state == HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+                if failed or slow:
+                    self._trip()
+                else:
+                    self._state = CLOSED
+                    self._window.clear()
+                return
+            self._window.append((failed, slow))
+            if self._state == CLOSED and self._should_trip():
+                self._trip()
+
+    def _should_trip(self) -> bool:
+        n = len(self._window)
+        if n < self.min_calls:
+            return False
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow = sum(1 for _, is_slow in self._window if is_slow)
+        return (
+            failures / n >= self.failure_rate_threshold
+            or slow / n >= self.slow_call_rate_threshold
+        )
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._times_opened += 1
+        self._window.clear()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._window.clear()
+            self._half_open_in_flight = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def snapshot(self) -> dict:
+        """State and window stats for the status API."""
+        state = self.state
+        with self._lock:
+            n = len(self._window)
+            failures = sum(1 for failed, _ in self._window if failed)
+            slow = sum(1 for _, is_slow in self._window if is_slow)
+            retry_after = 0.0
+            if state == OPEN:
+                retry_after = max(
+                    0.0, self.open_seconds - (time.monotonic() - self._opened_at)
+                )
+            return {
+                "state": state,
+                "window_calls": n,
+                "error_rate": round(failures / n, 3) if n else 0.0,
+                "slow_call_rate": round(slow / n, 3) if n else 0.0,
+                "times_opened": self._times_opened,
+                "rejected_calls": self._rejected,
+                "retry_after_seconds": round(retry_after, 1),
+                "last_error": self._last_error,
+            }
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """Process-wide breaker for an endpoint name (created on first use)."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+def breakers_snapshot() -> dict:
+    """name → snapshot for every breaker created so far."""
+    return {name: b.snapshot() for name, b in sorted(_breakers.items())}
@@ -1,4 +1,8 @@
+import threading
+
 from django import forms
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
 
 
 # Apollo industry tags: (value=id, name=display). API filters[] options use these IDs.
@@ -160,6 +164,29 @@ JOB_TITLE_CHOICES = [
 ]
 
 
+class PrerenderedSelectMultiple(forms.SelectMultiple):
+    """
+    SelectMultiple for large static choice lists: the widget is rendered through Django's
+    templates once per process (nothing selected) and cached; each request only marks its
+    selected options. Output is identical to SelectMultiple's.
+    """
+
+    _rendered = {}
+    _lock = threading.Lock()
+
+    def render(self, name, value, attrs=None, renderer=None):
+        key = (name, tuple(sorted((attrs or {}).items())), tuple(sorted(self.attrs.items())), tuple(self.choices))
+        html = self._rendered.get(key)
+        if html is None:
+            html = str(super().render(name, None, attrs, renderer))
+            with self._lock:
+                self._rendered[key] = html
+        for v in self.format_value(value):
+            option = '<option value="%s"' % conditional_escape(v)
+            html = html.replace(option + ">", option + " selected>", 1)
+        return mark_safe(html)
+
+
 class CompanySearchForm(forms.Form):
     """Form for searching companies with Apollo API filters."""
 
@@ -215,7 +242,7 @@ class CompanySearchForm(forms.Form):
         required=False,
         choices=INDUSTRIES_LIST,
         label="Industries (include)",
-        widget=forms.SelectMultiple(attrs={"size": "5"}),
+        widget=PrerenderedSelectMultiple(attrs={"size": "5"}),
     )
 
     # Industries to exclude – same id list, sent as filters[].options (id array)
@@ -223,7 +250,7 @@ class CompanySearchForm(forms.Form):
         required=False,
         choices=INDUSTRIES_LIST,
         label="Industries (exclude)",
-        widget=forms.SelectMultiple(attrs={"size": "3"}),
+        widget=PrerenderedSelectMultiple(attrs={"size": "3"}),
     )
 
     # Organization job titles (company search filter)
@@ -298,7 +325,7 @@ class CompanySearchForm(forms.Form):
         required=False,
         choices=JOB_TITLE_CHOICES,
         label="Job Titles",
-        widget=forms.SelectMultiple(attrs={"size": "5"}),
+        widget=PrerenderedSelectMultiple(attrs={"size": "5"}),
     )
 
     # Seniorities (multi-select)
@@ -306,5 +333,5 @@ class CompanySearchForm(forms.Form):
         required=False,
         choices=SENIORITY_CHOICES,
         label="Seniorities",
-        widget=forms.SelectMultiple(attrs={"size": "5"}),
+        widget=PrerenderedSelectMultiple(attrs={"size": "5"}),
     )
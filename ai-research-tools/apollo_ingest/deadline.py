@@ -0,0 +1,80 @@
+"""
+Per-request time budget for Apollo calls.
+
+A view opens a budget with `request_deadline(seconds)`; every Apollo call made inside it
+(each attempt and each retry sleep) is capped to the time that is left. The budget lives in
+a contextvar so it also follows the request into worker threads started with a copied context.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Don't start an Apollo call with less than this many seconds left – it would only time out.
+MIN_CALL_SECONDS = 1.0
+
+_current_deadline = contextvars.ContextVar("apollo_deadline", default=None)
+
+
+class DeadlineExceeded(RuntimeError):
+    """Request time budget is spent; no further Apollo calls should be made."""
+
+
+class Deadline:
+    """Absolute expiry on the monotonic clock."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + max(0.0, float(seconds))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the current request, or None when no budget was set."""
+    return _current_deadline.get()
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left in the current budget (None = unlimited)."""
+    deadline = _current_deadline.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """
+    Run the block under a time budget of `seconds`. Nested budgets never extend an outer one:
+    the tighter of the two wins. `seconds=None` (or <= 0) leaves the current budget unchanged.
+    """
+    outer = _current_deadline.get()
+    if not seconds or seconds <= 0:
+        yield outer
+        return
+    deadline = Deadline(seconds)
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def clamp_timeout(timeout: float) -> float:
+    """
+    Cap a per-call timeout to the remaining budget. Raises DeadlineExceeded when there is
+    not enough time left to make a useful call.
+    """
+    left = remaining_time()
+    if left is None:
+        return timeout
+    if left < MIN_CALL_SECONDS:
+        raise DeadlineExceeded("Request time budget exhausted")
+    return min(timeout, left)
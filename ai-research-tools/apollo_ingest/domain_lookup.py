@@ -0,0 +1,181 @@
+"""
+Bulk domain → organization lookup.
+
+parse_domains() turns pasted text or an uploaded CSV into a clean, de-duplicated domain list.
+lookup_domains() splits it into chunks of DOMAIN_CHUNK_SIZE (one mixed_companies/search call
+with q_organization_domains_list each, paged when Apollo returns more organizations than fit
+on one page), runs the chunks concurrently at bulk priority and yields NDJSON-ready events as
+chunks complete:
+
+  {"type": "organization", "matched_domain": ..., **company}
+  {"type": "chunk_error", "domains": [...], "error": ...}
+  {"type": "summary", "unmatched": [...], "failed": [...], ...}   (last)
+
+When a later page of a chunk fails, the organizations from its earlier pages (already paid
+for) are still emitted and counted; chunk_error and "failed" then list only the chunk's
+domains none of them matched. The summary's apollo_calls counts every call that may have
+reached Apollo, failed ones included; calls refused before going out (circuit open, no key
+budget, not admitted) and stale cached responses are not counted.
+"""
+
+import csv
+import io
+import logging
+import os
+import re
+
+from .apollo_service import search_companies
+from .circuit_breaker import CircuitOpenError
+from .deadline import request_deadline
+from .fanout import fan_out
+from .key_pool import ApiKeysExhausted
+from .normalizers import COMPANY
+from .scheduler import BULK, SchedulerRejected, priority
+
+logger = logging.getLogger(__name__)
+
+# Domains per Apollo request (= per_page, Apollo's maximum)
+DOMAIN_CHUNK_SIZE = int(os.getenv("APOLLO_DOMAIN_CHUNK_SIZE", "100"))
+MAX_DOMAINS = int(os.getenv("APOLLO_DOMAIN_LOOKUP_MAX", "50000"))
+# Pages fetched per chunk when domains match several organizations each
+MAX_PAGES_PER_CHUNK = 5
+# CSV header names recognised as the domain column (else the first column is used)
+DOMAIN_COLUMNS = ("domain", "domains", "primary_domain", "website", "website_url", "url")
+
+_DOMAIN_RE = re.compile(r"^(?=.{1,253}$)([a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}$")
+_SPLIT_RE = re.compile(r"[\s,;]+")
+# Raised before the request goes out: no call to count
+_NOT_SENT = (ApiKeysExhausted, CircuitOpenError, SchedulerRejected)
+
+
+def normalize_domain(value: str):
+    """`https://www.Example.com/about` → `example.com`; None if it is not a domain."""
+    d = (value or "").strip().strip("\"'").lower()
+    if "://" in d:
+        d = d.split("://", 1)[1]
+    d = d.split("/", 1)[0].split("?", 1)[0].split("#", 1)[0]
+    d = d.rsplit("@", 1)[-1].split(":", 1)[0].rstrip(".")
+    if d.startswith("www."):
+        d = d[4:]
+    return d if _DOMAIN_RE.match(d) else None
+
+
+def _csv_values(text: str) -> list:
+    rows = list(csv.reader(io.StringIO(text)))
+    if not rows:
+        return []
+    header = [h.strip().lower() for h in rows[0]]
+    column = next((header.index(c) for c in DOMAIN_COLUMNS if c in header), None)
+    if column is None:
+        column = 0
+    else:
+        rows = rows[1:]
+    return [row[column] for row in rows if len(row) > column]
+
+
+def parse_domains(text: str = "", values=None, is_csv: bool = False):
+    """
+    Domains from newline / comma separated text, a CSV (domain column picked by header name),
+    or a list. Returns (unique normalized domains in input order, invalid inputs, input count).
+    """
+    if values is None:
+        values = _csv_values(text) if is_csv else _SPLIT_RE.split(text or "")
+    seen = set()
+    domains = []
+    invalid = []
+    count = 0
+    for raw in values:
+        raw = str(raw).strip()
+        if not raw:
+            continue
+        count += 1
+        d = normalize_domain(raw)
+        if d is None:
+            invalid.append(raw)
+        elif d not in seen:
+            seen.add(d)
+            domains.append(d)
+    return domains, invalid, count
+
+
+def _chunks(domains: list, size: int):
+    for i in range(0, len(domains), size):
+        yield tuple(domains[i : i + size])
+
+
+def _lookup_chunk(chunk: tuple) -> tuple:
+    """
+    All organizations Apollo has for the chunk's domains: (organizations, calls, error).
+    A failed page ends the chunk with error set; the pages before it are kept, and the failed
+    call is counted unless it never went out.
+    """
+    organizations = []
+    calls = 0
+    page = 1
+    while True:
+        try:
+            response = search_companies(
+                {"q_organization_domains_list": list(chunk), "page": page, "per_page": DOMAIN_CHUNK_SIZE}
+            )
+        except _NOT_SENT as e:
+            return organizations, calls, e
+        except Exception as e:
+            return organizations, calls + 1, e
+        if not response.get("_stale"):
+            calls += 1
+        organizations.extend(response.get("organizations") or response.get("accounts") or [])
+        total_pages = (response.get("pagination") or {}).get("total_pages") or 1
+        if page >= min(total_pages, MAX_PAGES_PER_CHUNK):
+            return organizations, calls, None
+        page += 1
+
+
+def lookup_domains(domains: list, deadline_seconds: float, invalid=(), input_count=None):
+    """Generator of lookup events (see module docstring); runs Apollo calls while iterated."""
+    matched = set()
+    failed = []
+    organizations = 0
+    calls = 0
+    seen_ids = set()
+    chunks = list(_chunks(domains, DOMAIN_CHUNK_SIZE))
+    with request_deadline(deadline_seconds), priority(BULK):
+        for result in fan_out(_lookup_chunk, chunks):
+            # _lookup_chunk returns its errors, so every result is ok
+            chunk_set = set(result.item)
+            orgs, n, error = result.value
+            calls += n
+            chunk_matched = set()
+            for company in COMPANY.many("dict")(orgs):
+                domain = normalize_domain(company.get("primary_domain") or company.get("website_url") or "")
+                if domain in chunk_set:
+                    chunk_matched.add(domain)
+                if company["id"] in seen_ids:
+                    continue
+                seen_ids.add(company["id"])
+                organizations += 1
+                yield {"type": "organization", "matched_domain": domain if domain in chunk_set else None, **company}
+            matched |= chunk_matched
+            if error is not None:
+                unresolved = [d for d in result.item if d not in chunk_matched]
+                logger.warning(
+                    "Domain lookup: chunk of %s failed after %s call(s), %s domains unresolved: %s",
+                    len(result.item),
+                    n,
+                    len(unresolved),
+                    error,
+                )
+                failed.extend(unresolved)
+                yield {"type": "chunk_error", "domains": unresolved, "error": str(error)}
+    failed_set = set(failed)
+    yield {
+        "type": "summary",
+        "input_count": input_count if input_count is not None else len(domains),
+        "unique_domains": len(domains),
+        "invalid": list(invalid),
+        "chunks": len(chunks),
+        "apollo_calls": calls,
+        "organizations": organizations,
+        "matched": len(matched),
+        "unmatched": [d for d in domains if d not in matched and d not in failed_set],
+        "failed": failed,
+    }
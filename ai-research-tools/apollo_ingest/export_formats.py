@@ -0,0 +1,133 @@
+"""
+Flat export formats: one row per contact with the company in every row, for loaders that
+prefer one file to a ZIP of per-company workbooks.
+
+- csv:    streamed, one chunk per company (header row first); a partial export ends with
+          CSV_INCOMPLETE_MARKER and a CSV_SKIPPED_MARKER row per skipped company
+- ndjson: streamed, {"type": "contact", ...} per contact, then {"type": "summary", ...}
+- xlsx:   one write-only workbook ("Contacts" sheet, plus "Skipped" when the export is
+          partial), spooled to a temp file
+
+csv_chunks / ndjson_lines take an iterator of (company, rows) with rows from
+workbooks.contact_rows(), and SingleWorkbook takes them one add() at a time, so memory stays
+at one company's contacts whatever the export size. A company without contacts
+still gets one row (empty contact columns) or, in NDJSON, a {"type": "company", "contacts": 0}
+line, so every format lists the same companies as the ZIP's workbooks.
+"""
+
+import csv
+import io
+import tempfile
+
+from config.renderers import dumps
+
+from .workbooks import EXPORT_HEADER
+
+EXPORT_FORMATS = ("zip", "csv", "ndjson", "xlsx")
+COMPANY_HEADER = ("Company ID", "Company", "Domain")
+# NDJSON keys, in EXPORT_HEADER order
+CONTACT_KEYS = ("name", "email", "linkedin_url", "title", "seniority", "location")
+# First cell of the trailing rows of a partial CSV export (headers can't be sent after streaming starts)
+CSV_INCOMPLETE_MARKER = "# EXPORT INCOMPLETE"
+CSV_SKIPPED_MARKER = "# SKIPPED"
+# Spooled in memory up to this size, then on disk
+XLSX_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+# Contact columns of a company-only row
+NO_CONTACT = ("",) * len(EXPORT_HEADER)
+
+
+def company_columns(company: dict) -> tuple:
+    domain = (company.get("domain") or company.get("primary_domain") or "").strip()
+    return (company.get("id") or "", company.get("name") or "", domain)
+
+
+def _rows_or_company(rows: list) -> list:
+    return rows or [NO_CONTACT]
+
+
+def csv_chunks(companies, skipped: list):
+    """
+    CSV text: the header, then one chunk per company. `skipped` is read after `companies` is
+    consumed; when it is not empty the file ends with the incomplete marker row and one
+    "# SKIPPED, id, name, domain" row per skipped company.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COMPANY_HEADER + EXPORT_HEADER)
+    for company, rows in companies:
+        prefix = company_columns(company)
+        writer.writerows(prefix + row for row in _rows_or_company(rows))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if skipped:
+        writer.writerow(
+            (CSV_INCOMPLETE_MARKER, "%s companies skipped: export time budget ran out" % len(skipped))
+        )
+        writer.writerows((CSV_SKIPPED_MARKER,) + company_columns(company) for company in skipped)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def ndjson_lines(companies, summary):
+    """NDJSON: a contact line per row, then {"type": "summary", **summary()} (called at the end)."""
+    for company, rows in companies:
+        company_id, company_name, company_domain = company_columns(company)
+        if not rows:
+            yield dumps(
+                {
+                    "type": "company",
+                    "company_id": company_id,
+                    "company_name": company_name,
+                    "company_domain": company_domain,
+                    "contacts": 0,
+                }
+            ) + b"\n"
+            continue
+        yield b"".join(
+            dumps(
+                {
+                    "type": "contact",
+                    "company_id": company_id,
+                    "company_name": company_name,
+                    "company_domain": company_domain,
+                    **dict(zip(CONTACT_KEYS, row)),
+                }
+            )
+            + b"\n"
+            for row in rows
+        )
+    yield dumps({"type": "summary", **summary()}) + b"\n"
+
+
+class SingleWorkbook:
+    """
+    Write-only workbook built company by company: add() appends a company's rows, save() adds
+    the Skipped sheet and returns a rewound temp file. The caller times add() / save() itself,
+    so fetching the next company is not counted as workbook time.
+    """
+
+    def __init__(self):
+        from openpyxl import Workbook
+
+        self._wb = Workbook(write_only=True)
+        self._ws = self._wb.create_sheet("Contacts")
+        self._ws.append(COMPANY_HEADER + EXPORT_HEADER)
+
+    def add(self, company: dict, rows: list):
+        prefix = company_columns(company)
+        for row in _rows_or_company(rows):
+            self._ws.append(prefix + row)
+
+    def save(self, skipped: list):
+        if skipped:
+            ws = self._wb.create_sheet("Skipped")
+            ws.append(COMPANY_HEADER)
+            for company in skipped:
+                ws.append(company_columns(company))
+        f = tempfile.SpooledTemporaryFile(max_size=XLSX_SPOOL_BYTES)
+        self._wb.save(f)
+        f.seek(0)
+        return f
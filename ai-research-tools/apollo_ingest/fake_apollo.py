@@ -0,0 +1,545 @@
+"""
+Local stand-in for the Apollo API, for offline and load testing (no credits spent).
+
+Serves the four endpoints apollo_service uses, with payloads shaped like Apollo's:
+
+- POST /api/v1/mixed_companies/search
+- POST /api/v1/mixed_people/api_search
+- POST /api/v1/people/bulk_match
+- POST /api/v1/tags/search
+
+Results are deterministic: the same request always returns the same records. Latency, error
+rate (5xx) and 429 behaviour (a per-key per-minute limit plus an optional random 429 rate)
+are configurable. With `replay_dir` the server first serves fixtures recorded from the real
+API (see recording.py) and only synthesizes responses for requests it has no fixture for.
+
+Run it with `python manage.py fake_apollo`, then point the app at it:
+
+    APOLLO_API_BASE_URL=http://127.0.0.1:8765/api/v1
+    APOLLO_APP_BASE_URL=http://127.0.0.1:8765/api/v1
+
+The payload builders (fake_organization, fake_person, ...) are also used by the benchmarks.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from .recording import load_fixture
+
+COMPANY_SEARCH_PATH = "/api/v1/mixed_companies/search"
+PEOPLE_SEARCH_PATH = "/api/v1/mixed_people/api_search"
+BULK_MATCH_PATH = "/api/v1/people/bulk_match"
+TAGS_SEARCH_PATH = "/api/v1/tags/search"
+
+ENDPOINTS = {
+    COMPANY_SEARCH_PATH: "mixed_companies/search",
+    PEOPLE_SEARCH_PATH: "mixed_people/api_search",
+    BULK_MATCH_PATH: "people/bulk_match",
+    TAGS_SEARCH_PATH: "tags/search",
+}
+
+# Apollo returns at most this many pages of a search
+MAX_PAGES = 500
+
+_CITIES = [
+    ("San Francisco", "California", "United States"),
+    ("New York", "New York", "United States"),
+    ("Austin", "Texas", "United States"),
+    ("London", "England", "United Kingdom"),
+    ("Berlin", "Berlin", "Germany"),
+    ("Lahore", "Punjab", "Pakistan"),
+    ("Karachi", "Sindh", "Pakistan"),
+    ("Toronto", "Ontario", "Canada"),
+    ("Bengaluru", "Karnataka", "India"),
+    ("Sydney", "New South Wales", "Australia"),
+]
+_INDUSTRIES = [
+    "information technology & services",
+    "computer software",
+    "financial services",
+    "hospital & health care",
+    "marketing & advertising",
+    "construction",
+    "retail",
+    "internet",
+]
+_WORDS = [
+    "Apex", "Blue", "Cloud", "Delta", "Echo", "Forge", "Granite", "Harbor", "Ion",
+    "Juniper", "Kite", "Lumen", "Maple", "Nimbus", "Orbit", "Pioneer", "Quartz",
+    "River", "Summit", "Tango", "Umbra", "Vertex", "Willow", "Zenith",
+]
+_SUFFIXES = ["Labs", "Systems", "Group", "Technologies", "Partners", "Health", "Works", "Capital"]
+_FIRST = ["Ali", "Sara", "John", "Maria", "Ahmed", "Emily", "Chen", "Fatima", "David", "Priya", "Omar", "Laura"]
+_LAST = ["Khan", "Smith", "Garcia", "Ahmed", "Johnson", "Li", "Malik", "Brown", "Patel", "Mueller"]
+_TITLES = [
+    ("CEO", "c_suite"), ("CTO", "c_suite"), ("Founder", "founder"), ("VP Sales", "vp"),
+    ("VP Engineering", "vp"), ("Head of Marketing", "head"), ("Engineering Manager", "manager"),
+    ("Director of Operations", "director"), ("Senior Software Engineer", "senior"),
+    ("Account Executive", "entry"),
+]
+_EMPLOYEE_BUCKETS = [(1, 10), (11, 50), (51, 200), (201, 500), (501, 1000), (1001, 5000), (5001, 10000)]
+
+
+def _rng(*parts) -> random.Random:
+    seed = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return random.Random(int(seed[:16], 16))
+
+
+def _object_id(*parts) -> str:
+    """24-hex id like Apollo's Mongo ids."""
+    return hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:24]
+
+
+def _slug(name: str) -> str:
+    return "".join(ch for ch in name.lower() if ch.isalnum())
+
+
+def fake_organization(
+    org_id: str,
+    domain: Optional[str] = None,
+    employees_range: Optional[tuple] = None,
+) -> dict:
+    """Organization shaped like an item of mixed_companies/search `organizations`."""
+    rng = _rng("org", org_id)
+    name = "%s %s %s" % (rng.choice(_WORDS), rng.choice(_WORDS), rng.choice(_SUFFIXES))
+    domain = domain or "%s.com" % _slug(name)
+    city, state, country = rng.choice(_CITIES)
+    low, high = employees_range or rng.choice(_EMPLOYEE_BUCKETS)
+    employees = rng.randint(low, high)
+    revenue = employees * rng.randint(50, 400) * 1000
+    industry = rng.choice(_INDUSTRIES)
+    return {
+        "id": org_id,
+        "name": name,
+        "website_url": "http://www.%s" % domain,
+        "blog_url": None,
+        "angellist_url": None,
+        "linkedin_url": "http://www.linkedin.com/company/%s" % _slug(name),
+        "twitter_url": "https://twitter.com/%s" % _slug(name),
+        "facebook_url": None,
+        "primary_phone": {"number": "+1 555-%04d" % rng.randint(0, 9999), "source": "Account"},
+        "languages": ["English"],
+        "alexa_ranking": rng.randint(1000, 5000000),
+        "phone": "+1 555-%04d" % rng.randint(0, 9999),
+        "linkedin_uid": str(rng.randint(10000, 99999999)),
+        "founded_year": rng.randint(1950, 2024),
+        "publicly_traded_symbol": None,
+        "publicly_traded_exchange": None,
+        "logo_url": "https://zenprospect-production.s3.amazonaws.com/uploads/pictures/%s/picture" % org_id,
+        "crunchbase_url": None,
+        "primary_domain": domain,
+        "sanitized_phone": "+1555%07d" % rng.randint(0, 9999999),
+        "industry": industry,
+        "keywords": [industry, rng.choice(_INDUSTRIES)],
+        "estimated_num_employees": employees,
+        "industries": [industry],
+        "secondary_industries": [],
+        "industry_tag_id": _object_id("tag", industry),
+        "industry_tag_hash": {industry: _object_id("tag", industry)},
+        "retail_location_count": 0,
+        "raw_address": "%d Main St, %s, %s, %s" % (rng.randint(1, 999), city, state, country),
+        "street_address": "%d Main St" % rng.randint(1, 999),
+        "city": city,
+        "state": state,
+        "postal_code": str(rng.randint(10000, 99999)),
+        "country": country,
+        "organization_raw_address": "%s, %s, %s" % (city, state, country),
+        "organization_city": city,
+        "organization_state": state,
+        "organization_country": country,
+        "organization_revenue_printed": "%.1fM" % (revenue / 1e6),
+        "organization_revenue": float(revenue),
+        "owned_by_organization_id": None,
+        "organization_headcount_six_month_growth": round(rng.uniform(-0.2, 0.5), 3),
+        "organization_headcount_twelve_month_growth": round(rng.uniform(-0.2, 0.8), 3),
+        "short_description": "%s is a %s company based in %s." % (name, industry, city),
+    }
+
+
+def fake_person(person_id: str, organization: Optional[dict] = None) -> dict:
+    """Person shaped like an item of mixed_people/api_search `people` (obfuscated, no email)."""
+    rng = _rng("person", person_id)
+    first = rng.choice(_FIRST)
+    last = rng.choice(_LAST)
+    title, _ = rng.choice(_TITLES)
+    org = organization or {}
+    return {
+        "id": person_id,
+        "first_name": first,
+        "last_name_obfuscated": last[0] + "***" + last[-1],
+        "title": title,
+        "last_refreshed_at": "2025-11-%02dT10:00:00.000+00:00" % rng.randint(1, 28),
+        "has_email": True,
+        "has_city": True,
+        "has_state": True,
+        "has_country": True,
+        "has_direct_phone": rng.choice(["Yes", "Maybe: please request direct dial via people/bulk_match"]),
+        "organization": {
+            "name": org.get("name"),
+            "has_industry": True,
+            "has_phone": True,
+            "has_city": True,
+            "has_state": True,
+            "has_country": True,
+            "has_zip_code": True,
+            "has_revenue": True,
+            "has_employee_count": True,
+        },
+    }
+
+
+def fake_match(person_id: str, reveal_phone_number: bool = False) -> dict:
+    """Enriched person shaped like an item of people/bulk_match `matches`."""
+    rng = _rng("person", person_id)
+    first = rng.choice(_FIRST)
+    last = rng.choice(_LAST)
+    title, seniority = rng.choice(_TITLES)
+    city, state, country = rng.choice(_CITIES)
+    org_id = _object_id("org-of", person_id)
+    org = fake_organization(org_id)
+    match = {
+        "id": person_id,
+        "first_name": first,
+        "last_name": last,
+        "name": "%s %s" % (first, last),
+        "linkedin_url": "http://www.linkedin.com/in/%s-%s-%s" % (first.lower(), _slug(last), person_id[:6]),
+        "title": title,
+        "email_status": "verified",
+        "photo_url": None,
+        "twitter_url": None,
+        "github_url": None,
+        "facebook_url": None,
+        "extrapolated_email_confidence": None,
+        "headline": "%s at %s" % (title, org["name"]),
+        "email": "%s.%s@%s" % (first.lower(), _slug(last), org["primary_domain"]),
+        "organization_id": org_id,
+        "employment_history": [
+            {
+                "current": True,
+                "organization_name": org["name"],
+                "title": title,
+                "start_date": "20%02d-01-01" % rng.randint(10, 24),
+                "end_date": None,
+            }
+        ],
+        "state": state,
+        "city": city,
+        "country": country,
+        "organization": org,
+        "departments": ["master_engineering_technical"],
+        "subdepartments": [],
+        "seniority": seniority,
+        "functions": ["engineering"],
+        "intent_strength": None,
+        "show_intent": False,
+        "email_domain_catchall": False,
+        "revealed_for_current_team": True,
+    }
+    if reveal_phone_number:
+        match["phone_numbers"] = [
+            {
+                "raw_number": "+1 555-%04d" % rng.randint(0, 9999),
+                "sanitized_number": "+1555%07d" % rng.randint(0, 9999999),
+                "type": "mobile",
+                "position": 0,
+                "status": "valid_number",
+            }
+        ]
+    return match
+
+
+def fake_tag(tag_id: str, name: str) -> dict:
+    return {
+        "id": tag_id,
+        "cleaned_name": name,
+        "tag_name_unanalyzed_downcase": name.lower(),
+        "parent_tag_id": None,
+        "kind": "linkedin_industry",
+        "uid": _slug(name),
+        "has_children": False,
+        "category": None,
+        "num_organizations": int(_rng("tag", tag_id).randint(1000, 500000)),
+        "_index_type": "tag_document",
+    }
+
+
+def _pagination(page: int, per_page: int, total: int) -> dict:
+    return {
+        "page": page,
+        "per_page": per_page,
+        "total_entries": total,
+        "total_pages": min(MAX_PAGES, (total + per_page - 1) // per_page) if per_page else 0,
+    }
+
+
+def _page_and_size(body: dict) -> tuple:
+    try:
+        page = max(1, int(body.get("page") or 1))
+    except (TypeError, ValueError):
+        page = 1
+    try:
+        per_page = min(100, max(1, int(body.get("per_page") or 25)))
+    except (TypeError, ValueError):
+        per_page = 25
+    return page, per_page
+
+
+def _employee_range(body: dict) -> Optional[tuple]:
+    ranges = body.get("organization_num_employees_ranges") or []
+    if not ranges:
+        return None
+    try:
+        low, high = str(ranges[0]).split(",")
+        return int(low), int(high)
+    except ValueError:
+        return None
+
+
+def company_search_response(body: dict, total_entries: int = 2500, match_rate: float = 0.8) -> dict:
+    page, per_page = _page_and_size(body)
+    domains = body.get("q_organization_domains_list") or []
+    if domains:
+        # One organization per known domain; ~(1 - match_rate) of domains are unknown to Apollo
+        matched = [
+            d for d in domains if _rng("domain", d.lower()).random() < match_rate
+        ]
+        start = (page - 1) * per_page
+        orgs = [
+            fake_organization(_object_id("domain-org", d.lower()), domain=d.lower())
+            for d in matched[start : start + per_page]
+        ]
+        total = len(matched)
+    else:
+        filters = {k: v for k, v in body.items() if k not in ("page", "per_page")}
+        universe = json.dumps(filters, sort_keys=True, default=str)
+        total = total_entries if not filters else int(total_entries * (0.05 + _rng("total", universe).random()))
+        emp_range = _employee_range(body)
+        start = (page - 1) * per_page
+        end = min(total, start + per_page) if page <= MAX_PAGES else start
+        orgs = [
+            fake_organization(_object_id("org", universe, i), employees_range=emp_range)
+            for i in range(start, end)
+        ]
+    return {
+        "breadcrumbs": [],
+        "partial_results_only": False,
+        "has_join": False,
+        "disable_eu_prospecting": False,
+        "partial_results_limit": 10000,
+        "pagination": _pagination(page, per_page, total),
+        "accounts": [],
+        "organizations": orgs,
+        "model_ids": [o["id"] for o in orgs],
+        "num_fetch_result": None,
+        "derived_params": None,
+    }
+
+
+def people_search_response(body: dict) -> dict:
+    page, per_page = _page_and_size(body)
+    org_ids = body.get("organization_ids") or []
+    domains = body.get("q_organization_domains_list") or []
+    scope = json.dumps([org_ids, domains, body.get("person_titles"), body.get("person_seniorities")], sort_keys=True)
+    total = _rng("people-total", scope).randint(0, 180)
+    start = (page - 1) * per_page
+    org = fake_organization(org_ids[0]) if org_ids else None
+    people = [
+        fake_person(_object_id("person", scope, i), organization=org)
+        for i in range(start, min(total, start + per_page))
+    ]
+    return {"total_entries": total, "people": people}
+
+
+def bulk_match_response(body: dict, params: dict) -> dict:
+    details = body.get("details") or []
+    reveal_phone = str(params.get("reveal_phone_number", "false")).lower() == "true"
+    matches = [fake_match(str(d.get("id")), reveal_phone) for d in details if d.get("id")]
+    return {
+        "status": "success",
+        "error_code": None,
+        "error_message": None,
+        "total_requested_enrichments": len(details),
+        "unique_enriched_records": len(matches),
+        "missing_records": len(details) - len(matches),
+        "credits_consumed": len(matches),
+        "matches": matches,
+    }
+
+
+def tags_search_response(params: dict) -> dict:
+    q = (params.get("q_tag_fuzzy_name") or "").strip().lower()
+    try:
+        from .companies_form import INDUSTRIES_LIST
+    except Exception:
+        INDUSTRIES_LIST = [(_object_id("tag", n), n) for n in _INDUSTRIES]
+    tags = [fake_tag(tid, name) for tid, name in INDUSTRIES_LIST if q in name.lower()][:25]
+    return {"tags": tags, "pagination": _pagination(1, 25, len(tags))}
+
+
+class FakeApolloConfig:
+    """Behaviour knobs for the fake server."""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        rate_limit_per_minute: int = 0,
+        daily_limit: int = 0,
+        total_entries: int = 2500,
+        domain_match_rate: float = 0.8,
+        replay_dir: Optional[str] = None,
+        replay_only: bool = False,
+        seed: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.daily_limit = daily_limit
+        self.total_entries = total_entries
+        self.domain_match_rate = domain_match_rate
+        self.replay_dir = replay_dir
+        self.replay_only = replay_only
+        self.seed = seed
+
+
+class _KeyUsage:
+    """Per-API-key call counts for 429 behaviour and rate-limit headers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._minute = defaultdict(deque)
+        self._day = defaultdict(int)
+
+    def hit(self, key: str) -> tuple:
+        now = time.monotonic()
+        with self._lock:
+            calls = self._minute[key]
+            while calls and now - calls[0] >= 60:
+                calls.popleft()
+            calls.append(now)
+            self._day[key] += 1
+            return len(calls), self._day[key], (60 - (now - calls[0])) if calls else 60
+
+
+class FakeApolloHandler(BaseHTTPRequestHandler):
+    server_version = "FakeApollo/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):  # keep load tests quiet
+        if getattr(self.server, "verbose", False):
+            super().log_message(fmt, *args)
+
+    def _send_json(self, status: int, data: dict, headers: Optional[dict] = None):
+        raw = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(raw)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, str(v))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        config = self.server.config
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query, keep_blank_values=True))
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        except ValueError:
+            return self._send_json(400, {"error": "Invalid JSON body"})
+        endpoint = ENDPOINTS.get(parts.path)
+        if endpoint is None:
+            return self._send_json(404, {"error": "Not found: %s" % parts.path})
+        key = self.headers.get("X-Api-Key") or ""
+        if not key:
+            return self._send_json(401, {"error": "Invalid access credentials."})
+
+        rng = self.server.rng()
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)
+            time.sleep(max(0.0, delay) / 1000.0)
+
+        minute_calls, day_calls, reset_in = self.server.usage.hit(key)
+        headers = {}
+        if config.rate_limit_per_minute:
+            headers["x-rate-limit-minute"] = config.rate_limit_per_minute
+            headers["x-minute-requests-left"] = max(0, config.rate_limit_per_minute - minute_calls)
+        if config.daily_limit:
+            headers["x-rate-limit-24-hour"] = config.daily_limit
+            headers["x-24-hour-requests-left"] = max(0, config.daily_limit - day_calls)
+        over_limit = (
+            config.rate_limit_per_minute and minute_calls > config.rate_limit_per_minute
+        ) or (config.daily_limit and day_calls > config.daily_limit)
+        if over_limit or (config.throttle_rate and rng.random() < config.throttle_rate):
+            headers["Retry-After"] = int(max(1, reset_in))
+            return self._send_json(
+                429,
+                {"error": "The maximum number of api calls allowed for api/v1/%s is %s times per minute." % (endpoint, config.rate_limit_per_minute or "N")},
+                headers,
+            )
+        if config.error_rate and rng.random() < config.error_rate:
+            return self._send_json(
+                rng.choice([500, 502, 503]), {"error": "Internal server error"}, headers
+            )
+
+        if config.replay_dir:
+            fixture = load_fixture(config.replay_dir, endpoint, body, params)
+            if fixture is not None:
+                return self._send_json(fixture.get("status") or 200, fixture["response"], headers)
+            if config.replay_only:
+                return self._send_json(404, {"error": "No recorded fixture for this request"}, headers)
+
+        if parts.path == COMPANY_SEARCH_PATH:
+            data = company_search_response(body, config.total_entries, config.domain_match_rate)
+        elif parts.path == PEOPLE_SEARCH_PATH:
+            data = people_search_response(body)
+        elif parts.path == BULK_MATCH_PATH:
+            data = bulk_match_response(body, params)
+        else:
+            data = tags_search_response(params)
+        return self._send_json(200, data, headers)
+
+
+class FakeApolloServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8765), config: Optional[FakeApolloConfig] = None, verbose: bool = False):
+        super().__init__(address, FakeApolloHandler)
+        self.config = config or FakeApolloConfig()
+        self.verbose = verbose
+        self.usage = _KeyUsage()
+        self._rng_lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._thread = None
+
+    def rng(self) -> random.Random:
+        """Per-request RNG drawn from the seeded server RNG (stable sequence for a given seed)."""
+        with self._rng_lock:
+            return random.Random(self._rng.random())
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return "http://%s:%s/api/v1" % (host, port)
+
+    def start(self) -> "FakeApolloServer":
+        """Serve in a background thread (for tests and benchmarks)."""
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-apollo", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
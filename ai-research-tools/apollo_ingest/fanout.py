@@ -0,0 +1,74 @@
+"""
+Run independent Apollo calls concurrently from one request.
+
+`fan_out(func, items)` calls func(item) on a small thread pool and yields results as they
+complete. Each call runs in a copy of the caller's context, so the request deadline, the
+priority class (`with priority(BULK)`) and request timing follow it into the worker thread.
+Admission and rate limits still come from the scheduler and key pool: the pool size only
+bounds how many calls one request may have queued or in flight at once.
+"""
+
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Concurrent Apollo calls per fan-out (keep below APOLLO_MAX_CONCURRENCY - reserved slots)
+FANOUT_WORKERS = int(os.getenv("APOLLO_FANOUT_WORKERS", "4"))
+
+_DONE = object()
+
+
+class FanOutResult:
+    """Outcome of func(item): `value` on success, `error` (the exception) on failure."""
+
+    __slots__ = ("item", "value", "error")
+
+    def __init__(self, item, value=None, error=None):
+        self.item = item
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def fan_out(func, items, max_workers: int = FANOUT_WORKERS):
+    """
+    Yield a FanOutResult per item, in completion order. Items are taken from `items` lazily
+    (at most max_workers outstanding). Closing the generator early cancels the calls that
+    have not started.
+    """
+    items = iter(items)
+    max_workers = max(1, max_workers)
+
+    def call(item):
+        try:
+            return FanOutResult(item, value=func(item))
+        except Exception as e:
+            return FanOutResult(item, error=e)
+
+    def submit(executor, pending) -> bool:
+        item = next(items, _DONE)
+        if item is _DONE:
+            return False
+        ctx = contextvars.copy_context()
+        pending.add(executor.submit(ctx.run, call, item))
+        return True
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="apollo-fanout")
+    pending = set()
+    try:
+        while len(pending) < max_workers and submit(executor, pending):
+            pass
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+            while len(pending) < max_workers and submit(executor, pending):
+                pass
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
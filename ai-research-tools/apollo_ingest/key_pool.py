@@ -0,0 +1,230 @@
+"""
+Pool of Apollo API keys, load-balanced by remaining rate-limit budget.
+
+Keys come from APOLLO_API_KEYS (comma-separated), falling back to the single APOLLO_API_KEY.
+Every Apollo call acquires the key with the most budget left this minute/day; usage is counted
+locally and corrected from Apollo's rate-limit response headers when they are present. A key
+that gets 429 is rested until its Retry-After (or the next minute); a key that gets 403 is
+taken out of rotation for APOLLO_KEY_FORBIDDEN_COOLDOWN seconds. A call that never goes out
+(rejected by the scheduler, deadline reached while queued) gives its reservation back.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Per-key limits used until Apollo's headers tell us the real ones (override via env).
+DEFAULT_MINUTE_LIMIT = int(os.getenv("APOLLO_KEY_MINUTE_LIMIT", "50"))
+DEFAULT_DAILY_LIMIT = int(os.getenv("APOLLO_KEY_DAILY_LIMIT", "600"))
+RATE_LIMITED_COOLDOWN = float(os.getenv("APOLLO_KEY_RATE_LIMITED_COOLDOWN", "60"))
+FORBIDDEN_COOLDOWN = float(os.getenv("APOLLO_KEY_FORBIDDEN_COOLDOWN", "3600"))
+
+# Apollo rate-limit response headers
+HEADER_MINUTE_LIMIT = "x-rate-limit-minute"
+HEADER_MINUTE_LEFT = "x-minute-requests-left"
+HEADER_DAY_LIMIT = "x-rate-limit-24-hour"
+HEADER_DAY_LEFT = "x-24-hour-requests-left"
+
+
+class ApiKeysExhausted(RuntimeError):
+    """No Apollo key has budget left (all rate-limited, forbidden or over quota)."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(
+            "All Apollo API keys are rate-limited or unavailable (retry in %.0fs)"
+            % retry_after
+        )
+
+
+def _mask(key: str) -> str:
+    return "***" + key[-4:] if key and len(key) >= 4 else "***"
+
+
+def _header_int(headers, name: str) -> Optional[int]:
+    try:
+        value = headers.get(name)
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ApiKeyState:
+    """Usage and health of one key. Mutated only under the pool lock."""
+
+    def __init__(self, key: str, minute_limit: int, daily_limit: int):
+        self.key = key
+        self.minute_limit = minute_limit
+        self.daily_limit = daily_limit
+        self.minute_calls = deque()  # monotonic timestamps of calls in the last 60s
+        self.day = time.strftime("%Y-%m-%d", time.gmtime())
+        self.day_calls = 0
+        self.day_left_reported = None  # from Apollo headers, trusted over local count
+        self.disabled_until = 0.0
+        self.disabled_reason = None
+        self.total_calls = 0
+        self.rate_limited = 0
+        self.forbidden = 0
+        self.last_status = None
+
+    def _roll(self, now: float) -> None:
+        while self.minute_calls and now - self.minute_calls[0] >= 60:
+            self.minute_calls.popleft()
+        today = time.strftime("%Y-%m-%d", time.gmtime())
+        if today != self.day:
+            self.day = today
+            self.day_calls = 0
+            self.day_left_reported = None
+
+    def minute_left(self) -> int:
+        return max(0, self.minute_limit - len(self.minute_calls))
+
+    def day_left(self) -> int:
+        local = max(0, self.daily_limit - self.day_calls)
+        if self.day_left_reported is not None:
+            return min(local, self.day_left_reported)
+        return local
+
+    def snapshot(self, now: float) -> dict:
+        self._roll(now)
+        disabled_for = max(0.0, self.disabled_until - now)
+        return {
+            "key": _mask(self.key),
+            "available": disabled_for == 0.0 and self.minute_left() > 0 and self.day_left() > 0,
+            "minute_left": self.minute_left(),
+            "minute_limit": self.minute_limit,
+            "day_left": self.day_left(),
+            "day_limit": self.daily_limit,
+            "calls_today": self.day_calls,
+            "total_calls": self.total_calls,
+            "rate_limited": self.rate_limited,
+            "forbidden": self.forbidden,
+            "last_status": self.last_status,
+            "disabled_for_seconds": round(disabled_for, 1),
+            "disabled_reason": self.disabled_reason if disabled_for else None,
+        }
+
+
+class ApiKeyPool:
+    def __init__(
+        self,
+        keys: list,
+        minute_limit: int = DEFAULT_MINUTE_LIMIT,
+        daily_limit: int = DEFAULT_DAILY_LIMIT,
+    ):
+        seen = set()
+        self._keys = []
+        for k in keys:
+            if k and k not in seen:
+                seen.add(k)
+                self._keys.append(ApiKeyState(k, minute_limit, daily_limit))
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def acquire(self, exclude: tuple = (), reserve: float = 0.0) -> ApiKeyState:
+        """
+        Reserve one call on the key with the most budget left (minute first, then day).
+        `exclude` skips keys already tried for this request; `reserve` (0-1) leaves that
+        fraction of each key's per-minute budget untouched. Raises ApiKeysExhausted.
+        """
+        now = time.monotonic()
+        with self._lock:
+            best = None
+            best_score = None
+            retry_after = RATE_LIMITED_COOLDOWN
+            for state in self._keys:
+                if state.key in exclude:
+                    continue
+                state._roll(now)
+                if state.disabled_until > now:
+                    retry_after = min(retry_after, state.disabled_until - now)
+                    continue
+                if state.minute_left() <= state.minute_limit * reserve:
+                    if state.minute_calls:
+                        retry_after = min(retry_after, 60 - (now - state.minute_calls[0]))
+                    continue
+                if state.day_left() <= 0:
+                    continue
+                score = (state.minute_left(), state.day_left())
+                if best_score is None or score > best_score:
+                    best, best_score = state, score
+            if best is None:
+                raise ApiKeysExhausted(max(1.0, retry_after))
+            best.minute_calls.append(now)
+            best.day_calls += 1
+            best.total_calls += 1
+            if best.day_left_reported is not None:
+                best.day_left_reported = max(0, best.day_left_reported - 1)
+            return best
+
+    def release(self, state: ApiKeyState) -> None:
+        """Give back the call acquire() reserved on `state` when no request was sent with it."""
+        with self._lock:
+            if state.minute_calls:
+                state.minute_calls.pop()
+            state.day_calls = max(0, state.day_calls - 1)
+            state.total_calls = max(0, state.total_calls - 1)
+            if state.day_left_reported is not None:
+                state.day_left_reported += 1
+
+    def report(self, state: ApiKeyState, status_code: int, headers=None) -> None:
+        """Record the outcome of a call made with `state`'s key."""
+        now = time.monotonic()
+        headers = headers or {}
+        with self._lock:
+            state.last_status = status_code
+            minute_limit = _header_int(headers, HEADER_MINUTE_LIMIT)
+            if minute_limit:
+                state.minute_limit = minute_limit
+            day_limit = _header_int(headers, HEADER_DAY_LIMIT)
+            if day_limit:
+                state.daily_limit = day_limit
+            day_left = _header_int(headers, HEADER_DAY_LEFT)
+            if day_left is not None:
+                state.day_left_reported = day_left
+            minute_left = _header_int(headers, HEADER_MINUTE_LEFT)
+            if minute_left is not None:
+                # Pad the local window so minute_left() matches what Apollo reports.
+                used = max(0, state.minute_limit - minute_left)
+                while len(state.minute_calls) < used:
+                    state.minute_calls.append(now)
+            if status_code == 429:
+                state.rate_limited += 1
+                retry_after = _header_int(headers, "retry-after")
+                state.disabled_until = now + (retry_after or RATE_LIMITED_COOLDOWN)
+                state.disabled_reason = "rate_limited"
+            elif status_code == 403:
+                state.forbidden += 1
+                state.disabled_until = now + FORBIDDEN_COOLDOWN
+                state.disabled_reason = "forbidden"
+
+    def snapshot(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [state.snapshot(now) for state in self._keys]
+
+
+def keys_from_env() -> list:
+    raw = os.getenv("APOLLO_API_KEYS") or os.getenv("APOLLO_API_KEY") or ""
+    return [k.strip() for k in raw.split(",") if k.strip()]
+
+
+_pool = None
+_pool_keys = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool() -> ApiKeyPool:
+    """Process-wide pool; rebuilt if the configured keys change."""
+    global _pool, _pool_keys
+    keys = keys_from_env()
+    if _pool is None or keys != _pool_keys:
+        with _pool_lock:
+            if _pool is None or keys != _pool_keys:
+                _pool = ApiKeyPool(keys)
+                _pool_keys = keys
+    return _pool
@@ -0,0 +1,111 @@
+"""
+Breadth-first crawl of Apollo's lookalike graph.
+
+Starting from seed organization IDs, each organization in the frontier is searched with
+lookalike_organization_ids=[id] (plus the caller's other filters). The organizations found
+are streamed and become the next frontier, down to `depth` hops. Every organization is
+queried at most once (visited set) and emitted at most once. The searches of one frontier
+run concurrently at bulk priority.
+
+crawl() yields NDJSON-ready events:
+
+  {"type": "organization", "depth": 1, "via": <parent id>, **company}
+  {"type": "query_error", "organization_id": ..., "error": ...}
+  {"type": "level", "depth": ..., "queried": ..., "found": ...}   (after each frontier)
+  {"type": "summary", ...}                                         (last)
+"""
+
+import logging
+import os
+
+from .apollo_service import search_companies
+from .deadline import request_deadline
+from .fanout import fan_out
+from .normalizers import COMPANY
+from .scheduler import BULK, priority
+
+logger = logging.getLogger(__name__)
+
+MAX_RESULTS = int(os.getenv("APOLLO_LOOKALIKE_MAX_RESULTS", "5000"))
+# Apollo searches per crawl (one per expanded organization); bounds credit use
+MAX_QUERIES = int(os.getenv("APOLLO_LOOKALIKE_MAX_QUERIES", "200"))
+
+
+def _lookalikes(task: tuple) -> tuple:
+    """(organizations, stale) for one organization's lookalike search."""
+    org_id, payload = task
+    response = search_companies(dict(payload, lookalike_organization_ids=[org_id], page=1))
+    return response.get("organizations") or response.get("accounts") or [], bool(response.get("_stale"))
+
+
+def crawl(seed_ids: list, base_payload: dict, depth: int, max_results: int, max_queries: int, deadline_seconds: float):
+    """Generator of crawl events (see module docstring); runs Apollo calls while iterated."""
+    base_payload = {k: v for k, v in base_payload.items() if k != "lookalike_organization_ids"}
+    visited = set()
+    emitted = set(seed_ids)
+    found = 0
+    queries = 0
+    failed = 0
+    frontier = list(dict.fromkeys(seed_ids))
+    level = 0
+    stop_reason = "depth"
+
+    with request_deadline(deadline_seconds), priority(BULK):
+        while frontier and level < depth:
+            level += 1
+            budget = max_queries - len(visited)
+            if budget <= 0:
+                stop_reason = "max_queries"
+                break
+            batch = [org_id for org_id in frontier if org_id not in visited][:budget]
+            visited.update(batch)
+            next_frontier = []
+            level_found = 0
+            results = fan_out(_lookalikes, [(org_id, base_payload) for org_id in batch])
+            try:
+                for result in results:
+                    org_id = result.item[0]
+                    if not result.ok:
+                        failed += 1
+                        logger.warning("Lookalike crawl: query for %s failed: %s", org_id, result.error)
+                        yield {"type": "query_error", "organization_id": org_id, "error": str(result.error)}
+                        continue
+                    organizations, stale = result.value
+                    if not stale:
+                        queries += 1
+                    for company in COMPANY.many("dict")(organizations):
+                        cid = company["id"]
+                        if cid in emitted:
+                            continue
+                        emitted.add(cid)
+                        next_frontier.append(cid)
+                        found += 1
+                        level_found += 1
+                        yield {"type": "organization", "depth": level, "via": org_id, **company}
+                        if found >= max_results:
+                            stop_reason = "max_results"
+                            break
+                    if stop_reason == "max_results":
+                        break
+            finally:
+                results.close()  # cancels queries not yet started
+            yield {"type": "level", "depth": level, "queried": len(batch), "found": level_found}
+            if stop_reason == "max_results":
+                break
+            if len(batch) < len(frontier):
+                stop_reason = "max_queries"
+                break
+            frontier = next_frontier
+        else:
+            if not frontier:
+                stop_reason = "exhausted"
+
+    yield {
+        "type": "summary",
+        "seeds": len(seed_ids),
+        "depth_reached": level,
+        "apollo_calls": queries,
+        "failed_queries": failed,
+        "organizations": found,
+        "stopped": stop_reason,
+    }
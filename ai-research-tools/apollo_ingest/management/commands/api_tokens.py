@@ -0,0 +1,61 @@
+"""
+Manage API tokens for scripted clients (see apollo_ingest/api_tokens.py).
+
+    python manage.py api_tokens create "nightly export" [--expires-days 90]
+    python manage.py api_tokens list
+    python manage.py api_tokens revoke ari_AbC123      # by prefix (or --id 4)
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apollo_ingest.api_tokens import create_token, revoke_tokens
+from apollo_ingest.models import ApiToken
+
+
+class Command(BaseCommand):
+    help = "Create, list and revoke bearer tokens for /api/*."
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest="action", required=True)
+        create = sub.add_parser("create", help="Create a token and print it (shown only once)")
+        create.add_argument("name")
+        create.add_argument("--expires-days", type=int, help="Expire after this many days (default: never)")
+        sub.add_parser("list", help="List tokens (prefix, name, last use, status)")
+        revoke = sub.add_parser("revoke", help="Revoke tokens by prefix or ID")
+        revoke.add_argument("prefix", nargs="?")
+        revoke.add_argument("--id", type=int)
+
+    def handle(self, *args, **options):
+        action = options["action"]
+        if action == "create":
+            expires_at = None
+            if options["expires_days"]:
+                expires_at = timezone.now() + timedelta(days=options["expires_days"])
+            api_token, token = create_token(options["name"], expires_at)
+            self.stdout.write("Created token %s (%s). Store it now, it cannot be shown again:" % (api_token.id, api_token.name))
+            self.stdout.write(token)
+        elif action == "list":
+            now = timezone.now()
+            for t in ApiToken.objects.all():
+                if t.revoked_at:
+                    state = "revoked %s" % t.revoked_at.date()
+                elif t.expires_at and t.expires_at <= now:
+                    state = "expired"
+                else:
+                    state = "active"
+                self.stdout.write(
+                    "%s\t%s…\t%s\tlast used %s\t%s" % (t.id, t.prefix, t.name, t.last_used_at or "never", state)
+                )
+        else:
+            if options["id"]:
+                tokens = ApiToken.objects.filter(id=options["id"])
+            elif options["prefix"]:
+                tokens = ApiToken.objects.filter(prefix__startswith=options["prefix"])
+            else:
+                raise CommandError("Give a token prefix or --id")
+            if not tokens.exists():
+                raise CommandError("No matching token")
+            self.stdout.write("Revoked %s token(s)" % revoke_tokens(tokens))
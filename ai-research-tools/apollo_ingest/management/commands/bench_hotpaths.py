@@ -0,0 +1,87 @@
+"""
+Microbenchmarks for the per-request functions in apollo_ingest.views (see apollo_ingest.benchmarks).
+
+    python manage.py bench_hotpaths                        # run, compare with the saved baseline
+    python manage.py bench_hotpaths --save-baseline        # record a new baseline
+    python manage.py bench_hotpaths --only normalize_people --sizes 100,10000
+
+Exits non-zero when a function got slower than --threshold (or allocates more than
+--alloc-threshold) compared with the baseline. Timings are machine-specific: record the
+baseline on the machine that runs the comparison.
+"""
+
+import json
+import platform
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apollo_ingest.benchmarks import BENCHMARKS, SIZES, compare, run_benchmark
+
+DEFAULT_BASELINE = Path(__file__).resolve().parents[2] / "benchmarks_baseline.json"
+
+
+class Command(BaseCommand):
+    help = "Benchmark normalize_*, build_*_payload, _merge_enriched_into_people and _sanitize_filename."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default=",".join(str(s) for s in SIZES), help="Comma-separated record counts")
+        parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="Run only these functions")
+        parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per measurement")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON file")
+        parser.add_argument("--save-baseline", action="store_true", help="Write results to --baseline")
+        parser.add_argument("--threshold", type=float, default=0.25, help="Allowed time regression (0.25 = +25%%)")
+        parser.add_argument("--alloc-threshold", type=float, default=0.10, help="Allowed peak allocation regression")
+        parser.add_argument("--output", default=None, help="Also write results JSON here")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(s) for s in options["sizes"].split(",") if s.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be comma-separated integers")
+        names = options["only"] or list(BENCHMARKS)
+
+        results = []
+        self.stdout.write(
+            "%-30s %7s %12s %12s %14s %10s" % ("function", "size", "best us", "median us", "peak alloc KB", "blocks")
+        )
+        for name in names:
+            for size in sizes:
+                r = run_benchmark(name, size, rounds=options["rounds"])
+                results.append(r)
+                self.stdout.write(
+                    "%-30s %7d %12.1f %12.1f %14.1f %10d"
+                    % (name, size, r["best_us"], r["median_us"], r["alloc_peak_bytes"] / 1024, r["alloc_blocks"])
+                )
+
+        report = {
+            "python": sys.version.split()[0],
+            "machine": platform.machine(),
+            "results": results,
+        }
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(report, indent=2) + "\n")
+
+        baseline_path = Path(options["baseline"])
+        if options["save_baseline"]:
+            baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS("Saved baseline to %s" % baseline_path))
+            return
+        if not baseline_path.exists():
+            self.stdout.write("No baseline at %s (run with --save-baseline to record one)" % baseline_path)
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        if baseline.get("python") != report["python"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    "Baseline was recorded on Python %s, this is %s" % (baseline.get("python"), report["python"])
+                )
+            )
+        regressions = compare(results, baseline, options["threshold"], options["alloc_threshold"])
+        if regressions:
+            for msg in regressions:
+                self.stderr.write("REGRESSION " + msg)
+            raise CommandError("%d benchmark regression(s) against %s" % (len(regressions), baseline_path))
+        self.stdout.write(self.style.SUCCESS("No regressions against %s" % baseline_path))
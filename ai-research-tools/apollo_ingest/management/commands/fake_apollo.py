@@ -0,0 +1,76 @@
+"""
+Run the local Apollo stand-in (apollo_ingest.fake_apollo).
+
+    python manage.py fake_apollo --port 8765 --latency-ms 300 --jitter-ms 100 \
+        --error-rate 0.02 --rate-limit-per-minute 200
+
+Then start the app with APOLLO_API_BASE_URL / APOLLO_APP_BASE_URL pointing at it.
+Record real responses with APOLLO_RECORD_DIR=<dir> and replay them with --replay <dir>.
+"""
+
+from django.core.management.base import BaseCommand
+
+from apollo_ingest.fake_apollo import FakeApolloConfig, FakeApolloServer
+
+
+class Command(BaseCommand):
+    help = "Serve a fake Apollo API (companies, people, bulk_match, tags) for offline testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency-ms", type=float, default=0.0, help="Mean added latency per call")
+        parser.add_argument("--jitter-ms", type=float, default=0.0, help="Latency +/- uniform jitter")
+        parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with 5xx")
+        parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of calls answered with 429")
+        parser.add_argument(
+            "--rate-limit-per-minute",
+            type=int,
+            default=0,
+            help="Per-API-key calls per minute before 429 (0 = unlimited)",
+        )
+        parser.add_argument("--daily-limit", type=int, default=0, help="Per-API-key calls per day (0 = unlimited)")
+        parser.add_argument("--total-entries", type=int, default=2500, help="Result count of an unfiltered company search")
+        parser.add_argument(
+            "--domain-match-rate",
+            type=float,
+            default=0.8,
+            help="Fraction of domains in q_organization_domains_list that resolve to an organization",
+        )
+        parser.add_argument("--replay", default=None, help="Directory of recorded fixtures (APOLLO_RECORD_DIR)")
+        parser.add_argument(
+            "--replay-only",
+            action="store_true",
+            help="With --replay: answer 404 for requests without a fixture instead of synthesizing",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed for latency/error randomness")
+        parser.add_argument("--verbose-requests", action="store_true", help="Log every request")
+
+    def handle(self, *args, **options):
+        config = FakeApolloConfig(
+            latency_ms=options["latency_ms"],
+            jitter_ms=options["jitter_ms"],
+            error_rate=options["error_rate"],
+            throttle_rate=options["throttle_rate"],
+            rate_limit_per_minute=options["rate_limit_per_minute"],
+            daily_limit=options["daily_limit"],
+            total_entries=options["total_entries"],
+            domain_match_rate=options["domain_match_rate"],
+            replay_dir=options["replay"],
+            replay_only=options["replay_only"],
+            seed=options["seed"],
+        )
+        server = FakeApolloServer(
+            (options["host"], options["port"]), config, verbose=options["verbose_requests"]
+        )
+        self.stdout.write(
+            "Fake Apollo listening on %s\n"
+            "  APOLLO_API_BASE_URL=%s\n  APOLLO_APP_BASE_URL=%s"
+            % (server.base_url, server.base_url, server.base_url)
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
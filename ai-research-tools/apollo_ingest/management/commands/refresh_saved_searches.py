@@ -0,0 +1,50 @@
+"""
+Refresh saved company searches and record what changed (run from cron / a scheduler).
+
+    python manage.py refresh_saved_searches              # all active searches
+    python manage.py refresh_saved_searches --id 3 --id 7
+
+Each refresh fetches every page up to the search's max_pages; see apollo_ingest/saved_searches.py.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apollo_ingest.models import SavedSearch
+from apollo_ingest.saved_searches import refresh_saved_search
+
+
+class Command(BaseCommand):
+    help = "Re-run saved searches, snapshot the results and write new/removed/changed organizations to the change feed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--id", type=int, action="append", dest="ids", help="Only this saved search (repeatable)")
+
+    def handle(self, *args, **options):
+        searches = SavedSearch.objects.all()
+        if options["ids"]:
+            searches = searches.filter(id__in=options["ids"])
+        else:
+            searches = searches.filter(active=True)
+        failures = 0
+        for search in searches:
+            try:
+                s = refresh_saved_search(search)
+            except Exception as e:
+                failures += 1
+                self.stderr.write("%s (%s): refresh failed: %s" % (search.id, search.name, e))
+                continue
+            self.stdout.write(
+                "%s (%s): %s organizations, pages fetched=%s%s | new=%s removed=%s changed=%s"
+                % (
+                    search.id,
+                    search.name,
+                    s["organizations"],
+                    s["pages_fetched"],
+                    " (truncated at max_pages)" if s["truncated"] else "",
+                    s["new"],
+                    s["removed"],
+                    s["changed"],
+                )
+            )
+        if failures:
+            raise CommandError("%s saved search(es) failed to refresh" % failures)
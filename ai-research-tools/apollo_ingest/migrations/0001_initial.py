@@ -0,0 +1,67 @@
+# Generated by Django 6.0.1 on 2026-10-19 00:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedSearch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('payload', models.JSONField()),
+                ('payload_hash', models.CharField(db_index=True, max_length=64)),
+                ('max_pages', models.PositiveIntegerField(default=5)),
+                ('active', models.BooleanField(default=True)),
+                ('refresh_count', models.PositiveIntegerField(default=0)),
+                ('last_refreshed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['name', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('total_entries', models.PositiveIntegerField(default=0)),
+                ('pages', models.JSONField(default=list)),
+                ('page_fingerprints', models.JSONField(default=list)),
+                ('pages_fetched', models.PositiveIntegerField(default=0)),
+                ('pages_reused', models.PositiveIntegerField(default=0)),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='apollo_ingest.savedsearch')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'get_latest_by': 'id',
+            },
+        ),
+        migrations.CreateModel(
+            name='SavedSearchChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('organization_id', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('new', 'New'), ('removed', 'Removed'), ('changed', 'Changed')], max_length=10)),
+                ('fields', models.JSONField(blank=True, default=dict)),
+                ('organization', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('saved_search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='apollo_ingest.savedsearch')),
+                ('snapshot', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='changes', to='apollo_ingest.savedsearchsnapshot')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['saved_search', 'id'], name='apollo_inge_saved_s_e6674d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-19 01:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apollo_ingest', '0002_api_token'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='savedsearchsnapshot',
+            name='page_fingerprints',
+        ),
+        migrations.RemoveField(
+            model_name='savedsearchsnapshot',
+            name='pages_reused',
+        ),
+    ]
@@ -1,3 +1,78 @@
 from django.db import models
 
-# Create your models here.
+
+class SavedSearch(models.Model):
+    """Company search filters kept for scheduled re-runs (see saved_searches.py)."""
+
+    name = models.CharField(max_length=200)
+    # Canonical mixed_companies/search payload without page / per_page
+    payload = models.JSONField()
+    payload_hash = models.CharField(max_length=64, db_index=True)
+    max_pages = models.PositiveIntegerField(default=5)
+    active = models.BooleanField(default=True)
+    refresh_count = models.PositiveIntegerField(default=0)
+    last_refreshed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["name", "id"]
+
+    def __str__(self):
+        return self.name
+
+
+class SavedSearchSnapshot(models.Model):
+    """Results of one refresh: per page, the tracked fields of each organization."""
+
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="snapshots")
+    created_at = models.DateTimeField(auto_now_add=True)
+    total_entries = models.PositiveIntegerField(default=0)
+    # [[{id, name, primary_domain, estimated_num_employees, annual_revenue}, ...], ...]
+    pages = models.JSONField(default=list)
+    pages_fetched = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-id"]
+        get_latest_by = "id"
+
+
+class SavedSearchChange(models.Model):
+    """One organization-level difference between two consecutive snapshots (the change feed)."""
+
+    NEW = "new"
+    REMOVED = "removed"
+    CHANGED = "changed"
+    KIND_CHOICES = [(NEW, "New"), (REMOVED, "Removed"), (CHANGED, "Changed")]
+
+    saved_search = models.ForeignKey(SavedSearch, on_delete=models.CASCADE, related_name="changes")
+    snapshot = models.ForeignKey(SavedSearchSnapshot, on_delete=models.SET_NULL, null=True, related_name="changes")
+    organization_id = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # field -> [old, new] for "changed"
+    fields = models.JSONField(default=dict, blank=True)
+    organization = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [models.Index(fields=["saved_search", "id"])]
+
+
+class ApiToken(models.Model):
+    """Bearer token for scripted /api/* clients; only a SHA-256 of the token is stored (see api_tokens.py)."""
+
+    name = models.CharField(max_length=200)
+    # First characters of the token, to tell tokens apart in lists and logs
+    prefix = models.CharField(max_length=12, db_index=True)
+    token_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return "%s (%s…)" % (self.name, self.prefix)
@@ -0,0 +1,289 @@
+"""
+Apollo → UI field mapping, declared once and compiled into normalizer functions.
+
+COMPANY and PERSON list the output fields in order with where each comes from:
+
+- "key"                  record.get("key")
+- First(a, b, ...)       first truthy of record.get(a), record.get(b), ... (else the last value)
+- SearchText(...)        lower-cased, space-joined text of the truthy values (for client-side search)
+- Computed(func, *keys)  func(record.get(key), ...), or func(record) without keys
+
+RecordSchema.many(mode) compiles the mapping into one generated loop: no per-field dispatch at
+run time, and each source key is read once per record. Modes:
+
+- "dict":   JSON-ready dicts, for API responses
+- "record": compact __slots__ objects (CompanyRecord / PersonRecord) with .get() and [] access,
+            for internal pipelines (export, caches); convert with schema.to_dict() at the boundary
+- "tuple":  plain tuples in schema.names order
+
+schema.subset(names) is a schema with only those fields (in that order), compiled the same way:
+sources of the fields left out are never read or computed (sparse fieldsets in the APIs).
+"""
+
+import keyword
+
+MODES = ("dict", "record", "tuple")
+# Cached subset schemas per schema (field lists come from API clients)
+MAX_SUBSETS = 256
+
+
+class First:
+    """First truthy of several source keys."""
+
+    def __init__(self, *keys):
+        self.keys = keys
+
+
+class SearchText:
+    """Lower-cased, space-joined text of the truthy source values."""
+
+    def __init__(self, *keys):
+        self.keys = keys
+
+
+class Computed:
+    """Value computed from source values (or from the whole record when no keys are given)."""
+
+    def __init__(self, func, *keys):
+        self.func = func
+        self.keys = keys
+
+
+def phone_numbers(numbers) -> list:
+    """Apollo phone_numbers → list of numbers (sanitized, falling back to raw)."""
+    if not numbers:
+        return []
+    return [p.get("sanitized_number") or p.get("raw_number") for p in numbers if p]
+
+
+def _make_record_class(class_name: str, names: tuple) -> type:
+    """__slots__ class with a positional __init__ and dict-like get / [] access."""
+    init_src = "def __init__(self, %s):\n%s\n" % (
+        ", ".join(names),
+        "\n".join("    self.%s = %s" % (n, n) for n in names),
+    )
+    ns = {}
+    exec(compile(init_src, "<%s.__init__>" % class_name, "exec"), ns)
+
+    def get(self, name, default=None):
+        return getattr(self, name, default) if name in names else default
+
+    def __getitem__(self, name):
+        if name not in names:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        if name not in names:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return all(getattr(self, n) == getattr(other, n) for n in names)
+
+    def __repr__(self):
+        return "%s(%s)" % (class_name, ", ".join("%s=%r" % (n, getattr(self, n)) for n in names))
+
+    def _asdict(self):
+        return {n: getattr(self, n) for n in names}
+
+    return type(
+        class_name,
+        (),
+        {
+            "__slots__": names,
+            "__module__": __name__,
+            "__init__": ns["__init__"],
+            "__hash__": None,
+            "fields": names,
+            "get": get,
+            "__getitem__": __getitem__,
+            "__setitem__": __setitem__,
+            "__eq__": __eq__,
+            "__repr__": __repr__,
+            "_asdict": _asdict,
+        },
+    )
+
+
+class RecordSchema:
+    """Ordered field mapping from an Apollo record to a normalized record."""
+
+    def __init__(self, name: str, record_class_name: str, fields: tuple):
+        self.name = name
+        self.fields = tuple(fields)
+        self.names = tuple(f for f, _ in self.fields)
+        for n in self.names:
+            if not n.isidentifier() or keyword.iskeyword(n):
+                raise ValueError("Field name must be an identifier: %r" % n)
+        self.record_class = _make_record_class(record_class_name, self.names)
+        self._compiled = {}
+        self._subsets = {}
+
+    def _source(self, ns: dict) -> tuple:
+        """
+        Generated loop-body lines and one expression per field. Source keys read by more than
+        one field are fetched once into a local; the rest are read inline with r.get(...).
+        """
+        uses = {}
+        for _, source in self.fields:
+            keys = (source,) if isinstance(source, str) else getattr(source, "keys", ())
+            for k in keys:
+                uses[k] = uses.get(k, 0) + 1
+        shared = {k: "v%d" % i for i, k in enumerate(k for k, n in uses.items() if n > 1)}
+        lines = ["%s = r.get(%r)" % (var, k) for k, var in shared.items()]
+
+        def read(k):
+            return shared.get(k) or "r.get(%r)" % k
+
+        exprs = []
+        for i, (_, source) in enumerate(self.fields):
+            if isinstance(source, str):
+                exprs.append(read(source))
+            elif isinstance(source, First):
+                exprs.append("(%s)" % " or ".join(read(k) for k in source.keys))
+            elif isinstance(source, SearchText):
+                # List comprehension over a tuple: cheaper than join() over a generator
+                exprs.append(
+                    '" ".join([str(v).strip() for v in (%s,) if v]).lower()'
+                    % ", ".join(read(k) for k in source.keys)
+                )
+            elif isinstance(source, Computed):
+                ns["_f%d" % i] = source.func
+                args = ", ".join(read(k) for k in source.keys) if source.keys else "r"
+                exprs.append("_f%d(%s)" % (i, args))
+            else:
+                raise TypeError("Unsupported field source for %s: %r" % (self.names[i], source))
+        return lines, exprs
+
+    def many(self, mode: str = "dict"):
+        """Compiled function: list of Apollo records → list of normalized records in `mode`."""
+        func = self._compiled.get(mode)
+        if func is not None:
+            return func
+        if mode not in MODES:
+            raise ValueError("Unknown mode %r (expected one of %s)" % (mode, ", ".join(MODES)))
+        ns = {"_Record": self.record_class}
+        lines, exprs = self._source(ns)
+        if mode == "dict":
+            item = "{%s}" % ", ".join("%r: %s" % (n, e) for n, e in zip(self.names, exprs))
+        elif mode == "tuple":
+            item = "(%s,)" % ", ".join(exprs)
+        else:
+            item = "_Record(%s)" % ", ".join(exprs)
+        fname = "normalize_%s_%s" % (self.name, mode)
+        if lines:
+            body = ["out = []", "append = out.append", "for r in records:"]
+            body += ["    " + line for line in lines]
+            body += ["    append(%s)" % item, "return out"]
+        else:
+            body = ["return [%s for r in records]" % item]
+        src = "def %s(records):\n%s\n" % (fname, "\n".join("    " + line for line in body))
+        exec(compile(src, "<%s>" % fname, "exec"), ns)
+        func = self._compiled[mode] = ns[fname]
+        return func
+
+    def subset(self, names) -> "RecordSchema":
+        """Schema with only `names` (in the given order, duplicates dropped); cached. ValueError on unknown names."""
+        names = tuple(dict.fromkeys(names))
+        schema = self._subsets.get(names)
+        if schema is not None:
+            return schema
+        unknown = [n for n in names if n not in self.names]
+        if unknown or not names:
+            raise ValueError(
+                "Unknown %s field(s): %s (available: %s)"
+                % (self.name, ", ".join(unknown) or "none given", ", ".join(self.names))
+            )
+        by_name = dict(self.fields)
+        schema = RecordSchema(
+            "%s_%d" % (self.name, len(self._subsets) + 1),
+            self.record_class.__name__ + "Subset",
+            tuple((n, by_name[n]) for n in names),
+        )
+        if len(self._subsets) < MAX_SUBSETS:
+            self._subsets[names] = schema
+        return schema
+
+    def one(self, record: dict, mode: str = "dict"):
+        """Normalize a single Apollo record."""
+        return self.many(mode)([record])[0]
+
+    def to_dict(self, item) -> dict:
+        """JSON dict from a record or tuple produced by this schema (dicts pass through)."""
+        if isinstance(item, dict):
+            return item
+        if isinstance(item, tuple):
+            return dict(zip(self.names, item))
+        return item._asdict()
+
+
+def _person_name(r: dict):
+    return r.get("name") or f"{r.get('first_name', '')} {r.get('last_name', '')}".strip()
+
+
+def _organization_name(org):
+    return org.get("name") if org else None
+
+
+COMPANY = RecordSchema(
+    "company",
+    "CompanyRecord",
+    (
+        ("id", "id"),
+        ("name", "name"),
+        ("primary_domain", "primary_domain"),
+        ("logo_url", "logo_url"),
+        ("industry", "industry"),
+        ("estimated_num_employees", "estimated_num_employees"),
+        ("city", First("organization_city", "city")),
+        ("state", First("organization_state", "state")),
+        ("country", First("organization_country", "country")),
+        # All location-related fields (HQ + other offices) for search/filter
+        (
+            "searchable_location_string",
+            SearchText(
+                "organization_raw_address",
+                "raw_address",
+                "organization_city",
+                "organization_state",
+                "organization_country",
+                "city",
+                "state",
+                "country",
+            ),
+        ),
+        ("linkedin_url", "linkedin_url"),
+        ("founded_year", "founded_year"),
+        ("annual_revenue", "organization_revenue"),
+        ("annual_revenue_printed", "organization_revenue_printed"),
+        ("phone", "phone"),
+        ("website_url", "website_url"),
+    ),
+)
+
+PERSON = RecordSchema(
+    "person",
+    "PersonRecord",
+    (
+        ("id", "id"),
+        ("first_name", "first_name"),
+        ("last_name", "last_name"),
+        ("name", Computed(_person_name)),
+        ("email", "email"),
+        ("title", "title"),
+        ("seniority", "seniority"),
+        ("city", "city"),
+        ("state", "state"),
+        ("country", "country"),
+        ("linkedin_url", "linkedin_url"),
+        ("phone_numbers", Computed(phone_numbers, "phone_numbers")),
+        ("organization_name", Computed(_organization_name, "organization")),
+    ),
+)
+
+# Module-level names so records pickle (export workers, caches)
+CompanyRecord = COMPANY.record_class
+PersonRecord = PERSON.record_class
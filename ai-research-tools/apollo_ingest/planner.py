@@ -0,0 +1,124 @@
+"""
+Dry-run planner: Apollo calls, credits and wall time of a search or export, without calling Apollo.
+
+Inputs come from what this process already knows:
+
+- cached responses (the stale cache in apollo_service, one entry per exact request) give the
+  number of people a company's people search returns, so its enrichment is known exactly.
+  Companies without a cached search are planned at the upper bound (per_page people each),
+  plus the unfiltered retry get_people_for_company makes when filters match nobody.
+- measured latencies (apollo_request_duration_seconds averages per endpoint) turn calls into
+  seconds; DEFAULT_LATENCY_SECONDS is used for endpoints not called yet in this process.
+- credits are the CREDITS_* estimates the request logs use.
+
+Exports fetch company by company and enrich in batches of ENRICH_BATCH_SIZE, one call at a
+time, so their wall time is the sum of the calls; a search is one call (plus enrichment).
+"""
+
+import math
+
+from .apollo_service import (
+    APOLLO_COMPANY_SEARCH_URL,
+    APOLLO_LATENCY,
+    APOLLO_PEOPLE_BULK_ENRICH_URL,
+    APOLLO_PEOPLE_SEARCH_URL,
+    CREDITS_COMPANY_SEARCH,
+    CREDITS_ENRICH_PER_PERSON,
+    CREDITS_PEOPLE_SEARCH,
+    ENDPOINT_NAMES,
+    ENRICH_BATCH_SIZE,
+    cached_response,
+)
+
+# Seconds per call before any has been measured (typical Apollo latencies)
+DEFAULT_LATENCY_SECONDS = {
+    APOLLO_COMPANY_SEARCH_URL: 1.5,
+    APOLLO_PEOPLE_SEARCH_URL: 1.0,
+    APOLLO_PEOPLE_BULK_ENRICH_URL: 1.0,
+}
+
+
+class Plan:
+    """Accumulates calls and credits per endpoint."""
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.calls = {url: 0 for url in DEFAULT_LATENCY_SECONDS}
+        self.credits = 0
+        self.cached_counts = 0
+        self.estimated_counts = 0
+
+    def add(self, url: str, calls: int, credits: int = 0):
+        self.calls[url] += calls
+        self.credits += credits
+
+    def enrich(self, people: int):
+        self.add(APOLLO_PEOPLE_BULK_ENRICH_URL, math.ceil(people / ENRICH_BATCH_SIZE), people * CREDITS_ENRICH_PER_PERSON)
+
+    def as_dict(self, **extra) -> dict:
+        latencies = {}
+        seconds = 0.0
+        for url, calls in self.calls.items():
+            measured = APOLLO_LATENCY.mean(endpoint=ENDPOINT_NAMES[url])
+            latency = measured if measured is not None else DEFAULT_LATENCY_SECONDS[url]
+            latencies[ENDPOINT_NAMES[url]] = {"seconds": round(latency, 3), "measured": measured is not None}
+            seconds += calls * latency
+        return {
+            "operation": self.operation,
+            "apollo_calls": {ENDPOINT_NAMES[url]: calls for url, calls in self.calls.items()},
+            "total_calls": sum(self.calls.values()),
+            "estimated_credits": self.credits,
+            "estimated_seconds": round(seconds, 1),
+            "latency_per_call": latencies,
+            # People counts from cached responses vs assumed (per_page)
+            "cached_counts": self.cached_counts,
+            "estimated_counts": self.estimated_counts,
+            **extra,
+        }
+
+
+def _people_count(plan: Plan, payload: dict):
+    """People a people search returns: from the cache when possible (None = unknown)."""
+    response = cached_response(APOLLO_PEOPLE_SEARCH_URL, payload)
+    if response is None:
+        plan.estimated_counts += 1
+        return None
+    plan.cached_counts += 1
+    return len([p for p in response.get("people") or [] if p.get("id")])
+
+
+def plan_company_search(payload: dict) -> Plan:
+    plan = Plan("company_search")
+    plan.add(APOLLO_COMPANY_SEARCH_URL, 1, CREDITS_COMPANY_SEARCH)
+    return plan
+
+
+def plan_people_search(payload: dict, enrich: bool) -> Plan:
+    plan = Plan("people_search")
+    plan.add(APOLLO_PEOPLE_SEARCH_URL, 1, CREDITS_PEOPLE_SEARCH)
+    if enrich:
+        count = _people_count(plan, payload)
+        plan.enrich(payload.get("per_page", 25) if count is None else count)
+    return plan
+
+
+def plan_export(companies: list) -> Plan:
+    """
+    `companies`: (has_people, payload, fallback_payload) per exported company, where payload is
+    the people search get_people_for_company would send and fallback_payload its unfiltered
+    retry (None when there are no filters to drop).
+    """
+    plan = Plan("export")
+    for has_people, payload, fallback_payload in companies:
+        if has_people:
+            continue
+        plan.add(APOLLO_PEOPLE_SEARCH_URL, 1, CREDITS_PEOPLE_SEARCH)
+        count = _people_count(plan, payload)
+        if count == 0 and fallback_payload is not None:
+            plan.add(APOLLO_PEOPLE_SEARCH_URL, 1, CREDITS_PEOPLE_SEARCH)
+            count = _people_count(plan, fallback_payload)
+        elif count is None and fallback_payload is not None:
+            # Unknown: the retry may happen, but then the first search found nobody to enrich
+            plan.add(APOLLO_PEOPLE_SEARCH_URL, 1, CREDITS_PEOPLE_SEARCH)
+        plan.enrich(payload["per_page"] if count is None else count)
+    return plan
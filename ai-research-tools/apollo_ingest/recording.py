@@ -0,0 +1,79 @@
+"""
+Record real Apollo responses as fixtures, and look them up again for replay.
+
+Set APOLLO_RECORD_DIR and every successful Apollo call made by apollo_service is written to
+that directory as one JSON file (endpoint, query params, request body, status, response).
+API keys are never written. The fake Apollo server (`manage.py fake_apollo --replay DIR`)
+serves those files back for identical requests, so flows can be replayed offline and
+without spending credits.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def fixture_key(endpoint: str, body: Optional[dict], params: Optional[dict] = None) -> str:
+    """Stable key for a request: endpoint name + canonical JSON of body and params."""
+    raw = json.dumps(
+        [endpoint, body or {}, {k: str(v) for k, v in (params or {}).items()}],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def fixture_path(directory, endpoint: str, body: Optional[dict], params: Optional[dict] = None) -> Path:
+    slug = endpoint.strip("/").replace("/", "__")
+    return Path(directory) / ("%s-%s.json" % (slug, fixture_key(endpoint, body, params)))
+
+
+def record_dir() -> Optional[str]:
+    return (os.getenv("APOLLO_RECORD_DIR") or "").strip() or None
+
+
+def record_fixture(
+    endpoint: str,
+    body: Optional[dict],
+    params: Optional[dict],
+    status_code: int,
+    data: dict,
+) -> None:
+    """Write one fixture if recording is enabled (APOLLO_RECORD_DIR). Never raises."""
+    directory = record_dir()
+    if not directory:
+        return
+    try:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        path = fixture_path(directory, endpoint, body, params)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "endpoint": endpoint,
+                    "params": {k: str(v) for k, v in (params or {}).items()},
+                    "body": body or {},
+                    "status": status_code,
+                    "response": data,
+                },
+                f,
+                sort_keys=True,
+                default=str,
+            )
+        os.replace(tmp, path)
+    except Exception:
+        logger.warning("Could not record Apollo fixture for %s", endpoint, exc_info=True)
+
+
+def load_fixture(directory, endpoint: str, body: Optional[dict], params: Optional[dict] = None) -> Optional[dict]:
+    """Recorded fixture for this exact request, or None."""
+    path = fixture_path(directory, endpoint, body, params)
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,156 @@
+"""
+Saved company searches: scheduled refresh and change feed.
+
+A SavedSearch stores the canonical build_apollo_payload() output. refresh_saved_search()
+re-runs it 100 organizations per page, up to max_pages (and no further than Apollo's last
+page), and records a snapshot of the tracked fields (TRACKED_FIELDS) per page.
+
+Every refresh fetches every page. Pages are not reused from the previous snapshot: Apollo
+gives no per-organization change signal, so a page can only be known to be unchanged by
+fetching it, and a reused page would hide employee count / revenue changes on it. max_pages
+is what bounds the credits a refresh costs.
+
+A refresh that gets a stale response (served from cache while Apollo's circuit is open) is
+aborted with StaleResults: nothing is saved and refresh_count is unchanged, so the next run
+compares against the last real snapshot.
+
+The new snapshot is diffed against the previous one by organization ID and each difference
+(new / removed / changed employee count or revenue) becomes a SavedSearchChange row; the
+change feed reads those rows in ID order. Only the first max_pages pages are compared: when a
+search has more results (summary "truncated"), organizations moving past that window show up
+as removed.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from django.db import transaction
+from django.utils import timezone
+
+from .apollo_service import search_companies
+from .models import SavedSearch, SavedSearchChange, SavedSearchSnapshot
+from .normalizers import COMPANY
+from .scheduler import BULK, priority
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+KEEP_SNAPSHOTS = max(1, int(os.getenv("SAVED_SEARCH_KEEP_SNAPSHOTS", "5")))
+# Differences recorded as "changed"
+TRACKED_FIELDS = ("estimated_num_employees", "annual_revenue")
+SNAPSHOT_FIELDS = ("id", "name", "primary_domain") + TRACKED_FIELDS
+
+
+class StaleResults(RuntimeError):
+    """Apollo served a cached page (circuit open); the refresh was not recorded."""
+
+
+def canonical_payload(payload: dict) -> dict:
+    """Search payload without paging, with list filters sorted (same filters → same payload)."""
+    canonical = {}
+    for key, value in sorted(payload.items()):
+        if key in ("page", "per_page") or value in (None, "", [], {}):
+            continue
+        if isinstance(value, list):
+            value = sorted(value, key=str)
+        canonical[key] = value
+    return canonical
+
+
+def payload_hash(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _page_records(response: dict) -> list:
+    raw = response.get("organizations") or response.get("accounts") or []
+    return [{f: company[f] for f in SNAPSHOT_FIELDS} for company in COMPANY.many("dict")(raw)]
+
+
+def _diff(previous: dict, current: dict) -> list:
+    """(organization_id, kind, fields, organization) for each difference, in a stable order."""
+    changes = []
+    for org_id, org in current.items():
+        old = previous.get(org_id)
+        if old is None:
+            changes.append((org_id, SavedSearchChange.NEW, {}, org))
+            continue
+        fields = {f: [old.get(f), org.get(f)] for f in TRACKED_FIELDS if old.get(f) != org.get(f)}
+        if fields:
+            changes.append((org_id, SavedSearchChange.CHANGED, fields, org))
+    for org_id, old in previous.items():
+        if org_id not in current:
+            changes.append((org_id, SavedSearchChange.REMOVED, {}, old))
+    return changes
+
+
+def _by_id(pages: list) -> dict:
+    return {org["id"]: org for page in pages for org in page if org.get("id")}
+
+
+@priority(BULK)
+def refresh_saved_search(search: SavedSearch) -> dict:
+    """Fetch, snapshot and diff one saved search; returns a summary dict."""
+    previous = search.snapshots.first()
+    pages = []
+    total = 0
+    page = 1
+    while page <= search.max_pages:
+        response = search_companies(dict(search.payload, page=page, per_page=PER_PAGE))
+        if response.get("_stale"):
+            raise StaleResults("Apollo company search unavailable, got a cached page %s; refresh skipped" % page)
+        records = _page_records(response)
+        pages.append(records)
+        pagination = response.get("pagination") or {}
+        if page == 1:
+            total = pagination.get("total_entries") or len(records)
+        if page >= min(pagination.get("total_pages") or 1, search.max_pages):
+            break
+        page += 1
+
+    current = _by_id(pages)
+    changes = _diff(_by_id(previous.pages), current) if previous is not None else [
+        (org_id, SavedSearchChange.NEW, {}, org) for org_id, org in current.items()
+    ]
+    with transaction.atomic():
+        snapshot = SavedSearchSnapshot.objects.create(
+            saved_search=search,
+            total_entries=total,
+            pages=pages,
+            pages_fetched=len(pages),
+        )
+        SavedSearchChange.objects.bulk_create(
+            [
+                SavedSearchChange(
+                    saved_search=search,
+                    snapshot=snapshot,
+                    organization_id=org_id,
+                    kind=kind,
+                    fields=fields,
+                    organization=org,
+                )
+                for org_id, kind, fields, org in changes
+            ]
+        )
+        old_ids = list(search.snapshots.values_list("id", flat=True)[KEEP_SNAPSHOTS:])
+        if old_ids:
+            SavedSearchSnapshot.objects.filter(id__in=old_ids).delete()
+        search.refresh_count += 1
+        search.last_refreshed_at = timezone.now()
+        search.save(update_fields=["refresh_count", "last_refreshed_at", "updated_at"])
+
+    counts = {kind: 0 for kind, _ in SavedSearchChange.KIND_CHOICES}
+    for _, kind, _, _ in changes:
+        counts[kind] += 1
+    summary = {
+        "saved_search": search.id,
+        "snapshot": snapshot.id,
+        "total_entries": total,
+        "organizations": len(current),
+        "pages_fetched": snapshot.pages_fetched,
+        "truncated": total > search.max_pages * PER_PAGE,
+        **counts,
+    }
+    logger.info("Saved search %s (%s) refreshed: %s", search.id, search.name, summary)
+    return summary
@@ -0,0 +1,214 @@
+"""
+Priority-aware admission control for Apollo calls.
+
+Every Apollo HTTP attempt runs inside `get_scheduler().slot()`. Calls belong to one of two
+priority classes, taken from the current context (`with priority(BULK): ...`):
+
+- interactive: UI / API searches (default)
+- bulk: export and other fan-out work
+
+At most APOLLO_MAX_CONCURRENCY calls run at once per process, and bulk calls may never take
+the last APOLLO_INTERACTIVE_RESERVED slots. Waiting interactive calls are always admitted
+before waiting bulk calls. Each class has a bounded queue; a call that finds the queue full,
+or waits longer than its queue timeout / request deadline, is rejected with SchedulerRejected.
+Bulk calls also leave APOLLO_INTERACTIVE_RATE_RESERVE of each key's per-minute budget
+to interactive traffic (see key_pool.ApiKeyPool.acquire).
+"""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .deadline import DeadlineExceeded, remaining_time
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+PRIORITY_CLASSES = (INTERACTIVE, BULK)
+
+MAX_CONCURRENCY = int(os.getenv("APOLLO_MAX_CONCURRENCY", "8"))
+INTERACTIVE_RESERVED = int(os.getenv("APOLLO_INTERACTIVE_RESERVED", "2"))
+# Fraction of each key's per-minute budget that bulk calls leave for interactive ones
+INTERACTIVE_RATE_RESERVE = float(os.getenv("APOLLO_INTERACTIVE_RATE_RESERVE", "0.2"))
+QUEUE_LIMITS = {
+    INTERACTIVE: int(os.getenv("APOLLO_QUEUE_LIMIT_INTERACTIVE", "50")),
+    BULK: int(os.getenv("APOLLO_QUEUE_LIMIT_BULK", "200")),
+}
+QUEUE_TIMEOUTS = {
+    INTERACTIVE: float(os.getenv("APOLLO_QUEUE_TIMEOUT_INTERACTIVE", "15")),
+    BULK: float(os.getenv("APOLLO_QUEUE_TIMEOUT_BULK", "120")),
+}
+# Recent waits kept per class for percentiles
+WAIT_SAMPLES = 500
+
+_current_priority = contextvars.ContextVar("apollo_priority", default=INTERACTIVE)
+
+
+class SchedulerRejected(RuntimeError):
+    """Apollo call not admitted: queue full or waited too long for a slot."""
+
+    def __init__(self, priority_class: str, reason: str, retry_after: float = 1.0):
+        self.priority_class = priority_class
+        self.retry_after = retry_after
+        super().__init__(
+            "Apollo %s request not admitted: %s" % (priority_class, reason)
+        )
+
+
+def current_priority() -> str:
+    return _current_priority.get()
+
+
+@contextmanager
+def priority(priority_class: str):
+    """Run the block's Apollo calls in `priority_class` (INTERACTIVE or BULK)."""
+    if priority_class not in PRIORITY_CLASSES:
+        raise ValueError("Unknown priority class: %s" % priority_class)
+    token = _current_priority.set(priority_class)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _ClassStats:
+    __slots__ = ("admitted", "rejected", "timed_out", "waits", "max_wait")
+
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.waits = deque(maxlen=WAIT_SAMPLES)
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float) -> None:
+        self.admitted += 1
+        self.waits.append(seconds)
+        if seconds > self.max_wait:
+            self.max_wait = seconds
+
+    def wait_summary(self) -> dict:
+        waits = sorted(self.waits)
+        if not waits:
+            return {"avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+
+        def pct(p):
+            return waits[min(len(waits) - 1, int(p * len(waits)))] * 1000
+
+        return {
+            "avg_ms": round(sum(waits) / len(waits) * 1000, 1),
+            "p50_ms": round(pct(0.50), 1),
+            "p95_ms": round(pct(0.95), 1),
+            "max_ms": round(self.max_wait * 1000, 1),
+        }
+
+
+class ApolloScheduler:
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        interactive_reserved: int = INTERACTIVE_RESERVED,
+        queue_limits: dict = None,
+        queue_timeouts: dict = None,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.interactive_reserved = min(max(0, interactive_reserved), self.max_concurrency - 1)
+        self.queue_limits = dict(queue_limits or QUEUE_LIMITS)
+        self.queue_timeouts = dict(queue_timeouts or QUEUE_TIMEOUTS)
+        self._cond = threading.Condition()
+        self._in_flight = {c: 0 for c in PRIORITY_CLASSES}
+        self._waiting = {c: 0 for c in PRIORITY_CLASSES}
+        self._stats = {c: _ClassStats() for c in PRIORITY_CLASSES}
+
+    def _can_admit(self, priority_class: str) -> bool:
+        if sum(self._in_flight.values()) >= self.max_concurrency:
+            return False
+        if priority_class == BULK:
+            if self._waiting[INTERACTIVE]:
+                return False
+            if self._in_flight[BULK] >= self.max_concurrency - self.interactive_reserved:
+                return False
+        return True
+
+    @contextmanager
+    def slot(self, priority_class: str = None):
+        """Hold one Apollo concurrency slot for the block (waits in the class queue if needed)."""
+        priority_class = priority_class or current_priority()
+        stats = self._stats[priority_class]
+        started = time.monotonic()
+        with self._cond:
+            if not self._can_admit(priority_class):
+                if self._waiting[priority_class] >= self.queue_limits[priority_class]:
+                    stats.rejected += 1
+                    raise SchedulerRejected(priority_class, "queue full")
+                self._waiting[priority_class] += 1
+                # One absolute end for the whole wait: wake-ups (notify_all on every release)
+                # must not restart or shorten it
+                limit = self.queue_timeouts[priority_class]
+                left = remaining_time()
+                end = started + limit
+                if left is not None:
+                    end = min(end, time.monotonic() + left)
+                deadline_bound = end < started + limit
+                try:
+                    while not self._can_admit(priority_class):
+                        wait_left = end - time.monotonic()
+                        if wait_left <= 0:
+                            stats.timed_out += 1
+                            if deadline_bound:
+                                raise DeadlineExceeded(
+                                    "Request time budget exhausted waiting for an Apollo slot"
+                                )
+                            raise SchedulerRejected(
+                                priority_class, "waited %.0fs for a slot" % limit
+                            )
+                        self._cond.wait(wait_left)
+                finally:
+                    self._waiting[priority_class] -= 1
+                    # Bulk waiters may be blocked only by this waiter
+                    self._cond.notify_all()
+            self._in_flight[priority_class] += 1
+            stats.record_wait(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight[priority_class] -= 1
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        """Queue depth, in-flight calls and wait-time metrics per priority class."""
+        with self._cond:
+            classes = {}
+            for c in PRIORITY_CLASSES:
+                stats = self._stats[c]
+                classes[c] = {
+                    "queue_depth": self._waiting[c],
+                    "queue_limit": self.queue_limits[c],
+                    "in_flight": self._in_flight[c],
+                    "admitted": stats.admitted,
+                    "rejected": stats.rejected,
+                    "timed_out": stats.timed_out,
+                    "wait": stats.wait_summary(),
+                }
+            return {
+                "max_concurrency": self.max_concurrency,
+                "interactive_reserved": self.interactive_reserved,
+                "classes": classes,
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ApolloScheduler:
+    """Process-wide scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = ApolloScheduler()
+    return _scheduler
@@ -0,0 +1,86 @@
+"""
+HTTP caching for the GET variants of company / people search.
+
+A GET search is keyed by its canonical query: the Apollo payload with list filters sorted and
+empty filters dropped (saved_searches.canonical_payload), plus page, per_page and the response
+shape (fields / layout). The first request runs the search, serializes the body once and keeps
+(ETag, bytes) in the Django cache for SEARCH_CACHE_MAX_AGE seconds; the ETag is a hash of those
+bytes, so it only changes when the normalized result does. Repeats within that window are
+served from the cache without calling Apollo or rendering again, and a matching If-None-Match
+gets 304 Not Modified with no body.
+
+Responses carry `Cache-Control: private, max-age=SEARCH_CACHE_MAX_AGE` (private: the API is
+behind a login, shared caches must not keep it). Stale responses served during an Apollo
+outage and error responses are neither cached nor cacheable.
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+
+from config.renderers import dumps
+
+from .apollo_service import CACHE_REQUESTS
+from .saved_searches import canonical_payload
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_MAX_AGE = int(os.getenv("SEARCH_CACHE_MAX_AGE", "300"))
+
+
+def search_cache_key(kind: str, payload: dict, fields: tuple, columnar: bool) -> str:
+    query = [kind, canonical_payload(payload), payload.get("page"), payload.get("per_page"), list(fields), columnar]
+    raw = json.dumps(query, sort_keys=True, default=str)
+    return "search:get:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _not_modified(request, etag: str) -> bool:
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison (RFC 9110 13.1.2): W/"x" matches "x"
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in parse_etags(header))
+
+
+def _cached(request, etag: str, content: bytes, max_age: int):
+    response = HttpResponseNotModified() if _not_modified(request, etag) else HttpResponse(
+        content, content_type="application/json"
+    )
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, max-age=%d" % max_age
+    return response
+
+
+def cached_search_response(request, key: str, build):
+    """
+    Cached / conditional response for a GET search. `build()` runs the search and returns a DRF
+    Response; only 200 responses that are not stale are cached.
+    """
+    try:
+        entry = cache.get(key)
+    except Exception:
+        logger.warning("Search cache read failed", exc_info=True)
+        entry = None
+    CACHE_REQUESTS.inc(cache="search_get", result="miss" if entry is None else "hit")
+    if entry is not None:
+        return _cached(request, *entry, SEARCH_CACHE_MAX_AGE)
+
+    response = build()
+    if response.status_code != 200 or response.data.get("stale"):
+        response["Cache-Control"] = "no-store" if response.status_code != 200 else "no-cache"
+        return response
+    content = dumps(response.data)
+    etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+    if SEARCH_CACHE_MAX_AGE > 0:
+        try:
+            cache.set(key, (etag, content), SEARCH_CACHE_MAX_AGE)
+        except Exception:
+            logger.warning("Search cache write failed", exc_info=True)
+    return _cached(request, etag, content, SEARCH_CACHE_MAX_AGE)
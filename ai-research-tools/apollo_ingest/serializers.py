@@ -86,6 +86,100 @@ class CompanySearchSerializer(serializers.Serializer):
     )
 
 
+class PlanSerializer(serializers.Serializer):
+    """Serializer for the dry-run planner; the search operations also take that search's fields."""
+
+    operation = serializers.ChoiceField(
+        choices=["export", "company_search", "people_search"],
+        help_text="What to plan: export (body of /api/export/companies/) or a search",
+    )
+    companies = serializers.ListField(
+        child=serializers.DictField(),
+        required=False,
+        help_text="export: selected companies (id, name, domain, optional people[])",
+    )
+    job_titles = serializers.ListField(child=serializers.CharField(), required=False)
+    seniorities = serializers.ListField(child=serializers.CharField(), required=False)
+
+
+class DeepSearchSerializer(CompanySearchSerializer):
+    """Serializer for sharded deep company search request (page / per_page are ignored)."""
+
+    shard_by = serializers.ListField(
+        child=serializers.ChoiceField(choices=["employees", "locations", "industries"]),
+        min_length=1,
+        help_text="Dimensions to split the query along: employees, locations (needs 2+ locations_included), industries (needs 2+ industries)",
+    )
+    max_results = serializers.IntegerField(
+        required=False,
+        default=10000,
+        min_value=1,
+        help_text="Stop after this many unique organizations",
+    )
+
+
+class LookalikeCrawlSerializer(CompanySearchSerializer):
+    """Serializer for lookalike crawl request; the other filters apply to every lookalike search."""
+
+    seed_ids = serializers.ListField(
+        child=serializers.CharField(),
+        min_length=1,
+        max_length=50,
+        help_text="Apollo organization IDs to start from",
+    )
+    depth = serializers.IntegerField(
+        required=False, default=2, min_value=1, max_value=3, help_text="Lookalike hops from the seeds"
+    )
+    max_results = serializers.IntegerField(
+        required=False, default=500, min_value=1, help_text="Stop after this many organizations"
+    )
+    max_queries = serializers.IntegerField(
+        required=False,
+        default=100,
+        min_value=1,
+        help_text="Stop after this many lookalike searches (1 credit each)",
+    )
+
+
+class SavedSearchCreateSerializer(CompanySearchSerializer):
+    """Serializer for creating a saved search from company search filters."""
+
+    name = serializers.CharField(max_length=200, help_text="Name shown in lists and the change feed")
+    max_pages = serializers.IntegerField(
+        required=False,
+        default=5,
+        min_value=1,
+        max_value=100,
+        help_text="Pages of 100 organizations fetched per refresh",
+    )
+
+
+class SavedSearchSerializer(serializers.Serializer):
+    """Serializer for saved search response."""
+
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+    payload = serializers.JSONField(read_only=True)
+    max_pages = serializers.IntegerField(read_only=True)
+    active = serializers.BooleanField(read_only=True)
+    refresh_count = serializers.IntegerField(read_only=True)
+    last_refreshed_at = serializers.DateTimeField(read_only=True, allow_null=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+
+class SavedSearchChangeSerializer(serializers.Serializer):
+    """Serializer for one change feed entry."""
+
+    id = serializers.IntegerField(read_only=True)
+    saved_search_id = serializers.IntegerField(read_only=True)
+    snapshot_id = serializers.IntegerField(read_only=True, allow_null=True)
+    organization_id = serializers.CharField(read_only=True)
+    kind = serializers.CharField(read_only=True)
+    fields = serializers.JSONField(read_only=True)
+    organization = serializers.JSONField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+
 class CompanySerializer(serializers.Serializer):
     """Serializer for company response."""
 
@@ -176,3 +270,16 @@ class PeopleSearchResponseSerializer(serializers.Serializer):
     total_count = serializers.IntegerField()
     page = serializers.IntegerField()
     per_page = serializers.IntegerField()
+
+
+class DomainLookupSerializer(serializers.Serializer):
+    """Serializer for bulk domain lookup request (JSON body; a CSV/text upload also works)."""
+
+    domains = serializers.JSONField(
+        help_text="List of domains, or one string with domains separated by newlines / commas",
+    )
+
+    def validate_domains(self, value):
+        if not isinstance(value, (list, str)):
+            raise serializers.ValidationError("Expected a list of domains or a string.")
+        return value
@@ -0,0 +1,197 @@
+"""
+Sharded deep company search: one logical query split into partitions that are searched in
+parallel, to get past the 100-per-page limit (serial paging) and Apollo's pagination depth cap.
+
+shard_payloads() takes a mixed_companies/search payload (from build_apollo_payload) and splits
+it along one or more dimensions (the cartesian product when several are given):
+
+- "employees":  organization_num_employees_ranges, one shard per EMPLOYEE_BUCKETS range that
+                overlaps the query's employee range
+- "locations":  organization_locations, one shard per included location
+- "industries": organization_industry_tag_ids, one shard per industry tag ID
+
+deep_search() fetches page 1 of every shard concurrently (at bulk priority), then the remaining
+pages of all shards round-robin, and yields NDJSON-ready events as pages arrive:
+
+  {"type": "shard", "shard": ..., "total_entries": ..., "pages": ..., "truncated": ...}
+  {"type": "organization", "shard": ..., **company}       (each organization ID once)
+  {"type": "page_error", "shard": ..., "page": ..., "error": ...}
+  {"type": "summary", ...}                                 (last)
+
+A shard is "truncated" when it has more results than DEEP_SEARCH_MAX_PAGES pages; split it
+further (add a dimension) to reach them.
+"""
+
+import itertools
+import logging
+import os
+
+from .apollo_service import search_companies
+from .deadline import request_deadline
+from .fanout import fan_out
+from .normalizers import COMPANY
+from .scheduler import BULK, priority
+
+logger = logging.getLogger(__name__)
+
+SHARD_DIMENSIONS = ("employees", "locations", "industries")
+# Apollo's employee-count buckets (the UI's ranges); the last one is open-ended
+EMPLOYEE_BUCKETS = (
+    (1, 10),
+    (11, 20),
+    (21, 50),
+    (51, 100),
+    (101, 200),
+    (201, 500),
+    (501, 1000),
+    (1001, 2000),
+    (2001, 5000),
+    (5001, 10000),
+    (10001, 1000000),
+)
+DEEP_SEARCH_PER_PAGE = 100
+# Apollo stops paginating after 500 pages
+DEEP_SEARCH_MAX_PAGES = int(os.getenv("APOLLO_DEEP_SEARCH_MAX_PAGES", "500"))
+DEEP_SEARCH_MAX_RESULTS = int(os.getenv("APOLLO_DEEP_SEARCH_MAX_RESULTS", "50000"))
+MAX_SHARDS = int(os.getenv("APOLLO_DEEP_SEARCH_MAX_SHARDS", "200"))
+
+
+class ShardingError(ValueError):
+    """The query cannot be split along the requested dimension."""
+
+
+def _employee_shards(payload: dict) -> list:
+    low, high = 1, 1000000
+    ranges = payload.get("organization_num_employees_ranges") or []
+    if ranges:
+        try:
+            low, high = (int(v) for v in str(ranges[0]).split(","))
+        except ValueError:
+            raise ShardingError("Unsupported employee range %r" % ranges[0])
+    shards = []
+    for b_low, b_high in EMPLOYEE_BUCKETS:
+        lo, hi = max(low, b_low), min(high, b_high)
+        if lo <= hi:
+            shards.append(("employees=%s-%s" % (lo, hi), {"organization_num_employees_ranges": ["%s,%s" % (lo, hi)]}))
+    return shards
+
+
+def _list_shards(payload: dict, key: str, dimension: str) -> list:
+    values = payload.get(key) or []
+    if len(values) < 2:
+        raise ShardingError(
+            "Sharding by %s needs at least two values in the query (got %s)" % (dimension, len(values))
+        )
+    return [("%s=%s" % (dimension, v), {key: [v]}) for v in values]
+
+
+def shard_payloads(payload: dict, dimensions) -> list:
+    """[(label, payload)] partitions of the query; raises ShardingError."""
+    per_dimension = []
+    for dimension in dimensions:
+        if dimension == "employees":
+            per_dimension.append(_employee_shards(payload))
+        elif dimension == "locations":
+            per_dimension.append(_list_shards(payload, "organization_locations", dimension))
+        elif dimension == "industries":
+            per_dimension.append(_list_shards(payload, "organization_industry_tag_ids", dimension))
+        else:
+            raise ShardingError("Unknown shard dimension %r (expected %s)" % (dimension, ", ".join(SHARD_DIMENSIONS)))
+    shards = []
+    for combo in itertools.product(*per_dimension):
+        shard = dict(payload, page=1, per_page=DEEP_SEARCH_PER_PAGE)
+        for _, overrides in combo:
+            shard.update(overrides)
+        shards.append((" ".join(label for label, _ in combo), shard))
+    if len(shards) > MAX_SHARDS:
+        raise ShardingError("Query splits into %s shards (max %s)" % (len(shards), MAX_SHARDS))
+    return shards
+
+
+def _fetch_page(task: tuple) -> dict:
+    label, shard, page = task
+    return search_companies(dict(shard, page=page))
+
+
+def _round_robin(pages_by_shard: list):
+    """(label, payload, page) for pages 2.. of every shard, interleaved across shards."""
+
+    def pages(label, shard, last):
+        for page in range(2, last + 1):
+            yield label, shard, page
+
+    iterators = [pages(label, shard, last) for label, shard, last in pages_by_shard]
+    for tasks in itertools.zip_longest(*iterators):
+        for task in tasks:
+            if task is not None:
+                yield task
+
+
+def deep_search(shards: list, max_results: int, deadline_seconds: float):
+    """Generator of search events (see module docstring); runs Apollo calls while iterated."""
+    seen_ids = set()
+    calls = 0
+    duplicates = 0
+    failed_pages = 0
+    truncated = []
+    pages_by_shard = []
+    limit_reached = False
+
+    def collect(result):
+        nonlocal calls, duplicates, failed_pages, limit_reached
+        label, _, page = result.item
+        if not result.ok:
+            failed_pages += 1
+            logger.warning("Deep search: %s page %s failed: %s", label, page, result.error)
+            yield {"type": "page_error", "shard": label, "page": page, "error": str(result.error)}
+            return
+        response = result.value
+        if not response.get("_stale"):
+            calls += 1
+        if page == 1:
+            pagination = response.get("pagination") or {}
+            total = pagination.get("total_entries") or 0
+            pages = min(pagination.get("total_pages") or 1, DEEP_SEARCH_MAX_PAGES)
+            is_truncated = total > DEEP_SEARCH_MAX_PAGES * DEEP_SEARCH_PER_PAGE
+            if is_truncated:
+                truncated.append(label)
+            pages_by_shard.append((label, result.item[1], pages))
+            yield {"type": "shard", "shard": label, "total_entries": total, "pages": pages, "truncated": is_truncated}
+        raw = response.get("organizations") or response.get("accounts") or []
+        for company in COMPANY.many("dict")(raw):
+            if company["id"] in seen_ids:
+                duplicates += 1
+                continue
+            if len(seen_ids) >= max_results:
+                limit_reached = True
+                return
+            seen_ids.add(company["id"])
+            yield {"type": "organization", "shard": label, **company}
+
+    def run(tasks):
+        results = fan_out(_fetch_page, tasks)
+        try:
+            for result in results:
+                yield from collect(result)
+                if limit_reached:
+                    return
+        finally:
+            results.close()  # cancels pages not yet started
+
+    with request_deadline(deadline_seconds), priority(BULK):
+        yield from run([(label, shard, 1) for label, shard in shards])
+        if not limit_reached:
+            # Shards in query order, so the round-robin order doesn't depend on response timing
+            order = {label: i for i, (label, _) in enumerate(shards)}
+            pages_by_shard.sort(key=lambda s: order[s[0]])
+            yield from run(_round_robin(pages_by_shard))
+    yield {
+        "type": "summary",
+        "shards": len(shards),
+        "apollo_calls": calls,
+        "organizations": len(seen_ids),
+        "duplicates": duplicates,
+        "failed_pages": failed_pages,
+        "truncated_shards": truncated,
+        "limit_reached": limit_reached,
+    }
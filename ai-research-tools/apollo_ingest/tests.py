@@ -1,3 +1,1320 @@
-from django.test import TestCase
+import contextvars
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+import requests
+from django import forms
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from .fake_apollo import (
+    FakeApolloConfig,
+    FakeApolloServer,
+    company_search_response,
+    fake_match,
+    fake_organization,
+    fake_person,
+    people_search_response,
+)
+
+# apollo_service reads its URLs at import: point them at a local fake Apollo before anything
+# imports it, so no test can reach the real API or spend credits.
+FAKE_APOLLO = FakeApolloServer(("127.0.0.1", 0)).start()
+os.environ["APOLLO_API_BASE_URL"] = FAKE_APOLLO.base_url
+os.environ["APOLLO_APP_BASE_URL"] = FAKE_APOLLO.base_url
+
+from config.simple_auth import ADMIN_EMAIL, ADMIN_PASSWORD  # noqa: E402
+
+from . import apollo_service, circuit_breaker, views  # noqa: E402
+from .api_tokens import TOKEN_PREFIX, clear_cache, create_token, hash_token, revoke_tokens, verify_token  # noqa: E402
+from .apollo_service import (  # noqa: E402
+    APOLLO_ENRICH_BATCH_SIZE,
+    APOLLO_REQUESTS,
+    CACHE_REQUESTS,
+    CREDITS_COMPANY_SEARCH,
+    CREDITS_ENRICH_PER_PERSON,
+)
+from .circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, get_breaker  # noqa: E402
+from .companies_form import CompanySearchForm, PrerenderedSelectMultiple  # noqa: E402
+from .deadline import (  # noqa: E402
+    DeadlineExceeded,
+    clamp_timeout,
+    current_deadline,
+    remaining_time,
+    request_deadline,
+)
+from .domain_lookup import lookup_domains, parse_domains  # noqa: E402
+from .export_formats import CSV_INCOMPLETE_MARKER, CSV_SKIPPED_MARKER  # noqa: E402
+from .key_pool import ApiKeyPool, ApiKeysExhausted, get_key_pool  # noqa: E402
+from .lookalike_crawl import crawl  # noqa: E402
+from .models import ApiToken, SavedSearch, SavedSearchChange  # noqa: E402
+from .normalizers import COMPANY, PERSON  # noqa: E402
+from .planner import plan_export  # noqa: E402
+from .saved_searches import StaleResults, canonical_payload, payload_hash, refresh_saved_search  # noqa: E402
+from .scheduler import BULK, INTERACTIVE, ApolloScheduler, SchedulerRejected  # noqa: E402
+from .search_cache import SEARCH_CACHE_MAX_AGE  # noqa: E402
+from .workbooks import EXPORT_HEADER, WorkbookQueue, contact_rows, get_export_pool, workbook_bytes  # noqa: E402
+from .sharded_search import ShardingError, deep_search, shard_payloads  # noqa: E402
+
+if apollo_service.APOLLO_API_BASE_URL != FAKE_APOLLO.base_url:
+    raise ImproperlyConfigured("apollo_service was imported before the tests could point it at the fake Apollo server")
+
+
+class FakeApolloMixin:
+    """Fresh fake server behaviour, API keys, breakers and caches for every test."""
+
+    def setUp(self):
+        super().setUp()
+        # A stream stopped early leaves its started calls running: let them finish first
+        for thread in threading.enumerate():
+            if thread.name.startswith("apollo-fanout"):
+                thread.join(timeout=10)
+        FAKE_APOLLO.config = FakeApolloConfig()
+        # Keys unique to the test: the fake server counts usage per key
+        self.api_keys = ["%s-key-%04d" % (self.id(), i) for i in (1, 2)]
+        env = mock.patch.dict(os.environ, {"APOLLO_API_KEYS": ",".join(self.api_keys)})
+        env.start()
+        self.addCleanup(env.stop)
+        circuit_breaker._breakers.clear()
+        apollo_service.cache.clear()
+
+    def login(self):
+        self.client.post("/login/", {"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+
+    def open_circuit(self, name: str):
+        breaker = get_breaker(name)
+        for _ in range(breaker.min_calls):
+            breaker.record_failure(0.0, "test")
+        self.assertEqual(breaker.state, OPEN)
+
+    def post_fake(self, path: str, body: dict, key: str = None):
+        headers = {"X-Api-Key": self.api_keys[0] if key is None else key}
+        return requests.post(FAKE_APOLLO.base_url + path, json=body, headers=headers, timeout=5)
+
+
+class FakeApolloServerTests(FakeApolloMixin, SimpleTestCase):
+    def test_responses_are_deterministic(self):
+        body = {"page": 2, "per_page": 10, "q_organization_name": "acme"}
+        first = self.post_fake("/mixed_companies/search", body)
+        second = self.post_fake("/mixed_companies/search", body)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first.json(), company_search_response(body))
+        self.assertEqual(len(first.json()["organizations"]), 10)
+        self.assertEqual(first.json()["pagination"]["page"], 2)
+
+    def test_rejects_missing_key_and_unknown_paths(self):
+        self.assertEqual(self.post_fake("/mixed_companies/search", {}, key="").status_code, 401)
+        self.assertEqual(self.post_fake("/nope", {}).status_code, 404)
+
+    def test_per_key_rate_limit(self):
+        FAKE_APOLLO.config.rate_limit_per_minute = 2
+        responses = [self.post_fake("/mixed_companies/search", {}) for _ in range(3)]
+        self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+        self.assertEqual(responses[1].headers["x-minute-requests-left"], "0")
+        self.assertGreaterEqual(int(responses[2].headers["Retry-After"]), 1)
+        # Other keys have their own budget
+        self.assertEqual(self.post_fake("/mixed_companies/search", {}, key=self.api_keys[1]).status_code, 200)
+
+    def test_error_rate(self):
+        FAKE_APOLLO.config.error_rate = 1.0
+        self.assertIn(self.post_fake("/mixed_people/api_search", {}).status_code, (500, 502, 503))
+
+
+class RecordReplayTests(FakeApolloMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.fixture_dir = Path(tmp.name)
+
+    def test_record_then_replay(self):
+        payload = {"page": 1, "per_page": 3, "q_organization_name": "recorded"}
+        with mock.patch.dict(os.environ, {"APOLLO_RECORD_DIR": str(self.fixture_dir)}):
+            live = apollo_service.search_companies(payload)
+        (path,) = self.fixture_dir.iterdir()
+        text = path.read_text()
+        for key in self.api_keys:
+            self.assertNotIn(key, text)
+        fixture = json.loads(text)
+        self.assertEqual(fixture["endpoint"], "mixed_companies/search")
+        self.assertEqual(fixture["body"], payload)
+        self.assertEqual(fixture["response"]["organizations"], live["organizations"])
+
+        fixture["response"]["organizations"][0]["name"] = "Replayed Inc"
+        path.write_text(json.dumps(fixture))
+        FAKE_APOLLO.config = FakeApolloConfig(replay_dir=str(self.fixture_dir), replay_only=True)
+        apollo_service.cache.clear()
+        replayed = apollo_service.search_companies(payload)
+        self.assertEqual(replayed["organizations"][0]["name"], "Replayed Inc")
+        with self.assertRaises(requests.HTTPError):
+            apollo_service.search_companies(dict(payload, page=2))  # nothing recorded for it
+
+
+class DeadlineTests(FakeApolloMixin, SimpleTestCase):
+    def test_nested_budget_never_extends_outer(self):
+        with request_deadline(1) as outer:
+            with request_deadline(60) as inner:
+                self.assertIs(inner, outer)
+            with request_deadline(0.5) as inner:
+                self.assertLess(inner.expires_at, outer.expires_at)
+                self.assertLessEqual(remaining_time(), 0.5)
+            self.assertIs(current_deadline(), outer)
+        self.assertIsNone(current_deadline())
+        self.assertIsNone(remaining_time())
+
+    def test_no_budget_keeps_current_one(self):
+        with request_deadline(5) as outer:
+            with request_deadline(None) as inner:
+                self.assertIs(inner, outer)
+            with request_deadline(0) as inner:
+                self.assertIs(inner, outer)
+        with request_deadline(None) as deadline:
+            self.assertIsNone(deadline)
+
+    def test_clamp_timeout(self):
+        self.assertEqual(clamp_timeout(120), 120)
+        with request_deadline(10):
+            self.assertLessEqual(clamp_timeout(120), 10)
+            self.assertEqual(clamp_timeout(5), 5)
+        with request_deadline(0.5), self.assertRaises(DeadlineExceeded):
+            clamp_timeout(120)
+
+    def test_budget_follows_copied_context_into_threads(self):
+        seen = []
+        with request_deadline(30):
+            ctx = contextvars.copy_context()
+        thread = threading.Thread(target=lambda: seen.append(ctx.run(remaining_time)))
+        thread.start()
+        thread.join()
+        self.assertIsNotNone(seen[0])
+        self.assertLessEqual(seen[0], 30)
+
+    def test_apollo_call_stops_at_deadline(self):
+        FAKE_APOLLO.config.latency_ms = 3000
+        started = time.monotonic()
+        with request_deadline(1.5), self.assertRaises(DeadlineExceeded):
+            apollo_service.search_companies({"page": 1, "per_page": 1})
+        self.assertLess(time.monotonic() - started, 2.5)
+
+
+class CircuitBreakerTests(FakeApolloMixin, SimpleTestCase):
+    def test_state_changes(self):
+        breaker = CircuitBreaker("test", min_calls=2, window_size=4, failure_rate_threshold=0.5, open_seconds=0.05)
+        breaker.before_call()
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CLOSED)
+        breaker.before_call()
+        breaker.record_failure(0.1, "HTTP 500")
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        self.assertEqual(breaker.state, HALF_OPEN)
+        breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()  # one probe at a time
+        breaker.record_failure(0.1, "HTTP 502")
+        self.assertEqual(breaker.state, OPEN)
+
+        time.sleep(0.06)
+        breaker.before_call()
+        breaker.record_success(0.1)
+        self.assertEqual(breaker.state, CLOSED)
+        snapshot = breaker.snapshot()
+        self.assertEqual(snapshot["times_opened"], 2)
+        self.assertEqual(snapshot["rejected_calls"], 2)
+        self.assertEqual(snapshot["last_error"], "HTTP 502")
+
+    def test_slow_calls_open_the_circuit(self):
+        breaker = CircuitBreaker("test", min_calls=2, slow_call_seconds=1.0, slow_call_rate_threshold=0.5)
+        breaker.record_success(2.0)
+        breaker.record_success(2.0)
+        self.assertEqual(breaker.state, OPEN)
+
+    def test_cancelled_probe_frees_half_open_slot(self):
+        breaker = CircuitBreaker("test", min_calls=1, open_seconds=0.0)
+        breaker.record_failure(0.1)
+        breaker.before_call()
+        breaker.cancel_call()
+        breaker.before_call()
+
+    def test_open_circuit_serves_stale_response(self):
+        payload = {"page": 1, "per_page": 5, "q_organization_name": "stale"}
+        fresh = apollo_service.search_companies(payload)
+        FAKE_APOLLO.config.error_rate = 1.0
+        breaker = get_breaker("mixed_companies/search")
+        for _ in range(breaker.min_calls):
+            with self.assertRaises(requests.HTTPError):
+                apollo_service.search_companies(payload)
+            if breaker.state == OPEN:
+                break
+        self.assertEqual(breaker.state, OPEN)
+
+        stale = apollo_service.search_companies(payload)
+        self.assertTrue(stale["_stale"])
+        self.assertEqual(stale["organizations"], fresh["organizations"])
+        with self.assertRaises(CircuitOpenError):
+            apollo_service.search_companies(dict(payload, page=2))  # nothing cached for it
+
+    def test_unexpected_error_frees_half_open_probe(self):
+        breaker = get_breaker("mixed_companies/search")
+        for _ in range(breaker.min_calls):
+            breaker.record_failure(0.0, "test")
+        breaker.open_seconds = 0.0
+        session = mock.Mock()
+        session.post.side_effect = ValueError("boom")
+        with mock.patch.object(apollo_service, "get_http_session", return_value=session):
+            with self.assertRaises(ValueError):
+                apollo_service.search_companies({"page": 1, "per_page": 1})
+        self.assertEqual(breaker.state, HALF_OPEN)
+        breaker.before_call()  # the probe slot is free again
+
+
+class StaleResponseCreditTests(FakeApolloMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        credits = mock.patch.object(views, "log_apollo_credits")
+        self.log_credits = credits.start()
+        self.addCleanup(credits.stop)
+
+    def post(self, path: str, body: dict) -> dict:
+        response = self.client.post(path, body, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_stale_company_search_costs_nothing(self):
+        body = {"company_name": "stale", "per_page": 5}
+        self.assertNotIn("stale", self.post("/api/companies/search/", body))
+        self.assertEqual(self.log_credits.call_count, 1)
+        self.open_circuit("mixed_companies/search")
+        self.assertTrue(self.post("/api/companies/search/", body)["stale"])
+        self.assertEqual(self.log_credits.call_count, 1)
+
+    def test_stale_people_search_counts_only_enrichment(self):
+        body = {"organization_id": "stale-org", "per_page": 5}
+        self.post("/api/people/search/?fields=id,name", body)
+        self.open_circuit("mixed_people/api_search")
+        self.log_credits.reset_mock()
+
+        self.assertTrue(self.post("/api/people/search/?fields=id,name", body)["stale"])
+        self.log_credits.assert_not_called()
+
+        people = self.post("/api/people/search/", body)["people"]
+        self.assertTrue(people)
+        (call,) = self.log_credits.call_args_list
+        self.assertEqual(call.args[1], len(people) * CREDITS_ENRICH_PER_PERSON)
+        self.assertTrue(call.kwargs["detail"].startswith("search=0 "))
+
+
+class ApiKeyPoolTests(FakeApolloMixin, SimpleTestCase):
+    def test_spreads_calls_over_keys(self):
+        pool = ApiKeyPool(["key-aaaa", "key-bbbb"], minute_limit=10)
+        self.assertEqual({pool.acquire().key, pool.acquire().key}, {"key-aaaa", "key-bbbb"})
+
+    def test_rate_limited_key_rests(self):
+        pool = ApiKeyPool(["key-aaaa", "key-bbbb"], minute_limit=10)
+        rested = pool.acquire()
+        pool.report(rested, 429, {"retry-after": "30"})
+        for _ in range(5):
+            self.assertNotEqual(pool.acquire().key, rested.key)
+        state = next(s for s in pool.snapshot() if s["key"] == "***" + rested.key[-4:])
+        self.assertEqual(state["disabled_reason"], "rate_limited")
+        self.assertGreater(state["disabled_for_seconds"], 25)
+
+    def test_forbidden_keys_leave_rotation(self):
+        pool = ApiKeyPool(["key-aaaa", "key-bbbb"])
+        first = pool.acquire()
+        pool.report(first, 403)
+        second = pool.acquire()
+        self.assertNotEqual(second.key, first.key)
+        pool.report(second, 403)
+        with self.assertRaises(ApiKeysExhausted):
+            pool.acquire()
+
+    def test_rate_limit_headers_correct_local_budget(self):
+        pool = ApiKeyPool(["key-aaaa"], minute_limit=50, daily_limit=600)
+        key = pool.acquire()
+        pool.report(key, 200, {"x-rate-limit-minute": "20", "x-minute-requests-left": "5", "x-24-hour-requests-left": "7"})
+        state = pool.snapshot()[0]
+        self.assertEqual(state["minute_limit"], 20)
+        self.assertEqual(state["minute_left"], 5)
+        self.assertEqual(state["day_left"], 7)
+
+    def test_switches_key_on_429(self):
+        FAKE_APOLLO.config.rate_limit_per_minute = 3
+        first, second = self.api_keys
+        for _ in range(3):
+            FAKE_APOLLO.usage.hit(first)  # first key's minute budget is already spent at Apollo
+
+        response = apollo_service.search_companies({"page": 1, "per_page": 1})
+
+        self.assertEqual(len(response["organizations"]), 1)
+        by_key = {s["key"]: s for s in get_key_pool().snapshot()}
+        self.assertEqual(by_key["***" + first[-4:]]["last_status"], 429)
+        self.assertEqual(by_key["***" + first[-4:]]["disabled_reason"], "rate_limited")
+        self.assertEqual(by_key["***" + second[-4:]]["last_status"], 200)
+
+    def test_release_gives_back_the_reservation(self):
+        pool = ApiKeyPool(["key-aaaa"], minute_limit=10, daily_limit=100)
+        key = pool.acquire()
+        pool.report(key, 200, {"x-24-hour-requests-left": "50"})
+        pool.release(pool.acquire())
+        state = pool.snapshot()[0]
+        self.assertEqual((state["minute_left"], state["day_left"], state["total_calls"]), (9, 50, 1))
+
+    def test_unsent_calls_keep_key_budget(self):
+        scheduler = mock.Mock()
+        scheduler.slot.side_effect = SchedulerRejected(INTERACTIVE, "queue full")
+        with mock.patch.object(apollo_service, "get_scheduler", return_value=scheduler):
+            for _ in range(3):
+                with self.assertRaises(SchedulerRejected):
+                    apollo_service.search_companies({"page": 1, "per_page": 1})
+        for state in get_key_pool().snapshot():
+            self.assertEqual(state["total_calls"], 0)
+            self.assertEqual(state["minute_left"], state["minute_limit"])
+            self.assertEqual(state["calls_today"], 0)
+
+
+class SchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.scheduler = self.make_scheduler(max_concurrency=1)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+
+    def make_scheduler(self, max_concurrency: int, interactive_reserved: int = 0, timeout: float = 10):
+        return ApolloScheduler(
+            max_concurrency=max_concurrency,
+            interactive_reserved=interactive_reserved,
+            queue_limits={INTERACTIVE: 5, BULK: 5},
+            queue_timeouts={INTERACTIVE: timeout, BULK: timeout},
+        )
+
+    def hold_slot(self, scheduler=None, priority_class=INTERACTIVE):
+        scheduler = scheduler or self.scheduler
+        held = threading.Event()
+
+        def run():
+            with scheduler.slot(priority_class):
+                held.set()
+                self.release.wait(10)
+
+        threading.Thread(target=run, daemon=True).start()
+        self.assertTrue(held.wait(5))
+
+    def wait_for_queue(self, priority_class: str, depth: int):
+        for _ in range(500):
+            if self.scheduler.snapshot()["classes"][priority_class]["queue_depth"] == depth:
+                return
+            time.sleep(0.01)
+        self.fail("queue %s never reached depth %s" % (priority_class, depth))
+
+    def test_deadline_wait_survives_wakeups(self):
+        self.hold_slot()
+        stop = threading.Event()
+
+        def notify():
+            while not stop.wait(0.1):
+                with self.scheduler._cond:
+                    self.scheduler._cond.notify_all()
+
+        threading.Thread(target=notify, daemon=True).start()
+        started = time.monotonic()
+        try:
+            with request_deadline(1.0), self.assertRaises(DeadlineExceeded):
+                with self.scheduler.slot(INTERACTIVE):
+                    pass
+        finally:
+            stop.set()
+        self.assertGreaterEqual(time.monotonic() - started, 0.95)
+
+    def test_full_queue_rejects_at_once(self):
+        self.scheduler.queue_limits[INTERACTIVE] = 1
+        self.hold_slot()
+        threading.Thread(target=lambda: self.scheduler.slot(INTERACTIVE).__enter__(), daemon=True).start()
+        self.wait_for_queue(INTERACTIVE, 1)
+        with self.assertRaises(SchedulerRejected):
+            with self.scheduler.slot(INTERACTIVE):
+                pass
+        self.assertEqual(self.scheduler.snapshot()["classes"][INTERACTIVE]["rejected"], 1)
+
+    def test_bulk_leaves_reserved_slots_to_interactive(self):
+        scheduler = self.make_scheduler(max_concurrency=2, interactive_reserved=1, timeout=0.2)
+        self.hold_slot(scheduler, BULK)
+        with self.assertRaises(SchedulerRejected):
+            with scheduler.slot(BULK):
+                pass
+        with scheduler.slot(INTERACTIVE):
+            pass
+        classes = scheduler.snapshot()["classes"]
+        self.assertEqual(classes[BULK]["timed_out"], 1)
+        self.assertEqual(classes[INTERACTIVE]["admitted"], 1)
+
+    def test_waiting_interactive_goes_before_waiting_bulk(self):
+        self.hold_slot()
+        admitted = []
+
+        def wait(priority_class):
+            with self.scheduler.slot(priority_class):
+                admitted.append(priority_class)
+
+        threads = [threading.Thread(target=wait, args=(BULK,), daemon=True)]
+        threads[0].start()
+        self.wait_for_queue(BULK, 1)
+        threads.append(threading.Thread(target=wait, args=(INTERACTIVE,), daemon=True))
+        threads[1].start()
+        self.wait_for_queue(INTERACTIVE, 1)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(admitted, [INTERACTIVE, BULK])
+
+
+# Normalizers as they were before the declarative field spec (normalizers.py)
+
+
+def old_normalize_companies(accounts: list) -> list:
+    companies = []
+    for acc in accounts:
+        loc_parts = [
+            acc.get("organization_raw_address"),
+            acc.get("raw_address"),
+            acc.get("organization_city"),
+            acc.get("organization_state"),
+            acc.get("organization_country"),
+            acc.get("city"),
+            acc.get("state"),
+            acc.get("country"),
+        ]
+        searchable_location_string = " ".join(str(p).strip() for p in loc_parts if p).lower()
+        companies.append(
+            {
+                "id": acc.get("id"),
+                "name": acc.get("name"),
+                "primary_domain": acc.get("primary_domain"),
+                "logo_url": acc.get("logo_url"),
+                "industry": acc.get("industry"),
+                "estimated_num_employees": acc.get("estimated_num_employees"),
+                "city": acc.get("organization_city") or acc.get("city"),
+                "state": acc.get("organization_state") or acc.get("state"),
+                "country": acc.get("organization_country") or acc.get("country"),
+                "searchable_location_string": searchable_location_string,
+                "linkedin_url": acc.get("linkedin_url"),
+                "founded_year": acc.get("founded_year"),
+                "annual_revenue": acc.get("organization_revenue"),
+                "annual_revenue_printed": acc.get("organization_revenue_printed"),
+                "phone": acc.get("phone"),
+                "website_url": acc.get("website_url"),
+            }
+        )
+    return companies
+
+
+def old_normalize_people(people: list) -> list:
+    contacts = []
+    for person in people:
+        phone_numbers = []
+        if person.get("phone_numbers"):
+            phone_numbers = [
+                p.get("sanitized_number") or p.get("raw_number") for p in person.get("phone_numbers", []) if p
+            ]
+        contacts.append(
+            {
+                "id": person.get("id"),
+                "first_name": person.get("first_name"),
+                "last_name": person.get("last_name"),
+                "name": person.get("name")
+                or f"{person.get('first_name', '')} {person.get('last_name', '')}".strip(),
+                "email": person.get("email"),
+                "title": person.get("title"),
+                "seniority": person.get("seniority"),
+                "city": person.get("city"),
+                "state": person.get("state"),
+                "country": person.get("country"),
+                "linkedin_url": person.get("linkedin_url"),
+                "phone_numbers": phone_numbers,
+                "organization_name": (
+                    person.get("organization", {}).get("name") if person.get("organization") else None
+                ),
+            }
+        )
+    return contacts
+
+
+class NormalizerTests(SimpleTestCase):
+    def companies(self) -> list:
+        records = [fake_organization("org-%d" % i) for i in range(20)]
+        records += [
+            {},
+            {"id": "x", "city": " Lahore ", "organization_raw_address": "  1 Mall Road  ", "country": "Pakistan"},
+            {"id": "y", "organization_city": "Berlin", "city": "ignored", "organization_revenue": 0},
+        ]
+        return records
+
+    def people(self) -> list:
+        records = [fake_person("p-%d" % i, fake_organization("org-%d" % i)) for i in range(10)]
+        records += [fake_match("m-%d" % i, True) for i in range(10)]
+        records += [
+            {},
+            {"first_name": "Ada", "last_name": "Lovelace"},
+            {"first_name": "Ada", "phone_numbers": [None, {"raw_number": "+1 555"}, {"sanitized_number": "+1555"}]},
+            {"name": "Named", "organization": None, "phone_numbers": []},
+        ]
+        return records
+
+    def test_company_output_matches_old_normalizer(self):
+        records = self.companies()
+        self.assertEqual(COMPANY.many("dict")(records), old_normalize_companies(records))
+
+    def test_person_output_matches_old_normalizer(self):
+        records = self.people()
+        self.assertEqual(PERSON.many("dict")(records), old_normalize_people(records))
+
+    def test_record_and_tuple_modes_match_dicts(self):
+        for schema, records in ((COMPANY, self.companies()), (PERSON, self.people())):
+            dicts = schema.many("dict")(records)
+            self.assertEqual([schema.to_dict(r) for r in schema.many("record")(records)], dicts)
+            self.assertEqual([schema.to_dict(r) for r in schema.many("tuple")(records)], dicts)
+
+    def test_subset(self):
+        records = self.companies()
+        subset = COMPANY.subset(["name", "id", "name"])
+        self.assertEqual(subset.names, ("name", "id"))
+        self.assertIs(COMPANY.subset(["name", "id"]), subset)
+        full = COMPANY.many("dict")(records)
+        self.assertEqual(subset.many("dict")(records), [{"name": c["name"], "id": c["id"]} for c in full])
+        self.assertEqual(subset.many("tuple")(records), [(c["name"], c["id"]) for c in full])
+
+    def test_subset_skips_unrequested_fields(self):
+        records = [{"id": "p", "name": "P", "phone_numbers": ["not a dict"]}]
+        with self.assertRaises(AttributeError):
+            PERSON.many("dict")(records)
+        self.assertEqual(PERSON.subset(["id", "name"]).many("dict")(records), [{"id": "p", "name": "P"}])
+
+    def test_subset_rejects_unknown_fields(self):
+        with self.assertRaises(ValueError):
+            COMPANY.subset(["id", "nope"])
+        with self.assertRaises(ValueError):
+            COMPANY.subset([])
+
+
+class ResponseShapeTests(FakeApolloMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def search(self, query: str = "", **body) -> dict:
+        body = dict({"company_name": "shape", "per_page": 5}, **body)
+        response = self.client.post("/api/companies/search/" + query, body, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_fields_and_columnar_layout(self):
+        full = self.search()["companies"]
+        self.assertEqual(
+            self.search("?fields=id,primary_domain")["companies"],
+            [{"id": c["id"], "primary_domain": c["primary_domain"]} for c in full],
+        )
+        self.assertEqual(
+            self.search(fields=["id", "name"])["companies"], [{"id": c["id"], "name": c["name"]} for c in full]
+        )
+        columnar = self.search("?fields=id,name&layout=columnar")
+        self.assertEqual(columnar["layout"], "columnar")
+        self.assertEqual(columnar["companies"], {"id": [c["id"] for c in full], "name": [c["name"] for c in full]})
+
+    def test_bad_shape_is_rejected(self):
+        for query in ("?fields=id,nope", "?layout=csv"):
+            body = {"company_name": "shape"}
+            response = self.client.post("/api/companies/search/" + query, body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, query)
+
+    def test_people_fields(self):
+        body = {"organization_id": "shape-org", "per_page": 5}
+        response = self.client.post("/api/people/search/?fields=id,name&layout=columnar", body, content_type="application/json")
+        people = response.json()["people"]
+        self.assertEqual(set(people), {"id", "name"})
+        self.assertEqual(len(people["id"]), len(people["name"]))
+
+
+def metric_value(metric, **labels):
+    """This process's value of a counter, or observation count of a histogram."""
+    value = metric._values.get(metric._key(labels), 0)
+    return value[2] if isinstance(value, list) else value
+
+
+class ApolloMetricsTests(FakeApolloMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def company_search_metrics(self) -> tuple:
+        return (
+            metric_value(APOLLO_REQUESTS, endpoint="mixed_companies/search", status="200"),
+            metric_value(views.APOLLO_CREDITS, source="/api/companies/search/"),
+            metric_value(CACHE_REQUESTS, cache="apollo_stale", result="hit"),
+        )
+
+    def test_search_counts_calls_credits_and_stale_hits(self):
+        calls, credits, stale_hits = self.company_search_metrics()
+        body = {"company_name": "metrics", "per_page": 5}
+        self.client.post("/api/companies/search/", body, content_type="application/json")
+        self.assertEqual(self.company_search_metrics(), (calls + 1, credits + CREDITS_COMPANY_SEARCH, stale_hits))
+
+        self.open_circuit("mixed_companies/search")
+        response = self.client.post("/api/companies/search/", body, content_type="application/json")
+        self.assertTrue(response.json()["stale"])
+        self.assertEqual(self.company_search_metrics(), (calls + 1, credits + CREDITS_COMPANY_SEARCH, stale_hits + 1))
+
+    def test_enrichment_batch_sizes(self):
+        batches = metric_value(APOLLO_ENRICH_BATCH_SIZE)
+        body = {"organization_id": "metrics-org", "per_page": 5}
+        people = self.client.post("/api/people/search/", body, content_type="application/json").json()["people"]
+        self.assertTrue(people)
+        self.assertGreater(metric_value(APOLLO_ENRICH_BATCH_SIZE), batches)
+
+
+class DomainLookupTests(FakeApolloMixin, SimpleTestCase):
+    def lookup(self, side_effect, domains: list) -> list:
+        with mock.patch("apollo_ingest.domain_lookup.search_companies", side_effect=side_effect):
+            return list(lookup_domains(domains, 30))
+
+    def test_parse_domains(self):
+        text = "domain,name\nhttps://www.Example.com/about,Example\nexample.com,Dup\nnot a domain,X\n"
+        self.assertEqual(parse_domains(text, is_csv=True), (["example.com"], ["not a domain"], 3))
+        self.assertEqual(parse_domains("a.com, b.io;\nmailto:x@c.org"), (["a.com", "b.io", "c.org"], [], 3))
+
+    def test_failed_page_keeps_earlier_organizations(self):
+        def search(payload):
+            if payload["page"] == 2:
+                raise requests.HTTPError("502 Server Error")
+            response = apollo_service.search_companies(payload)
+            response["pagination"]["total_pages"] = 3
+            return response
+
+        domains = ["d%d.com" % i for i in range(5)]
+        events = self.lookup(search, domains)
+        organizations = [e for e in events if e["type"] == "organization"]
+        error = next(e for e in events if e["type"] == "chunk_error")
+        summary = events[-1]
+        self.assertTrue(organizations)
+        # The failed page 2 call may have been billed too
+        self.assertEqual(summary["apollo_calls"], 2)
+        self.assertEqual(summary["organizations"], len(organizations))
+        self.assertEqual(summary["failed"], error["domains"])
+        matched = {e["matched_domain"] for e in organizations}
+        self.assertEqual(set(error["domains"]), set(domains) - matched)
+
+    def test_calls_that_never_went_out_are_not_counted(self):
+        events = self.lookup(CircuitOpenError("mixed_companies/search", 30), ["a.com", "b.com"])
+        self.assertEqual(events[-1]["apollo_calls"], 0)
+        self.assertEqual(events[-1]["failed"], ["a.com", "b.com"])
+
+        self.open_circuit("mixed_companies/search")
+        summary = self.lookup(lambda payload: dict(apollo_service.search_companies(payload), _stale=True), ["a.com"])[-1]
+        self.assertEqual(summary["apollo_calls"], 0)
+
+    def test_request_bodies(self):
+        self.login()
+        url = "/api/companies/lookup-domains/"
+
+        def summary(response):
+            self.assertEqual(response.status_code, 200)
+            return json.loads(b"".join(response.streaming_content).splitlines()[-1])
+
+        for response in (
+            self.client.post(url, ["a.com", "https://b.com/"], content_type="application/json"),
+            self.client.post(url, {"domains": ["a.com", "b.com"]}, content_type="application/json"),
+            self.client.post(url, {"domains": "a.com\nb.com"}, content_type="application/json"),
+            self.client.post(url, {"domains": "a.com, b.com"}),
+            self.client.post(url, "domain\na.com\nb.com\n", content_type="text/csv"),
+        ):
+            self.assertEqual(summary(response)["unique_domains"], 2)
+
+        for body in (5, None, {"domains": 5}, {"other": ["a.com"]}):
+            response = self.client.post(url, body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+        self.assertEqual(self.client.post(url, [], content_type="application/json").status_code, 400)
+
+
+class ShardedSearchTests(FakeApolloMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        FAKE_APOLLO.config = FakeApolloConfig(total_entries=250)
+
+    def test_shard_payloads(self):
+        payload = {"organization_num_employees_ranges": ["51,1000"], "organization_locations": ["Berlin", "Paris"]}
+        shards = shard_payloads(payload, ["employees", "locations"])
+        self.assertEqual(
+            [label for label, _ in shards],
+            [
+                "employees=%s locations=%s" % (employees, location)
+                for employees in ("51-100", "101-200", "201-500", "501-1000")
+                for location in ("Berlin", "Paris")
+            ],
+        )
+        self.assertEqual(
+            shards[0][1],
+            {
+                "organization_num_employees_ranges": ["51,100"],
+                "organization_locations": ["Berlin"],
+                "page": 1,
+                "per_page": 100,
+            },
+        )
+        self.assertEqual(len(shard_payloads({}, ["employees"])), 11)
+
+    def test_unshardable_queries(self):
+        for payload, dimensions in (
+            ({"organization_locations": ["Berlin"]}, ["locations"]),
+            ({}, ["industries"]),
+            ({"organization_num_employees_ranges": ["many"]}, ["employees"]),
+            ({}, ["countries"]),
+        ):
+            with self.assertRaises(ShardingError):
+                shard_payloads(payload, dimensions)
+        with mock.patch("apollo_ingest.sharded_search.MAX_SHARDS", 10), self.assertRaises(ShardingError):
+            shard_payloads({}, ["employees"])
+
+    def test_deep_search_pages_every_shard(self):
+        shards = shard_payloads({"organization_locations": ["Berlin", "Paris", "Rome"]}, ["locations"])
+        events = list(deep_search(shards, 10000, 30))
+        shard_events = [e for e in events if e["type"] == "shard"]
+        organizations = [e for e in events if e["type"] == "organization"]
+        summary = events[-1]
+        self.assertEqual(len(shard_events), 3)
+        self.assertEqual(len(organizations), sum(e["total_entries"] for e in shard_events))
+        self.assertEqual(len({e["id"] for e in organizations}), len(organizations))
+        self.assertEqual(summary["apollo_calls"], sum(e["pages"] for e in shard_events))
+        self.assertEqual((summary["organizations"], summary["failed_pages"]), (len(organizations), 0))
+        self.assertFalse(summary["limit_reached"])
+
+    def test_duplicates_and_result_limit(self):
+        label, shard = shard_payloads({"organization_locations": ["Berlin", "Paris"]}, ["locations"])[0]
+        summary = list(deep_search([(label, shard), (label + " again", shard)], 10000, 30))[-1]
+        self.assertEqual(summary["duplicates"], summary["organizations"])
+
+        events = list(deep_search([(label, shard)], 5, 30))
+        self.assertEqual(len([e for e in events if e["type"] == "organization"]), 5)
+        self.assertTrue(events[-1]["limit_reached"])
+
+    def test_failed_and_stale_pages(self):
+        def search(payload):
+            if payload["page"] >= 2:
+                raise requests.HTTPError("502 Server Error")
+            return dict(apollo_service.search_companies(payload), _stale=payload["organization_locations"] == ["Paris"])
+
+        FAKE_APOLLO.config.total_entries = 2500  # at least two pages per shard
+        shards = shard_payloads({"organization_locations": ["Berlin", "Paris"]}, ["locations"])
+        with mock.patch("apollo_ingest.sharded_search.search_companies", side_effect=search):
+            events = list(deep_search(shards, 10000, 30))
+        pages = {e["shard"]: e["pages"] for e in events if e["type"] == "shard"}
+        errors = [e["shard"] for e in events if e["type"] == "page_error"]
+        self.assertEqual(len(errors), pages["locations=Berlin"] + pages["locations=Paris"] - 2)
+        summary = events[-1]
+        self.assertEqual(summary["failed_pages"], len(errors))
+        # Only Berlin's page 1 went to Apollo; failed pages raised before a response
+        self.assertEqual(summary["apollo_calls"], 1)
+
+    def test_api(self):
+        self.login()
+        url = "/api/companies/search/deep/"
+        body = {"locations_included": "Berlin", "shard_by": ["locations"]}
+        self.assertEqual(self.client.post(url, body, content_type="application/json").status_code, 400)
+        body = {"employees_min": 1, "employees_max": 50, "shard_by": ["employees"], "max_results": 20}
+        response = self.client.post(url, body, content_type="application/json")
+        self.assertEqual(response["X-Shard-Count"], "3")
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1]["organizations"], 20)
+
+
+class LookalikeCrawlTests(FakeApolloMixin, SimpleTestCase):
+    def crawl(self, seeds=("seed",), depth=2, max_results=1000, max_queries=100, per_page=3) -> list:
+        return list(crawl(list(seeds), {"per_page": per_page}, depth, max_results, max_queries, 30))
+
+    def test_breadth_first_levels(self):
+        events = self.crawl()
+        organizations = [e for e in events if e["type"] == "organization"]
+        levels = [e for e in events if e["type"] == "level"]
+        self.assertEqual(
+            [(e["depth"], e["queried"], e["found"]) for e in levels], [(1, 1, 3), (2, 3, 9)]
+        )
+        first_level = {e["id"] for e in organizations if e["depth"] == 1}
+        self.assertEqual({e["via"] for e in organizations if e["depth"] == 1}, {"seed"})
+        self.assertEqual({e["via"] for e in organizations if e["depth"] == 2}, first_level)
+        self.assertEqual(len({e["id"] for e in organizations}), 12)
+        summary = events[-1]
+        self.assertEqual(
+            (summary["apollo_calls"], summary["organizations"], summary["depth_reached"], summary["stopped"]),
+            (4, 12, 2, "depth"),
+        )
+
+    def test_each_organization_is_queried_and_emitted_once(self):
+        ring = [fake_organization("org-%d" % i) for i in range(3)] + [fake_organization("seed")]
+        queried = []
+
+        def search(payload):
+            queried.append(payload["lookalike_organization_ids"][0])
+            return {"organizations": ring}
+
+        with mock.patch("apollo_ingest.lookalike_crawl.search_companies", side_effect=search):
+            events = self.crawl(depth=3)
+        self.assertEqual(sorted(queried), ["org-0", "org-1", "org-2", "seed"])
+        self.assertEqual(sorted(e["id"] for e in events if e["type"] == "organization"), ["org-0", "org-1", "org-2"])
+        self.assertEqual(events[-1]["stopped"], "exhausted")
+
+    def test_limits(self):
+        summary = self.crawl(depth=3, max_queries=2)[-1]
+        self.assertEqual((summary["apollo_calls"], summary["stopped"]), (2, "max_queries"))
+
+        events = self.crawl(max_results=4)
+        self.assertEqual(len([e for e in events if e["type"] == "organization"]), 4)
+        self.assertEqual(events[-1]["stopped"], "max_results")
+
+    def test_failed_query(self):
+        def search(payload):
+            if payload["lookalike_organization_ids"] == ["bad"]:
+                raise requests.HTTPError("502 Server Error")
+            return apollo_service.search_companies(payload)
+
+        with mock.patch("apollo_ingest.lookalike_crawl.search_companies", side_effect=search):
+            events = self.crawl(seeds=("seed", "bad"), depth=1)
+        (error,) = [e for e in events if e["type"] == "query_error"]
+        self.assertEqual(error["organization_id"], "bad")
+        summary = events[-1]
+        self.assertEqual((summary["apollo_calls"], summary["failed_queries"], summary["organizations"]), (1, 1, 3))
+
+    def test_api(self):
+        self.login()
+        url = "/api/companies/lookalikes/crawl/"
+        self.assertEqual(self.client.post(url, {"seed_ids": []}, content_type="application/json").status_code, 400)
+        body = {"seed_ids": ["seed"], "depth": 1, "per_page": 3}
+        response = self.client.post(url, body, content_type="application/json")
+        events = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual(events[-1]["type"], "summary")
+        self.assertEqual(events[-1]["depth_reached"], 1)
+
+
+class SavedSearchTests(FakeApolloMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        payload = canonical_payload(views.build_apollo_payload({"company_name": "saved", "page": 1, "per_page": 25}))
+        self.search = SavedSearch.objects.create(
+            name="test", payload=payload, payload_hash=payload_hash(payload), max_pages=2
+        )
+
+    def test_first_refresh_reports_everything_new(self):
+        summary = refresh_saved_search(self.search)
+        self.assertEqual(summary["organizations"], 200)
+        self.assertEqual(summary["new"], 200)
+        self.assertEqual(summary["pages_fetched"], 2)
+        self.assertTrue(summary["truncated"])
+        self.assertEqual(SavedSearchChange.objects.filter(kind=SavedSearchChange.NEW).count(), 200)
+
+        self.login()
+        feed = self.client.get("/api/saved-searches/changes/?limit=10").json()
+        self.assertEqual(len(feed["changes"]), 10)
+
+    def test_unchanged_results_record_no_changes(self):
+        refresh_saved_search(self.search)
+        summary = refresh_saved_search(self.search)
+        self.assertEqual((summary["new"], summary["removed"], summary["changed"]), (0, 0, 0))
+
+    def test_changes_beyond_first_page_are_detected(self):
+        refresh_saved_search(self.search)
+        snapshot = self.search.snapshots.first()
+        changed = snapshot.pages[1][0]
+        real_employees = changed["estimated_num_employees"]
+        changed["estimated_num_employees"] = (real_employees or 0) + 1
+        snapshot.pages[1].append({"id": "gone", "name": "Gone", "primary_domain": None})
+        snapshot.save()
+
+        # Same total and an identical first page: the later page is fetched anyway
+        summary = refresh_saved_search(self.search)
+
+        self.assertEqual(summary["pages_fetched"], 2)
+        self.assertEqual((summary["new"], summary["removed"], summary["changed"]), (0, 1, 1))
+        change = SavedSearchChange.objects.get(kind=SavedSearchChange.CHANGED)
+        self.assertEqual(change.organization_id, changed["id"])
+        self.assertEqual(change.fields, {"estimated_num_employees": [(real_employees or 0) + 1, real_employees]})
+        self.assertEqual(SavedSearchChange.objects.get(kind=SavedSearchChange.REMOVED).organization_id, "gone")
+
+    def test_stale_response_aborts_refresh(self):
+        refresh_saved_search(self.search)
+        self.open_circuit("mixed_companies/search")
+        with self.assertRaises(StaleResults):
+            refresh_saved_search(self.search)
+        self.search.refresh_from_db()
+        self.assertEqual(self.search.refresh_count, 1)
+        self.assertEqual(self.search.snapshots.count(), 1)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("refresh_saved_searches", "--id", str(self.search.id), stdout=out)
+        self.assertEqual(
+            out.getvalue(),
+            "%s (test): 200 organizations, pages fetched=2 (truncated at max_pages) | new=200 removed=0 changed=0\n"
+            % self.search.id,
+        )
+
+
+class SearchCacheTests(FakeApolloMixin, SimpleTestCase):
+    url = "/api/companies/search/?company_name=acme&per_page=5"
+
+    def setUp(self):
+        super().setUp()
+        self.login()
+        search = mock.patch.object(views, "search_companies", wraps=apollo_service.search_companies)
+        self.search = search.start()
+        self.addCleanup(search.stop)
+
+    def test_etag_and_not_modified(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        self.assertEqual(first["Cache-Control"], "private, max-age=%d" % SEARCH_CACHE_MAX_AGE)
+        self.assertEqual(len(first.json()["companies"]), 5)
+
+        second = self.client.get(self.url)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], etag)
+        for header in (etag, "W/" + etag, '"other", ' + etag):
+            not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(not_modified.status_code, 304)
+            self.assertEqual(not_modified.content, b"")
+            self.assertEqual(not_modified["ETag"], etag)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        self.assertEqual(self.search.call_count, 1)
+
+    def test_filter_order_shares_entry(self):
+        a = self.client.get(self.url + "&industries=a&industries=b")
+        b = self.client.get(self.url + "&industries=b&industries=a")
+        self.assertEqual(a["ETag"], b["ETag"])
+        self.assertEqual(self.search.call_count, 1)
+
+    def test_response_shape_is_part_of_key(self):
+        full = self.client.get(self.url)
+        sparse = self.client.get(self.url + "&fields=id,name")
+        self.assertNotEqual(full["ETag"], sparse["ETag"])
+        self.assertEqual(set(sparse.json()["companies"][0]), {"id", "name"})
+        self.assertEqual(self.search.call_count, 2)
+
+    def test_stale_response_not_cached(self):
+        self.client.post("/api/companies/search/", {"company_name": "acme", "per_page": 5}, content_type="application/json")
+        self.open_circuit("mixed_companies/search")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["stale"])
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertFalse(response.has_header("ETag"))
+
+    def test_people_search(self):
+        url = "/api/people/search/?organization_id=cache-org&per_page=5"
+        with mock.patch.object(views, "search_people", wraps=apollo_service.search_people) as search:
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertTrue(first.json()["people"])
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+        self.assertEqual(search.call_count, 1)
+
+
+class ApiTokenTests(TestCase):
+    def setUp(self):
+        clear_cache()
+
+    def test_verify_and_revoke(self):
+        api_token, token = create_token("test")
+        self.assertTrue(token.startswith(TOKEN_PREFIX))
+        self.assertEqual(api_token.token_hash, hash_token(token))
+        self.assertNotIn(token, (api_token.token_hash, api_token.prefix))
+
+        self.assertEqual(verify_token(token), api_token.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(verify_token(token), api_token.id)
+        self.assertIsNone(verify_token(token + "x"))
+        self.assertIsNone(verify_token("not-a-token"))
+
+        self.assertEqual(revoke_tokens(ApiToken.objects.filter(id=api_token.id)), 1)
+        self.assertIsNone(verify_token(token))
+        self.assertEqual(revoke_tokens(ApiToken.objects.filter(id=api_token.id)), 0)
+
+    def test_expired_token_rejected(self):
+        _, token = create_token("old", expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertIsNone(verify_token(token))
+
+    def test_bearer_token_on_api(self):
+        _, token = create_token("client")
+        self.assertEqual(self.client.get("/api/apollo/status/", HTTP_AUTHORIZATION="Bearer " + token).status_code, 200)
+        denied = self.client.get("/api/apollo/status/", HTTP_AUTHORIZATION="Bearer %swrong" % TOKEN_PREFIX)
+        self.assertEqual(denied.status_code, 401)
+        self.assertEqual(self.client.get("/api/apollo/status/").status_code, 302)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("api_tokens", "create", "cli", "--expires-days", "30", stdout=out)
+        token = out.getvalue().splitlines()[-1]
+        api_token = ApiToken.objects.get(name="cli")
+        self.assertEqual(verify_token(token), api_token.id)
+
+        out = io.StringIO()
+        call_command("api_tokens", "revoke", api_token.prefix, stdout=out)
+        self.assertEqual(out.getvalue(), "Revoked 1 token(s)\n")
+        self.assertIsNone(verify_token(token))
+        with self.assertRaises(CommandError):
+            call_command("api_tokens", "revoke")
+
+
+class FakePool:
+    """Executor whose futures the test completes (or breaks) by hand."""
+
+    def __init__(self):
+        self.submitted = []
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        if self.shut_down:
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        future = Future()
+        self.submitted.append((future, fn, args))
+        return future
+
+    def finish(self, index: int):
+        future, fn, args = self.submitted[index]
+        future.set_result(fn(*args))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+        if cancel_futures:
+            for future, _, _ in self.submitted:
+                future.cancel()
+
+
+def sheet_rows(content: bytes) -> list:
+    sheet = openpyxl.load_workbook(io.BytesIO(content))["Contacts"]
+    return [tuple(cell or "" for cell in row) for row in sheet.iter_rows(values_only=True)]
+
+
+class WorkbookQueueTests(SimpleTestCase):
+    rows = contact_rows([{"name": "Ada", "email": "ada@example.com", "city": "London", "country": "UK"}])
+
+    def test_contact_workbook(self):
+        self.assertEqual(self.rows, [("Ada", "ada@example.com", "", "", "", "London, UK")])
+        self.assertEqual(sheet_rows(workbook_bytes(self.rows)), [EXPORT_HEADER] + self.rows)
+
+    def test_in_process_without_pool(self):
+        self.assertIsNone(get_export_pool())  # APOLLO_EXPORT_PROCESS_WORKERS defaults to 0
+        queue = WorkbookQueue()
+        for name in ("a.xlsx", "b.xlsx"):
+            queue.add(name, self.rows)
+        self.assertEqual([name for name, _ in queue.ready()], ["a.xlsx", "b.xlsx"])
+        self.assertEqual(list(queue.drain()), [])
+
+    def test_submission_order(self):
+        pool = FakePool()
+        queue = WorkbookQueue(pool)
+        for name in ("a.xlsx", "b.xlsx", "c.xlsx"):
+            queue.add(name, self.rows)
+        pool.finish(1)
+        self.assertEqual(list(queue.ready()), [])  # b is done, but a is still in front
+        pool.finish(0)
+        self.assertEqual([name for name, _ in queue.ready()], ["a.xlsx", "b.xlsx"])
+        pool.finish(2)
+        [(name, content)] = queue.drain()
+        self.assertEqual((name, sheet_rows(content)), ("c.xlsx", [EXPORT_HEADER] + self.rows))
+
+    def test_falls_back_when_the_pool_breaks(self):
+        pool = FakePool()
+        queue = WorkbookQueue(pool)
+        queue.add("a.xlsx", self.rows)
+        queue.add("b.xlsx", self.rows)
+        pool.submitted[0][0].set_exception(BrokenProcessPool("worker died"))
+        # Discarding the pool cancels b, which is rebuilt in-process too
+        self.assertEqual([name for name, _ in queue.drain()], ["a.xlsx", "b.xlsx"])
+        self.assertIsNone(queue.pool)
+        self.assertTrue(pool.shut_down)
+        queue.add("c.xlsx", self.rows)
+        self.assertEqual(len(pool.submitted), 2)
+
+    def test_cancelled_by_another_export(self):
+        pool = FakePool()
+        mine, other = WorkbookQueue(pool), WorkbookQueue(pool)
+        mine.add("mine.xlsx", self.rows)
+        other.add("other.xlsx", self.rows)
+        pool.submitted[1][0].set_exception(BrokenProcessPool("worker died"))
+        self.assertEqual([name for name, _ in other.drain()], ["other.xlsx"])  # discards the shared pool
+        [(name, content)] = mine.drain()
+        self.assertEqual((name, sheet_rows(content)), ("mine.xlsx", [EXPORT_HEADER] + self.rows))
+
+
+def zero_contact_company_id() -> str:
+    """Organization id the fake people search returns nobody for."""
+    for i in range(5000):
+        org_id = "zero-%d" % i
+        payload, _ = views._company_people_payloads(org_id, None, [], [], views.EXPORT_PEOPLE_PER_PAGE)
+        if not people_search_response(payload)["people"]:
+            return org_id
+    raise AssertionError("no zero-contact organization found")
+
+
+class ExportTests(FakeApolloMixin, SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        given = [dict(fake_match("given-%d" % i), name="Given %d" % i) for i in range(2)]
+        self.companies = [
+            {"id": "given", "name": "Given Co", "domain": "given.com", "people": given},
+            {"id": "fetched", "name": "Fetched Co", "domain": "fetched.com"},
+            {"id": zero_contact_company_id(), "name": "Empty Co"},
+        ]
+        self.ids = {c["id"] for c in self.companies}
+
+    def export(self, export_format: str, **extra):
+        body = dict({"companies": self.companies, "format": export_format}, **extra)
+        response = self.client.post("/api/export/companies/", json.dumps(body), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            return response, b"".join(response.streaming_content)
+        return response, response.getvalue()
+
+    def csv_rows(self, content: bytes) -> list:
+        return list(csv.reader(io.StringIO(content.decode("utf-8"))))
+
+    def test_every_format_lists_the_same_companies(self):
+        _, content = self.export("zip")
+        names = zipfile.ZipFile(io.BytesIO(content)).namelist()
+        self.assertEqual(names, ["Given Co.xlsx", "Fetched Co.xlsx", "Empty Co.xlsx"])
+
+        _, content = self.export("csv")
+        rows = self.csv_rows(content)
+        self.assertEqual({row[0] for row in rows[1:]}, self.ids)
+        self.assertEqual(sum(1 for row in rows if row[0] == "given"), 2)
+        empty = [row for row in rows if row[1] == "Empty Co"]
+        self.assertEqual(empty, [[self.companies[2]["id"], "Empty Co", ""] + [""] * len(EXPORT_HEADER)])
+
+        _, content = self.export("ndjson")
+        events = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual({e["company_id"] for e in events if e["type"] in ("contact", "company")}, self.ids)
+        self.assertIn({"type": "company", "company_id": self.companies[2]["id"], "company_name": "Empty Co",
+                       "company_domain": "", "contacts": 0}, events)
+        self.assertEqual(events[-1]["type"], "summary")
+        self.assertFalse(events[-1]["partial"])
+
+        _, content = self.export("xlsx")
+        sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+        self.assertEqual({row[0] for row in sheet.iter_rows(min_row=2, values_only=True)}, self.ids)
+
+    def test_partial_exports_list_skipped_companies(self):
+        skipped = [c["id"] for c in self.companies[1:]]
+        with mock.patch.object(views, "EXPORT_WRITE_RESERVE_SECONDS", 10**6):
+            _, content = self.export("csv")
+            rows = self.csv_rows(content)
+            self.assertEqual(rows[-3][0], CSV_INCOMPLETE_MARKER)
+            self.assertEqual([row[:2] for row in rows[-2:]], [[CSV_SKIPPED_MARKER, cid] for cid in skipped])
+
+            _, content = self.export("ndjson")
+            summary = json.loads(content.splitlines()[-1])
+            self.assertEqual(summary["skipped"], skipped)
+            self.assertTrue(summary["partial"])
+
+            response, content = self.export("zip")
+            self.assertEqual(response["X-Export-Partial"], "true")
+            self.assertIn(views.EXPORT_INCOMPLETE_FILENAME, zipfile.ZipFile(io.BytesIO(content)).namelist())
+
+    def test_unknown_format_rejected(self):
+        response = self.client.post(
+            "/api/export/companies/",
+            json.dumps({"companies": self.companies, "format": "pdf"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class PlannerTests(FakeApolloMixin, SimpleTestCase):
+    def people_payload(self, org_id: str, job_titles=()):
+        return views._company_people_payloads(org_id, None, list(job_titles), [], views.EXPORT_PEOPLE_PER_PAGE)
+
+    def test_companies_with_people_cost_nothing(self):
+        plan = plan_export([(True, None, None)]).as_dict()
+        self.assertEqual((plan["total_calls"], plan["estimated_credits"]), (0, 0))
+
+    def test_unknown_company_planned_at_upper_bound(self):
+        payload, fallback = self.people_payload("unknown", job_titles=["CEO"])
+        plan = plan_export([(False, payload, fallback)]).as_dict()
+        self.assertEqual(plan["apollo_calls"], {"mixed_companies/search": 0, "mixed_people/api_search": 2, "people/bulk_match": 10})
+        self.assertEqual(plan["estimated_credits"], 2 + 100)
+        self.assertEqual(plan["estimated_counts"], 1)
+
+    def test_cached_search_gives_exact_count(self):
+        payload, _ = self.people_payload("cached")
+        people = [p for p in apollo_service.search_people(payload)["people"] if p.get("id")]
+        plan = plan_export([(False, payload, None)]).as_dict()
+        self.assertEqual(plan["cached_counts"], 1)
+        self.assertEqual(plan["estimated_credits"], 1 + len(people))
+        self.assertEqual(plan["apollo_calls"]["people/bulk_match"], -(-len(people) // 10))
+
+    def test_plan_matches_export(self):
+        self.login()
+        companies = [
+            {"id": "plan-given", "name": "Given", "people": [fake_match("plan-p", False)]},
+            {"id": "plan-a", "name": "A"},
+            {"id": zero_contact_company_id(), "name": "Empty"},
+        ]
+        body = json.dumps({"companies": companies, "format": "csv"})
+        b"".join(self.client.post("/api/export/companies/", body, content_type="application/json").streaming_content)
+        plan = self.client.post(
+            "/api/plan/", {"operation": "export", "companies": companies}, content_type="application/json"
+        ).json()
+        self.assertEqual(plan["cached_counts"], 2)
+
+        with mock.patch.object(apollo_service, "_post_with_retry", wraps=apollo_service._post_with_retry) as post:
+            b"".join(self.client.post("/api/export/companies/", body, content_type="application/json").streaming_content)
+        calls = {name: 0 for name in plan["apollo_calls"]}
+        enriched = 0
+        for call in post.call_args_list:
+            calls[apollo_service.ENDPOINT_NAMES[call.args[0]]] += 1
+            if call.args[0] == apollo_service.APOLLO_PEOPLE_BULK_ENRICH_URL:
+                enriched += len(call.args[1]["details"])
+        self.assertEqual(plan["apollo_calls"], calls)
+        self.assertEqual(plan["estimated_credits"], calls["mixed_people/api_search"] + enriched)
+
+
+class PrerenderedSelectMultipleTests(SimpleTestCase):
+    def assertSameAsSelectMultiple(self, widget, name, value):
+        reference = forms.SelectMultiple(attrs=widget.attrs)
+        reference.choices = widget.choices
+        attrs = {"id": "id_%s" % name}
+        self.assertEqual(widget.render(name, value, attrs), reference.render(name, value, attrs))
+
+    def test_matches_select_multiple(self):
+        widget = PrerenderedSelectMultiple(attrs={"size": "3"})
+        widget.choices = [("1", "One"), ("10", "Ten"), ("a&b", "A & B"), ('q"t', "Quote"), ("", "Blank")]
+        for value in (None, [], ["1"], ["10"], ["10", "1"], ["a&b"], ['q"t'], [""], ["missing"], ["1", "a&b", "10"]):
+            with self.subTest(value=value):
+                self.assertSameAsSelectMultiple(widget, "test_field", value)
+
+    def test_search_form_widgets(self):
+        form = CompanySearchForm()
+        for name in ("industries", "industries_exclude", "job_titles", "seniorities"):
+            widget = form.fields[name].widget
+            self.assertIsInstance(widget, PrerenderedSelectMultiple)
+            values = [str(v) for v, _ in list(widget.choices)[:3]]
+            for value in ([], values[:1], values):
+                with self.subTest(field=name, value=value):
+                    self.assertSameAsSelectMultiple(widget, name, value)
@@ -1,87 +1,114 @@
 import io
 import logging
+import os
 import re
 import zipfile
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, QueryDict, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.csrf import ensure_csrf_cookie
 from django.views.decorators.http import require_http_methods
-from openpyxl import Workbook
 from rest_framework.views import APIView
+from rest_framework.parsers import BaseParser, FormParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
-from drf_spectacular.utils import extend_schema
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+
+from config.metrics import counter
+from config.renderers import FastJSONParser, dumps as dumps_json, loads as loads_json
+from config.timing import phase
 
-from .companies_form import CompanySearchForm
 from .apollo_service import search_companies, search_people, search_tags, enrich_people_bulk
+from .apollo_service import (
+    CREDITS_COMPANY_SEARCH,
+    CREDITS_ENRICH_PER_PERSON,
+    CREDITS_PEOPLE_SEARCH,
+    CREDITS_TAGS_SEARCH,
+)
+from .circuit_breaker import CircuitOpenError, breakers_snapshot
+from .deadline import DeadlineExceeded, request_deadline
+from .domain_lookup import MAX_DOMAINS, lookup_domains, parse_domains
+from .export_formats import EXPORT_FORMATS, SingleWorkbook, csv_chunks, ndjson_lines
+from .key_pool import ApiKeysExhausted, get_key_pool
+from .lookalike_crawl import MAX_QUERIES as LOOKALIKE_MAX_QUERIES
+from .lookalike_crawl import MAX_RESULTS as LOOKALIKE_MAX_RESULTS
+from .lookalike_crawl import crawl as crawl_lookalikes
+from .models import SavedSearch, SavedSearchChange
+from .normalizers import COMPANY, PERSON, phone_numbers
+from .planner import plan_company_search, plan_export, plan_people_search
+from .saved_searches import canonical_payload, payload_hash
+from .sharded_search import DEEP_SEARCH_MAX_RESULTS, ShardingError, deep_search, shard_payloads
+from .scheduler import BULK, SchedulerRejected, get_scheduler, priority
+from .search_cache import cached_search_response, search_cache_key
+from .workbooks import EXPORT_PROCESS_MIN_COMPANIES, WorkbookQueue, contact_rows, get_export_pool
 
 logger = logging.getLogger(__name__)
 
-# Apollo credits (estimated) – logged per API request
-CREDITS_COMPANY_SEARCH = 1
-CREDITS_PEOPLE_SEARCH = 1
-CREDITS_TAGS_SEARCH = 0
-CREDITS_ENRICH_PER_PERSON = 1  # bulk_match: ~1 credit per contact
+# Per-request time budget (seconds) for all Apollo calls a view makes, including retries.
+# Keep below the platform function timeout. Override via env.
+SEARCH_DEADLINE_SECONDS = float(os.getenv("APOLLO_SEARCH_DEADLINE", "55"))
+EXPORT_DEADLINE_SECONDS = float(os.getenv("APOLLO_EXPORT_DEADLINE", "270"))
+DOMAIN_LOOKUP_DEADLINE_SECONDS = float(os.getenv("APOLLO_DOMAIN_LOOKUP_DEADLINE", "270"))
+DEEP_SEARCH_DEADLINE_SECONDS = float(os.getenv("APOLLO_DEEP_SEARCH_DEADLINE", "270"))
+LOOKALIKE_DEADLINE_SECONDS = float(os.getenv("APOLLO_LOOKALIKE_DEADLINE", "270"))
+# Export stops fetching people when less than this is left, so the ZIP can still be written.
+EXPORT_WRITE_RESERVE_SECONDS = float(os.getenv("APOLLO_EXPORT_WRITE_RESERVE", "10"))
+# Contacts fetched server-side per company that comes without people[]
+EXPORT_PEOPLE_PER_PAGE = 100
+
+APOLLO_CREDITS = counter(
+    "apollo_credits_estimated_total",
+    "Estimated Apollo credits (CREDITS_* constants) by source",
+    ["source"],
+)
+
+
+def _apollo_error_response(e: Exception) -> Response:
+    """
+    API error response for a failed Apollo-backed request: 504 deadline, 503 circuit open,
+    no API key with budget left or not admitted by the scheduler, else 500.
+    """
+    if isinstance(e, DeadlineExceeded):
+        return Response({"error": str(e)}, status=status.HTTP_504_GATEWAY_TIMEOUT)
+    if isinstance(e, (CircuitOpenError, ApiKeysExhausted, SchedulerRejected)):
+        return Response(
+            {"error": str(e)},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(max(1, int(e.retry_after)))},
+        )
+    return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 def log_apollo_credits(endpoint_label: str, credits: int, detail: str = ""):
     """Log Apollo credits consumed for this API request (estimated)."""
-    msg = f"====== {endpoint_label}  Credits: {credits} ======"
-    if detail:
-        msg += f"  ({detail})"
-    logger.info(msg)
-    # Also print so it shows in runserver console
-    print(msg)
+    # "get_people_for_company (org_id=...)" -> "get_people_for_company": keep label values few
+    APOLLO_CREDITS.inc(credits, source=endpoint_label.split(" (", 1)[0])
+    logger.info(
+        "====== %s  Credits: %s ======%s",
+        endpoint_label,
+        credits,
+        "  (%s)" % detail if detail else "",
+        extra={"apollo_credits": credits},
+    )
 
 
 from .serializers import (
     CompanySearchSerializer,
     CompanySearchResponseSerializer,
+    DeepSearchSerializer,
+    DomainLookupSerializer,
+    LookalikeCrawlSerializer,
     PeopleSearchSerializer,
     PeopleSearchResponseSerializer,
+    PlanSerializer,
+    SavedSearchChangeSerializer,
+    SavedSearchCreateSerializer,
+    SavedSearchSerializer,
 )
 
 
-def normalize_companies(accounts: list) -> list:
-    """Normalize Apollo API response to consistent format for UI."""
-    companies = []
-    for acc in accounts:
-        # All location-related fields (HQ + other offices) for search/filter
-        loc_parts = [
-            acc.get("organization_raw_address"),
-            acc.get("raw_address"),
-            acc.get("organization_city"),
-            acc.get("organization_state"),
-            acc.get("organization_country"),
-            acc.get("city"),
-            acc.get("state"),
-            acc.get("country"),
-        ]
-        searchable_location_string = " ".join(
-            str(p).strip() for p in loc_parts if p
-        ).lower()
-
-        companies.append(
-            {
-                "id": acc.get("id"),
-                "name": acc.get("name"),
-                "primary_domain": acc.get("primary_domain"),
-                "logo_url": acc.get("logo_url"),
-                "industry": acc.get("industry"),
-                "estimated_num_employees": acc.get("estimated_num_employees"),
-                "city": acc.get("organization_city") or acc.get("city"),
-                "state": acc.get("organization_state") or acc.get("state"),
-                "country": acc.get("organization_country") or acc.get("country"),
-                "searchable_location_string": searchable_location_string,
-                "linkedin_url": acc.get("linkedin_url"),
-                "founded_year": acc.get("founded_year"),
-                "annual_revenue": acc.get("organization_revenue"),
-                "annual_revenue_printed": acc.get("organization_revenue_printed"),
-                "phone": acc.get("phone"),
-                "website_url": acc.get("website_url"),
-            }
-        )
-    return companies
+def normalize_companies(accounts: list, mode: str = "dict") -> list:
+    """Normalize Apollo API response to consistent format for UI (see normalizers.COMPANY)."""
+    return COMPANY.many(mode)(accounts)
 
 
 def build_apollo_payload(data: dict) -> dict:
@@ -224,42 +251,53 @@ def build_apollo_payload(data: dict) -> dict:
     return payload
 
 
-def normalize_people(people: list) -> list:
-    """Normalize Apollo API response for people to consistent format for UI."""
-    contacts = []
-    for person in people:
-        # Get phone numbers
-        phone_numbers = []
-        if person.get("phone_numbers"):
-            phone_numbers = [
-                p.get("sanitized_number") or p.get("raw_number")
-                for p in person.get("phone_numbers", [])
-                if p
-            ]
+def normalize_people(people: list, mode: str = "dict") -> list:
+    """Normalize Apollo API response for people to consistent format for UI (see normalizers.PERSON)."""
+    return PERSON.many(mode)(people)
 
-        contacts.append(
-            {
-                "id": person.get("id"),
-                "first_name": person.get("first_name"),
-                "last_name": person.get("last_name"),
-                "name": person.get("name")
-                or f"{person.get('first_name', '')} {person.get('last_name', '')}".strip(),
-                "email": person.get("email"),
-                "title": person.get("title"),
-                "seniority": person.get("seniority"),
-                "city": person.get("city"),
-                "state": person.get("state"),
-                "country": person.get("country"),
-                "linkedin_url": person.get("linkedin_url"),
-                "phone_numbers": phone_numbers,
-                "organization_name": (
-                    person.get("organization", {}).get("name")
-                    if person.get("organization")
-                    else None
-                ),
-            }
-        )
-    return contacts
+
+# Person fields that only bulk_match enrichment fills in (search results carry none of them)
+ENRICHED_PERSON_FIELDS = ("email", "linkedin_url", "seniority", "city", "state", "country", "phone_numbers")
+
+SHAPE_PARAMETERS = [
+    OpenApiParameter(
+        "fields",
+        str,
+        description="Comma-separated keys to return (e.g. id,name,primary_domain); also accepted in the body",
+    ),
+    OpenApiParameter(
+        "layout",
+        str,
+        enum=["records", "columnar"],
+        description="columnar: one array of values per key instead of a list of objects; also accepted in the body",
+    ),
+]
+
+
+def _response_shape(request, schema):
+    """
+    (schema, columnar) for `fields` / `layout` from the query string or JSON body. `fields`
+    narrows the schema to a subset (its other fields are never computed); `layout=columnar`
+    returns {key: [values...]}. (Not `format`: DRF uses ?format= to pick a renderer.)
+    Raises ValueError on unknown fields or layout.
+    """
+    data = request.data if hasattr(request.data, "get") else {}
+    fields = request.query_params.get("fields") or data.get("fields")
+    layout = request.query_params.get("layout") or data.get("layout") or "records"
+    if layout not in ("records", "columnar"):
+        raise ValueError("layout must be records or columnar")
+    if fields:
+        if isinstance(fields, str):
+            fields = [f.strip() for f in fields.split(",") if f.strip()]
+        schema = schema.subset([str(f) for f in fields])
+    return schema, layout == "columnar"
+
+
+def _columns(names: tuple, rows: list) -> dict:
+    """Tuples in `names` order → {name: [values...]}."""
+    if not rows:
+        return {n: [] for n in names}
+    return dict(zip(names, map(list, zip(*rows))))
 
 
 def build_people_payload(data: dict) -> dict:
@@ -318,6 +356,9 @@ def company_search_view(request):
     View for searching companies via Apollo API.
     Shows filters form and results table.
     """
+    # Imported here so its choice lists are only built when the search page is served
+    from .companies_form import CompanySearchForm
+
     form = CompanySearchForm()
     companies = None
     total_count = 0
@@ -331,28 +372,32 @@ def company_search_view(request):
                 data.setdefault("page", 1)
                 data.setdefault("per_page", 25)
                 payload = build_apollo_payload(data)
-                response = search_companies(payload)
+                with request_deadline(SEARCH_DEADLINE_SECONDS):
+                    response = search_companies(payload)
                 # Prefer organizations array; fallback to accounts
                 organizations = response.get("organizations") or []
                 accounts = response.get("accounts") or []
                 raw_list = organizations if organizations else accounts
-                companies = normalize_companies(raw_list)
+                with phase("normalize"):
+                    companies = normalize_companies(raw_list)
                 pagination = response.get("pagination", {})
                 total_count = pagination.get("total_entries", len(companies))
-                log_apollo_credits("POST / (company search)", CREDITS_COMPANY_SEARCH)
+                if not response.get("_stale"):
+                    log_apollo_credits("POST / (company search)", CREDITS_COMPANY_SEARCH)
             except Exception as e:
                 error = str(e)
 
-    return render(
-        request,
-        "apollo_ingest/company_search.html",
-        {
-            "form": form,
-            "companies": companies,
-            "total_count": total_count,
-            "error": error,
-        },
-    )
+    with phase("render"):
+        return render(
+            request,
+            "apollo_ingest/company_search.html",
+            {
+                "form": form,
+                "companies": companies,
+                "total_count": total_count,
+                "error": error,
+            },
+        )
 
 
 class CompanySearchAPIView(APIView):
@@ -361,43 +406,245 @@ class CompanySearchAPIView(APIView):
     @extend_schema(
         request=CompanySearchSerializer,
         responses={200: CompanySearchResponseSerializer},
+        parameters=SHAPE_PARAMETERS,
         description="Search for companies using various filters",
         tags=["Companies"],
     )
     def post(self, request):
-        serializer = CompanySearchSerializer(data=request.data)
+        return self._handle(request, request.data, cached=False)
+
+    @extend_schema(
+        parameters=[CompanySearchSerializer] + SHAPE_PARAMETERS,
+        responses={200: CompanySearchResponseSerializer, 304: None},
+        description="Cacheable company search: the POST filters as query parameters (repeat list filters, "
+        "e.g. industries=a&industries=b). Strong ETag, Cache-Control max-age, 304 on If-None-Match.",
+        tags=["Companies"],
+    )
+    def get(self, request):
+        return self._handle(request, request.query_params, cached=True)
+
+    def _handle(self, request, data, cached: bool):
+        serializer = CompanySearchSerializer(data=data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
         try:
-            data = dict(serializer.validated_data)
-            data.setdefault("page", 1)
-            data.setdefault("per_page", 25)
-            payload = build_apollo_payload(data)
-            response = search_companies(payload)
+            schema, columnar = _response_shape(request, COMPANY)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        data = dict(serializer.validated_data)
+        data.setdefault("page", 1)
+        data.setdefault("per_page", 25)
+        payload = build_apollo_payload(data)
+        if not cached:
+            return self._search(request, payload, schema, columnar)
+        key = search_cache_key("companies", payload, schema.names, columnar)
+        return cached_search_response(request, key, lambda: self._search(request, payload, schema, columnar))
+
+    def _search(self, request, payload: dict, schema, columnar: bool):
+        try:
+            with request_deadline(SEARCH_DEADLINE_SECONDS):
+                response = search_companies(payload)
             organizations = response.get("organizations") or []
             accounts = response.get("accounts") or []
             raw_list = organizations if organizations else accounts
-            companies = normalize_companies(raw_list)
+            with phase("normalize"):
+                if columnar:
+                    companies = _columns(schema.names, schema.many("tuple")(raw_list))
+                else:
+                    companies = schema.many("dict")(raw_list)
             pagination = response.get("pagination", {})
-            total_count = pagination.get("total_entries", len(companies))
-            log_apollo_credits(
-                request.path or "/api/companies/search/",
-                CREDITS_COMPANY_SEARCH,
-            )
+            total_count = pagination.get("total_entries", len(raw_list))
+            # A stale (cached) response cost nothing
+            if not response.get("_stale"):
+                log_apollo_credits(
+                    request.path or "/api/companies/search/",
+                    CREDITS_COMPANY_SEARCH,
+                )
 
-            return Response(
-                {
-                    "companies": companies,
-                    "total_count": total_count,
-                    "page": pagination.get("page", 1),
-                    "per_page": pagination.get("per_page", 25),
-                }
-            )
+            body = {
+                "companies": companies,
+                "total_count": total_count,
+                "page": pagination.get("page", 1),
+                "per_page": pagination.get("per_page", 25),
+            }
+            if columnar:
+                body["layout"] = "columnar"
+            if response.get("_stale"):
+                body["stale"] = True
+            return Response(body)
         except Exception as e:
+            return _apollo_error_response(e)
+
+
+class DeepSearchAPIView(APIView):
+    """
+    Sharded deep company search: splits one query into disjoint partitions (employee ranges,
+    locations, industries), searches them in parallel at bulk priority and streams the
+    de-duplicated organizations as NDJSON (see sharded_search.py).
+    """
+
+    @extend_schema(
+        request=DeepSearchSerializer,
+        responses={
+            200: {
+                "description": "application/x-ndjson: {type: shard} per partition, {type: organization} per unique "
+                "organization, {type: page_error} per failed page, then one {type: summary} line"
+            }
+        },
+        description="Search past the per-page and pagination-depth limits by splitting the query into parallel shards",
+        tags=["Companies"],
+    )
+    def post(self, request):
+        serializer = DeepSearchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = dict(serializer.validated_data)
+        dimensions = list(dict.fromkeys(data.pop("shard_by")))
+        max_results = min(data.pop("max_results"), DEEP_SEARCH_MAX_RESULTS)
+        try:
+            shards = shard_payloads(build_apollo_payload(data), dimensions)
+        except ShardingError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        logger.info("Deep search: %s shard(s) by %s, max_results=%s", len(shards), ",".join(dimensions), max_results)
+        label = request.path or "/api/companies/search/deep/"
+
+        def lines():
+            for event in deep_search(shards, max_results, DEEP_SEARCH_DEADLINE_SECONDS):
+                if event["type"] == "summary":
+                    log_apollo_credits(
+                        label,
+                        event["apollo_calls"] * CREDITS_COMPANY_SEARCH,
+                        detail="%s shards, %s organizations" % (event["shards"], event["organizations"]),
+                    )
+                yield dumps_json(event) + b"\n"
+
+        response = StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+        response["X-Shard-Count"] = str(len(shards))
+        return response
+
+
+class LookalikeCrawlAPIView(APIView):
+    """
+    Lookalike crawl: expands seed organizations breadth-first through Apollo lookalike searches
+    (each frontier in parallel, every organization queried once) and streams newly found
+    companies as NDJSON (see lookalike_crawl.py).
+    """
+
+    @extend_schema(
+        request=LookalikeCrawlSerializer,
+        responses={
+            200: {
+                "description": "application/x-ndjson: {type: organization} per new company (with depth and via), "
+                "{type: level} after each frontier, {type: query_error} per failed search, then one {type: summary} line"
+            }
+        },
+        description="Build a target list from seed organizations by crawling lookalikes to a given depth",
+        tags=["Companies"],
+    )
+    def post(self, request):
+        serializer = LookalikeCrawlSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = dict(serializer.validated_data)
+        seed_ids = [s.strip() for s in data.pop("seed_ids") if s.strip()]
+        depth = data.pop("depth")
+        max_results = min(data.pop("max_results"), LOOKALIKE_MAX_RESULTS)
+        max_queries = min(data.pop("max_queries"), LOOKALIKE_MAX_QUERIES)
+        payload = build_apollo_payload(data)
+        logger.info(
+            "Lookalike crawl: %s seed(s), depth=%s, max_results=%s, max_queries=%s",
+            len(seed_ids),
+            depth,
+            max_results,
+            max_queries,
+        )
+        label = request.path or "/api/companies/lookalikes/crawl/"
+
+        def lines():
+            for event in crawl_lookalikes(
+                seed_ids, payload, depth, max_results, max_queries, LOOKALIKE_DEADLINE_SECONDS
+            ):
+                if event["type"] == "summary":
+                    log_apollo_credits(
+                        label,
+                        event["apollo_calls"] * CREDITS_COMPANY_SEARCH,
+                        detail="%s seeds, depth %s, %s organizations"
+                        % (event["seeds"], event["depth_reached"], event["organizations"]),
+                    )
+                yield dumps_json(event) + b"\n"
+
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+
+class SavedSearchListAPIView(APIView):
+    """Saved company searches, refreshed by `manage.py refresh_saved_searches`."""
+
+    @extend_schema(
+        responses={200: SavedSearchSerializer(many=True)},
+        description="List saved searches",
+        tags=["Saved searches"],
+    )
+    def get(self, request):
+        return Response({"saved_searches": SavedSearchSerializer(SavedSearch.objects.all(), many=True).data})
+
+    @extend_schema(
+        request=SavedSearchCreateSerializer,
+        responses={201: SavedSearchSerializer},
+        description="Save company search filters; stored as the canonical Apollo payload (paging removed)",
+        tags=["Saved searches"],
+    )
+    def post(self, request):
+        serializer = SavedSearchCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = dict(serializer.validated_data)
+        name = data.pop("name")
+        max_pages = data.pop("max_pages")
+        payload = canonical_payload(build_apollo_payload(data))
+        search = SavedSearch.objects.create(
+            name=name, payload=payload, payload_hash=payload_hash(payload), max_pages=max_pages
+        )
+        return Response(SavedSearchSerializer(search).data, status=status.HTTP_201_CREATED)
+
+
+class SavedSearchChangesAPIView(APIView):
+    """
+    Change feed: new / removed / changed organizations recorded by saved search refreshes, in
+    order. Consumers pass the last `next_since` they processed to get only newer changes.
+    """
+
+    MAX_LIMIT = 1000
+
+    @extend_schema(
+        responses={200: SavedSearchChangeSerializer(many=True)},
+        description="Changes after ?since=<change id> (default 0), optionally for one ?saved_search=<id> and ?kind=new|removed|changed; ?limit= up to 1000",
+        tags=["Saved searches"],
+    )
+    def get(self, request):
+        try:
+            since = int(request.query_params.get("since") or 0)
+            limit = min(int(request.query_params.get("limit") or 500), self.MAX_LIMIT)
+            saved_search = request.query_params.get("saved_search")
+            saved_search = int(saved_search) if saved_search else None
+        except ValueError:
             return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": "since, limit and saved_search must be integers"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        changes = SavedSearchChange.objects.filter(id__gt=since)
+        if saved_search is not None:
+            changes = changes.filter(saved_search_id=saved_search)
+        kind = request.query_params.get("kind")
+        if kind:
+            changes = changes.filter(kind=kind)
+        page = list(changes.order_by("id")[: max(1, limit)])
+        return Response(
+            {
+                "changes": SavedSearchChangeSerializer(page, many=True).data,
+                "next_since": page[-1].id if page else since,
+                "has_more": len(page) == max(1, limit),
+            }
+        )
 
 
 class TagsSearchAPIView(APIView):
@@ -428,16 +675,15 @@ class TagsSearchAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         try:
-            data = search_tags(q)
+            with request_deadline(SEARCH_DEADLINE_SECONDS):
+                data = search_tags(q)
             log_apollo_credits(
                 request.path or "/api/tags/search/",
                 CREDITS_TAGS_SEARCH,
             )
             return Response({"tags": data.get("tags", [])})
         except Exception as e:
-            return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            return _apollo_error_response(e)
 
     def post(self, request):
         q = (request.data.get("q") or request.data.get("q_tag_fuzzy_name") or "").strip()
@@ -447,16 +693,15 @@ class TagsSearchAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         try:
-            data = search_tags(q)
+            with request_deadline(SEARCH_DEADLINE_SECONDS):
+                data = search_tags(q)
             log_apollo_credits(
                 request.path or "/api/tags/search/",
                 CREDITS_TAGS_SEARCH,
             )
             return Response({"tags": data.get("tags", [])})
         except Exception as e:
-            return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+            return _apollo_error_response(e)
 
 
 class PeopleSearchAPIView(APIView):
@@ -465,89 +710,355 @@ class PeopleSearchAPIView(APIView):
     @extend_schema(
         request=PeopleSearchSerializer,
         responses={200: PeopleSearchResponseSerializer},
-        description="Search for people/contacts using organization ID, domains, job titles, or seniorities",
+        parameters=SHAPE_PARAMETERS,
+        description="Search for people/contacts using organization ID, domains, job titles, or seniorities. "
+        "Enrichment (credits) only runs when an enriched field (email, linkedin_url, seniority, location, phone_numbers) is requested.",
         tags=["People"],
     )
     def post(self, request):
-        serializer = PeopleSearchSerializer(data=request.data)
+        return self._handle(request, request.data, cached=False)
+
+    @extend_schema(
+        parameters=[PeopleSearchSerializer] + SHAPE_PARAMETERS,
+        responses={200: PeopleSearchResponseSerializer, 304: None},
+        description="Cacheable people search: the POST filters as query parameters (repeat list filters, "
+        "e.g. job_titles=CEO&job_titles=CTO). Strong ETag, Cache-Control max-age, 304 on If-None-Match.",
+        tags=["People"],
+    )
+    def get(self, request):
+        return self._handle(request, request.query_params, cached=True)
+
+    def _handle(self, request, data, cached: bool):
+        serializer = PeopleSearchSerializer(data=data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            schema, columnar = _response_shape(request, PERSON)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        payload = build_people_payload(serializer.validated_data)
+        if not cached:
+            return self._search(request, payload, schema, columnar)
+        key = search_cache_key("people", payload, schema.names, columnar)
+        return cached_search_response(request, key, lambda: self._search(request, payload, schema, columnar))
+
+    def _search(self, request, payload: dict, schema, columnar: bool):
+        names = schema.names
+        enrich_fields = [f for f in names if f in ENRICHED_PERSON_FIELDS]
+        # Enrichment is matched by id: normalize it even when it wasn't asked for, drop it after
+        drop_id = bool(enrich_fields) and "id" not in names
+        if drop_id:
+            schema = PERSON.subset(("id",) + names)
 
         try:
-            payload = build_people_payload(serializer.validated_data)
-            response = search_people(payload)
+            with request_deadline(SEARCH_DEADLINE_SECONDS):
+                response = search_people(payload)
 
-            # Apollo returns 'people' for people data (no email/linkedin from search)
-            people = normalize_people(response.get("people", []))
-            pagination = response.get("pagination", {})
-            # Total count for badge & pagination (Apollo may use total_entries or total_count)
-            total_count = (
-                pagination.get("total_entries")
-                or pagination.get("total_count")
-                or response.get("total_entries")
-                or response.get("total_count")
-            )
-            if total_count is None:
-                total_count = 0
-
-            # Enrich each person to get email, linkedin_url, etc. (consumes credits)
-            ids = [p["id"] for p in people if p.get("id")]
-            enrich_credits = 0
-            if ids:
-                enriched_by_id = enrich_people_bulk(ids)
-                _merge_enriched_into_people(people, enriched_by_id)
-                enrich_credits = len(ids) * CREDITS_ENRICH_PER_PERSON
-            total_credits = CREDITS_PEOPLE_SEARCH + enrich_credits
-            log_apollo_credits(
-                request.path or "/api/people/search/",
-                total_credits,
-                detail=f"search=1 enrich={enrich_credits} ({len(ids)} contacts)",
+                # Apollo returns 'people' for people data (no email/linkedin from search)
+                with phase("normalize"):
+                    people = schema.many("dict")(response.get("people", []))
+                pagination = response.get("pagination", {})
+                # Total count for badge & pagination (Apollo may use total_entries or total_count)
+                total_count = (
+                    pagination.get("total_entries")
+                    or pagination.get("total_count")
+                    or response.get("total_entries")
+                    or response.get("total_count")
+                )
+                if total_count is None:
+                    total_count = 0
+
+                # Enrich each person to get email, linkedin_url, etc. (consumes credits)
+                ids = [p["id"] for p in people if p.get("id")] if enrich_fields else []
+                enrich_credits = 0
+                if ids:
+                    enriched_by_id = enrich_people_bulk(ids)
+                    with phase("normalize"):
+                        if schema is PERSON:
+                            _merge_enriched_into_people(people, enriched_by_id)
+                        else:
+                            _merge_enriched_fields(people, enriched_by_id, enrich_fields)
+                    enrich_credits = len(ids) * CREDITS_ENRICH_PER_PERSON
+            if drop_id:
+                for p in people:
+                    del p["id"]
+            if columnar:
+                people = {n: [p[n] for p in people] for n in names}
+            # A stale (cached) search cost nothing; enrichment is never served stale
+            searches = 0 if response.get("_stale") else 1
+            if searches or enrich_credits:
+                log_apollo_credits(
+                    request.path or "/api/people/search/",
+                    searches * CREDITS_PEOPLE_SEARCH + enrich_credits,
+                    detail=f"search={searches} enrich={enrich_credits} ({len(ids)} contacts)",
+                )
+
+            body = {
+                "people": people,
+                "total_count": total_count,
+                "page": pagination.get("page", 1),
+                "per_page": pagination.get("per_page", 25),
+            }
+            if columnar:
+                body["layout"] = "columnar"
+            if response.get("_stale"):
+                body["stale"] = True
+            return Response(body)
+        except Exception as e:
+            return _apollo_error_response(e)
+
+
+class PlanAPIView(APIView):
+    """
+    Dry run: Apollo calls per endpoint, estimated credits and wall time of an export or search,
+    from cached responses and measured latencies, without calling Apollo (see planner.py).
+    """
+
+    @extend_schema(
+        request=PlanSerializer,
+        responses={
+            200: {
+                "description": "apollo_calls{} per endpoint, total_calls, estimated_credits, estimated_seconds, "
+                "latency_per_call{}, cached_counts / estimated_counts, deadline_seconds, fits_deadline"
+            }
+        },
+        description="operation=export takes the export body (companies, job_titles, seniorities); "
+        "company_search / people_search take that search's body (people_search honours fields). "
+        "Companies or searches without a cached response are planned at per_page contacts (upper bound).",
+        tags=["Apollo"],
+    )
+    def post(self, request):
+        serializer = PlanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        operation = serializer.validated_data["operation"]
+        if operation == "export":
+            companies = serializer.validated_data.get("companies") or []
+            if not companies:
+                return Response({"error": "No companies selected"}, status=status.HTTP_400_BAD_REQUEST)
+            return Response(
+                _export_plan(
+                    companies,
+                    serializer.validated_data.get("job_titles") or [],
+                    serializer.validated_data.get("seniorities") or [],
+                )
             )
 
+        search_serializer = (CompanySearchSerializer if operation == "company_search" else PeopleSearchSerializer)(
+            data=request.data
+        )
+        if not search_serializer.is_valid():
+            return Response(search_serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if operation == "company_search":
+            data = dict(search_serializer.validated_data)
+            data.setdefault("page", 1)
+            data.setdefault("per_page", 25)
+            plan = plan_company_search(build_apollo_payload(data))
+        else:
+            try:
+                schema, _ = _response_shape(request, PERSON)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            enrich = any(f in ENRICHED_PERSON_FIELDS for f in schema.names)
+            plan = plan_people_search(build_people_payload(search_serializer.validated_data), enrich)
+        result = plan.as_dict(deadline_seconds=SEARCH_DEADLINE_SECONDS)
+        result["fits_deadline"] = result["estimated_seconds"] <= SEARCH_DEADLINE_SECONDS
+        return Response(result)
+
+
+class ApolloStatusAPIView(APIView):
+    """
+    Health of the Apollo client: circuit breaker state per endpoint, API key pool usage,
+    scheduler queue depth and wait times per priority class.
+    """
+
+    @extend_schema(
+        responses={
+            200: {
+                "description": "circuits{} keyed by Apollo endpoint, api_keys[] (masked), scheduler{}"
+            }
+        },
+        description="Circuit breaker state (closed/open/half_open), error and slow-call rates per Apollo endpoint; per-key usage and remaining budget; interactive/bulk queue metrics",
+        tags=["Apollo"],
+    )
+    def get(self, request):
+        return Response(
+            {
+                "circuits": breakers_snapshot(),
+                "api_keys": get_key_pool().snapshot(),
+                "scheduler": get_scheduler().snapshot(),
+            }
+        )
+
+
+class _TextParser(BaseParser):
+    """text/plain or text/csv body → str (bulk domain lists)."""
+
+    media_type = "text/*"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream.read().decode("utf-8-sig", errors="replace")
+
+
+def _domain_lookup_input(request):
+    """
+    (text, values, is_csv, errors) from a JSON body (object with `domains`, or a bare list),
+    a multipart `file` upload or a text/CSV body. errors is set (400 body) for any other body.
+    """
+    data = request.data
+    if isinstance(data, str):
+        return data, None, "csv" in (request.content_type or ""), None
+    if isinstance(data, list):
+        return "", data, False, None
+    upload = request.FILES.get("file")
+    if upload is not None:
+        text = upload.read().decode("utf-8-sig", errors="replace")
+        is_csv = upload.name.lower().endswith(".csv") or "csv" in (upload.content_type or "")
+        return text, None, is_csv, None
+    if isinstance(data, QueryDict):
+        data = data.dict()  # form fields are plain text, not JSON
+    serializer = DomainLookupSerializer(data=data)
+    if not serializer.is_valid():
+        return "", None, False, serializer.errors
+    domains = serializer.validated_data["domains"]
+    if isinstance(domains, list):
+        return "", domains, False, None
+    return domains, None, False, None
+
+
+class DomainLookupAPIView(APIView):
+    """
+    Bulk lookup: resolve thousands of domains to Apollo organizations. Domains are normalized,
+    de-duplicated and searched in chunks of 100 running concurrently at bulk priority; results
+    are streamed as NDJSON while chunks complete (see domain_lookup.py).
+    """
+
+    parser_classes = [FastJSONParser, MultiPartParser, FormParser, _TextParser]
+
+    @extend_schema(
+        request=DomainLookupSerializer,
+        responses={
+            200: {
+                "description": "application/x-ndjson: one {type: organization} line per organization, "
+                "{type: chunk_error} per failed chunk, then one {type: summary} line with unmatched[] and invalid[]"
+            }
+        },
+        description="Resolve a large list of domains (JSON list/string, text/plain or text/csv body, or a multipart `file` upload) to organizations",
+        tags=["Companies"],
+    )
+    def post(self, request):
+        text, values, is_csv, errors = _domain_lookup_input(request)
+        if errors is not None:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        domains, invalid, input_count = parse_domains(text, values, is_csv)
+        if not domains:
             return Response(
-                {
-                    "people": people,
-                    "total_count": total_count,
-                    "page": pagination.get("page", 1),
-                    "per_page": pagination.get("per_page", 25),
-                }
+                {"error": "No valid domains", "invalid": invalid[:100]},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-        except Exception as e:
+        if len(domains) > MAX_DOMAINS:
             return Response(
-                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": "Too many domains: %s (max %s)" % (len(domains), MAX_DOMAINS)},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+        logger.info(
+            "Domain lookup: %s input(s), %s unique domain(s), %s invalid",
+            input_count,
+            len(domains),
+            len(invalid),
+        )
+        label = request.path or "/api/companies/lookup-domains/"
+
+        def lines():
+            for event in lookup_domains(
+                domains, DOMAIN_LOOKUP_DEADLINE_SECONDS, invalid=invalid, input_count=input_count
+            ):
+                if event["type"] == "summary":
+                    log_apollo_credits(
+                        label,
+                        event["apollo_calls"] * CREDITS_COMPANY_SEARCH,
+                        detail="%s domains, %s matched" % (event["unique_domains"], event["matched"]),
+                    )
+                yield dumps_json(event) + b"\n"
+
+        response = StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+        response["X-Domain-Count"] = str(len(domains))
+        return response
 
 
 def _merge_enriched_into_people(people: list, enriched_by_id: dict) -> None:
-    """Merge enriched email, linkedin, seniority, location, phone into people in place."""
+    """Merge enriched email, linkedin, seniority, location, phone into people (dicts or records) in place."""
+    if not enriched_by_id:
+        return
     for p in people:
         pid = p.get("id")
         if pid is None:
             continue
-        key = str(pid)
-        if key not in enriched_by_id:
+        e = enriched_by_id.get(str(pid))
+        if e is None:
             continue
-        e = enriched_by_id[key]
-        if e.get("email"):
-            p["email"] = e.get("email")
-        if e.get("linkedin_url"):
-            p["linkedin_url"] = e.get("linkedin_url")
-        if e.get("seniority"):
-            p["seniority"] = e.get("seniority")
-        if e.get("city") is not None:
-            p["city"] = e.get("city")
-        if e.get("state") is not None:
-            p["state"] = e.get("state")
-        if e.get("country") is not None:
-            p["country"] = e.get("country")
-        if e.get("phone_numbers"):
-            p["phone_numbers"] = [
-                ph.get("sanitized_number") or ph.get("raw_number")
-                for ph in e.get("phone_numbers", [])
-                if ph
-            ]
+        g = e.get
+        value = g("email")
+        if value:
+            p["email"] = value
+        value = g("linkedin_url")
+        if value:
+            p["linkedin_url"] = value
+        value = g("seniority")
+        if value:
+            p["seniority"] = value
+        value = g("city")
+        if value is not None:
+            p["city"] = value
+        value = g("state")
+        if value is not None:
+            p["state"] = value
+        value = g("country")
+        if value is not None:
+            p["country"] = value
+        value = g("phone_numbers")
+        if value:
+            p["phone_numbers"] = phone_numbers(value)
+
+
+def _merge_enriched_fields(people: list, enriched_by_id: dict, fields) -> None:
+    """_merge_enriched_into_people for the given ENRICHED_PERSON_FIELDS only (sparse fieldsets)."""
+    for p in people:
+        e = enriched_by_id.get(str(p.get("id")))
+        if e is None:
+            continue
+        for f in fields:
+            value = e.get(f)
+            if f == "phone_numbers":
+                if value:
+                    p[f] = phone_numbers(value)
+            elif f in ("city", "state", "country"):
+                if value is not None:
+                    p[f] = value
+            elif value:
+                p[f] = value
+
+
+def _company_people_payloads(organization_id, domain, job_titles=None, seniorities=None, per_page=100) -> tuple:
+    """
+    Apollo people search payloads of get_people_for_company: the filtered search and the
+    unfiltered retry made when it finds nobody (None without job title / seniority filters).
+    """
+    payload = {
+        "page": 1,
+        "per_page": per_page,
+        "organization_id": organization_id and str(organization_id).strip() or None,
+        "domains": (domain or "").strip() or None,
+        "job_titles": job_titles or [],
+        "seniorities": seniorities or [],
+    }
+    payload_no_filter = None
+    if job_titles or seniorities:
+        payload_no_filter = build_people_payload(dict(payload, job_titles=[], seniorities=[]))
+    return build_people_payload(payload), payload_no_filter
 
 
+@priority(BULK)
 def get_people_for_company(
     organization_id,
     domain,
@@ -557,33 +1068,25 @@ def get_people_for_company(
 ):
     """
     Same flow as PeopleSearchAPIView / frontend loadContacts: people search + enrich.
-    Returns list of normalized, enriched people for the given company.
+    Returns list of normalized, enriched people (PersonRecord, dict-like .get / []) for the given company.
+    Runs as bulk traffic so interactive searches keep their reserved Apollo capacity.
     """
-    payload = {
-        "page": 1,
-        "per_page": per_page,
-        "organization_id": organization_id and str(organization_id).strip() or None,
-        "domains": (domain or "").strip() or None,
-        "job_titles": job_titles or [],
-        "seniorities": seniorities or [],
-    }
+    payload, payload_no_filter = _company_people_payloads(organization_id, domain, job_titles, seniorities, per_page)
     people = []
-    search_calls = 1
     try:
-        response = search_people(build_people_payload(payload))
-        people = normalize_people(response.get("people", []))
-        if not people and (job_titles or seniorities):
-            payload_no_filter = {
-                "page": 1,
-                "per_page": per_page,
-                "organization_id": payload["organization_id"],
-                "domains": payload["domains"],
-                "job_titles": [],
-                "seniorities": [],
-            }
-            response2 = search_people(build_people_payload(payload_no_filter))
-            people = normalize_people(response2.get("people", []))
-            search_calls = 2
+        response = search_people(payload)
+        # Stale (cached) responses are not charged
+        search_calls = 0 if response.get("_stale") else 1
+        with phase("normalize"):
+            people = normalize_people(response.get("people", []), mode="record")
+        if not people and payload_no_filter is not None:
+            response2 = search_people(payload_no_filter)
+            if not response2.get("_stale"):
+                search_calls += 1
+            with phase("normalize"):
+                people = normalize_people(response2.get("people", []), mode="record")
+    except (DeadlineExceeded, CircuitOpenError, ApiKeysExhausted, SchedulerRejected):
+        raise
     except Exception as e:
         logger.exception(
             "get_people_for_company failed for org_id=%s domain=%s: %s",
@@ -596,7 +1099,8 @@ def get_people_for_company(
         ids = [p["id"] for p in people if p.get("id")]
         if ids:
             enriched_by_id = enrich_people_bulk(ids)
-            _merge_enriched_into_people(people, enriched_by_id)
+            with phase("normalize"):
+                _merge_enriched_into_people(people, enriched_by_id)
             enrich_credits = len(ids) * CREDITS_ENRICH_PER_PERSON
             search_credits = search_calls * CREDITS_PEOPLE_SEARCH
             total_credits = search_credits + enrich_credits
@@ -614,26 +1118,168 @@ def _sanitize_filename(name: str, max_len: int = 200) -> str:
     return (s[:max_len] + "...") if len(s) > max_len else (s or "company")
 
 
+EXPORT_INCOMPLETE_FILENAME = "_EXPORT_INCOMPLETE.txt"
+
+
+def _export_incomplete_note(skipped: list) -> str:
+    """Text listing companies left out of a partial export (time budget ran out)."""
+    lines = [
+        "Export stopped early: the request time budget ran out.",
+        "The following %s company(ies) were not exported; export them again separately:" % len(skipped),
+        "",
+    ]
+    for c in skipped:
+        lines.append(
+            "%s\t%s\t%s"
+            % (
+                c.get("id") or "",
+                c.get("name") or "",
+                c.get("domain") or c.get("primary_domain") or "",
+            )
+        )
+    return "\n".join(lines) + "\n"
+
+
+def _write_workbooks(zf, finished) -> None:
+    """Write (filename, bytes) from a WorkbookQueue iterator; waiting for the pool counts as xlsx."""
+    while True:
+        with phase("xlsx"):
+            item = next(finished, None)
+        if item is None:
+            return
+        with phase("zip"):
+            zf.writestr(*item)
+
+
+def _export_plan(companies: list, job_titles: list, seniorities: list) -> dict:
+    """Dry-run plan of an export (planner.py) with the export's deadline."""
+    entries = []
+    for c in companies:
+        if isinstance(c.get("people"), list) and c.get("people"):
+            entries.append((True, None, None))
+            continue
+        domain = (c.get("domain") or c.get("primary_domain") or "").strip()
+        payload, fallback = _company_people_payloads(
+            c.get("id"), domain, job_titles, seniorities, EXPORT_PEOPLE_PER_PAGE
+        )
+        entries.append((False, payload, fallback))
+    result = plan_export(entries).as_dict(
+        companies=len(companies),
+        companies_with_people=sum(1 for has_people, _, _ in entries if has_people),
+        deadline_seconds=EXPORT_DEADLINE_SECONDS,
+    )
+    result["fits_deadline"] = result["estimated_seconds"] <= EXPORT_DEADLINE_SECONDS - EXPORT_WRITE_RESERVE_SECONDS
+    return result
+
+
+def _export_people(companies: list, job_titles: list, seniorities: list, deadline, skipped: list, stats: dict):
+    """
+    (company, people) for each exported company, in order. Companies without people[] are fetched
+    server-side (stats["server_side_fetches"]); once the deadline leaves less than
+    EXPORT_WRITE_RESERVE_SECONDS, they go to `skipped` instead.
+    """
+    for c in companies:
+        cid = c.get("id")
+        cname = c.get("name") or "company"
+        cdomain = (c.get("domain") or c.get("primary_domain") or "").strip()
+        people = c.get("people") if isinstance(c.get("people"), list) else []
+        if not people:
+            if skipped or deadline.remaining() < EXPORT_WRITE_RESERVE_SECONDS:
+                skipped.append(c)
+                continue
+            stats["server_side_fetches"] += 1
+            try:
+                logger.info(
+                    "Export: fetching people for company id=%s name=%s", cid, cname
+                )
+                people = get_people_for_company(
+                    organization_id=cid,
+                    domain=cdomain or None,
+                    job_titles=job_titles,
+                    seniorities=seniorities,
+                    per_page=EXPORT_PEOPLE_PER_PAGE,
+                )
+            except DeadlineExceeded:
+                logger.warning(
+                    "Export: deadline reached at company id=%s name=%s", cid, cname
+                )
+                skipped.append(c)
+                continue
+            except Exception as e:
+                logger.warning(
+                    "Export: skip company id=%s name=%s: %s", cid, cname, e
+                )
+        yield c, people
+
+
+def _log_export_done(companies: list, stats: dict, skipped: list) -> None:
+    if stats["server_side_fetches"] > 0:
+        logger.info(
+            "Export done: %s companies total, %s fetched server-side (credits burned above per company: search + enrich)",
+            len(companies),
+            stats["server_side_fetches"],
+        )
+    if skipped:
+        logger.warning(
+            "Export partial: %s of %s companies skipped (deadline %ss)",
+            len(skipped),
+            len(companies),
+            EXPORT_DEADLINE_SECONDS,
+        )
+
+
 @require_http_methods(["POST"])
 @ensure_csrf_cookie
 def export_companies_view(request):
     """
     Export selected companies as one Excel file per company (Name, Email, LinkedIn, Job Title, Seniority, Location),
     then return all files in a single ZIP download. Uses current job_titles and seniorities from request body.
+    Server-side people fetches run under EXPORT_DEADLINE_SECONDS; when the budget runs out the ZIP is
+    returned with the companies done so far plus _EXPORT_INCOMPLETE.txt (header X-Export-Partial: true).
+    Large exports build the workbooks in a process pool when APOLLO_EXPORT_PROCESS_WORKERS is set
+    (see workbooks.py); the ZIP keeps company order either way.
+
+    `max_credits` (optional) refuses the export with 409 when its dry-run plan (PlanAPIView) estimates more.
+    `format` (body or query string) picks a flat export instead, one row per contact with the company
+    in each row (see export_formats.py): csv and ndjson are streamed (skipped companies are listed in
+    the NDJSON summary line and in trailing "# SKIPPED" rows of the CSV), xlsx is a single workbook
+    with a Skipped sheet.
     """
-    import json
-
     try:
-        body = json.loads(request.body)
+        body = loads_json(request.body)
     except Exception:
-        return Response({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
+        return JsonResponse({"error": "Invalid JSON"}, status=status.HTTP_400_BAD_REQUEST)
     companies = body.get("companies") or []
     job_titles = body.get("job_titles") or []
     seniorities = body.get("seniorities") or []
+    export_format = body.get("format") or request.GET.get("format") or "zip"
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse(
+            {"error": "format must be one of: %s" % ", ".join(EXPORT_FORMATS)},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
     if not companies:
-        return Response(
+        return JsonResponse(
             {"error": "No companies selected"}, status=status.HTTP_400_BAD_REQUEST
         )
+    max_credits = body.get("max_credits")
+    if max_credits is not None:
+        if not isinstance(max_credits, int) or isinstance(max_credits, bool) or max_credits < 0:
+            return JsonResponse(
+                {"error": "max_credits must be a non-negative integer"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        plan = _export_plan(companies, job_titles, seniorities)
+        if plan["estimated_credits"] > max_credits:
+            logger.warning(
+                "Export refused: plan needs ~%s credits, budget %s", plan["estimated_credits"], max_credits
+            )
+            return JsonResponse(
+                {
+                    "error": "Export would use ~%s credits (max_credits %s)" % (plan["estimated_credits"], max_credits),
+                    "plan": plan,
+                },
+                status=status.HTTP_409_CONFLICT,
+            )
     # Export: use people[] from request if present (frontend called people/search per company); else fetch server-side
     companies_with_people = sum(1 for c in companies if isinstance(c.get("people"), list) and len(c.get("people") or []) > 0)
     fetch_count = len(companies) - companies_with_people
@@ -643,75 +1289,78 @@ def export_companies_view(request):
         detail="%s companies with people[] from request, %s will fetch server-side (see below)" % (companies_with_people, fetch_count),
     )
     logger.info(
-        "Export: %s company(ies) | %s with people[] (no extra credits) | %s to fetch server-side (credits = search + enrich per company)",
+        "Export (%s): %s company(ies) | %s with people[] (no extra credits) | %s to fetch server-side (credits = search + enrich per company)",
+        export_format,
         len(companies),
         companies_with_people,
         fetch_count,
     )
-    zip_buffer = io.BytesIO()
-    server_side_fetches = 0
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-        for c in companies:
-            cid = c.get("id")
-            cname = c.get("name") or "company"
-            cdomain = (c.get("domain") or c.get("primary_domain") or "").strip()
-            people = c.get("people") if isinstance(c.get("people"), list) else []
-            if not people:
-                server_side_fetches += 1
-                try:
-                    logger.info(
-                        "Export: fetching people for company id=%s name=%s", cid, cname
-                    )
-                    people = get_people_for_company(
-                        organization_id=cid,
-                        domain=cdomain or None,
-                        job_titles=job_titles,
-                        seniorities=seniorities,
-                        per_page=100,
-                    )
-                except Exception as e:
-                    logger.warning(
-                        "Export: skip company id=%s name=%s: %s", cid, cname, e
-                    )
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Contacts"
-            ws.append(
-                ["Name", "Email", "LinkedIn", "Job Title", "Seniority", "Location"]
-            )
-            for p in people:
-                loc = (
-                    ", ".join(
-                        filter(None, [p.get("city"), p.get("state"), p.get("country")])
-                    )
-                    or ""
-                )
-                ws.append(
-                    [
-                        p.get("name") or "",
-                        p.get("email") or "",
-                        p.get("linkedin_url") or "",
-                        p.get("title") or "",
-                        p.get("seniority") or "",
-                        loc,
-                    ]
+    stats = {"server_side_fetches": 0}
+    # Companies left out because the time budget ran out before their people could be fetched
+    skipped = []
+
+    if export_format in ("csv", "ndjson"):
+
+        def chunks():
+            with request_deadline(EXPORT_DEADLINE_SECONDS) as deadline:
+                rows = (
+                    (c, contact_rows(people))
+                    for c, people in _export_people(companies, job_titles, seniorities, deadline, skipped, stats)
                 )
-            xlsx_buffer = io.BytesIO()
-            wb.save(xlsx_buffer)
-            xlsx_buffer.seek(0)
-            safe_name = _sanitize_filename(cname) + ".xlsx"
-            zf.writestr(safe_name, xlsx_buffer.getvalue())
-    zip_buffer.seek(0)
-    if server_side_fetches > 0:
-        logger.info(
-            "Export done: %s companies total, %s fetched server-side (credits burned above per company: search + enrich)",
-            len(companies),
-            server_side_fetches,
-        )
-        print(
-            "====== Export summary: %s companies, %s server-side fetches (credits = lines above) ======"
-            % (len(companies), server_side_fetches)
+                if export_format == "csv":
+                    yield from csv_chunks(rows, skipped)
+                else:
+                    yield from ndjson_lines(
+                        rows,
+                        lambda: {
+                            "companies": len(companies) - len(skipped),
+                            "server_side_fetches": stats["server_side_fetches"],
+                            "skipped": [c.get("id") for c in skipped],
+                            "partial": bool(skipped),
+                        },
+                    )
+            _log_export_done(companies, stats, skipped)
+
+        if export_format == "csv":
+            response = StreamingHttpResponse(chunks(), content_type="text/csv; charset=utf-8")
+        else:
+            response = StreamingHttpResponse(chunks(), content_type="application/x-ndjson")
+        response["Content-Disposition"] = 'attachment; filename="companies_export.%s"' % export_format
+        return response
+
+    if export_format == "xlsx":
+        with phase("xlsx"):
+            workbook = SingleWorkbook()
+        with request_deadline(EXPORT_DEADLINE_SECONDS) as deadline:
+            for c, people in _export_people(companies, job_titles, seniorities, deadline, skipped, stats):
+                with phase("xlsx"):
+                    workbook.add(c, contact_rows(people))
+        with phase("xlsx"):
+            f = workbook.save(skipped)
+        response = FileResponse(
+            f,
+            as_attachment=True,
+            filename="companies_export.xlsx",
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         )
-    response = HttpResponse(zip_buffer.getvalue(), content_type="application/zip")
-    response["Content-Disposition"] = 'attachment; filename="companies_export.zip"'
+    else:
+        zip_buffer = io.BytesIO()
+        pool = get_export_pool() if len(companies) >= EXPORT_PROCESS_MIN_COMPANIES else None
+        workbooks = WorkbookQueue(pool)
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf, request_deadline(
+            EXPORT_DEADLINE_SECONDS
+        ) as deadline:
+            for c, people in _export_people(companies, job_titles, seniorities, deadline, skipped, stats):
+                with phase("xlsx"):
+                    workbooks.add(_sanitize_filename(c.get("name") or "company") + ".xlsx", contact_rows(people))
+                _write_workbooks(zf, workbooks.ready())
+            _write_workbooks(zf, workbooks.drain())
+            if skipped:
+                zf.writestr(EXPORT_INCOMPLETE_FILENAME, _export_incomplete_note(skipped))
+        response = HttpResponse(zip_buffer.getvalue(), content_type="application/zip")
+        response["Content-Disposition"] = 'attachment; filename="companies_export.zip"'
+    _log_export_done(companies, stats, skipped)
+    if skipped:
+        response["X-Export-Partial"] = "true"
+        response["X-Export-Skipped"] = str(len(skipped))
     return response
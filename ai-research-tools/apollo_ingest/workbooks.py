@@ -0,0 +1,150 @@
+"""
+Per-company contact workbooks for the ZIP export, optionally built in a process pool.
+
+openpyxl serialization is pure-Python CPU work, so on the request thread an export uses one
+core however many the host has. With APOLLO_EXPORT_PROCESS_WORKERS > 0, exports of at least
+EXPORT_PROCESS_MIN_COMPANIES companies hand workbook building to a shared process pool: the
+view sends each company's compact rows (tuples of six strings, not people dicts) and writes
+the returned .xlsx bytes to the ZIP in company order.
+
+This module must not import Django: pool workers import it (and openpyxl) and nothing else.
+The pool is off by default; serverless hosts (Vercel) have one core and no usable
+multiprocessing. If the pool can't start or breaks, workbooks are built in-process.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+EXPORT_HEADER = ("Name", "Email", "LinkedIn", "Job Title", "Seniority", "Location")
+EXPORT_PROCESS_WORKERS = int(os.getenv("APOLLO_EXPORT_PROCESS_WORKERS", "0"))
+# Below this, pickling rows to a worker costs more than it saves
+EXPORT_PROCESS_MIN_COMPANIES = int(os.getenv("APOLLO_EXPORT_PROCESS_MIN_COMPANIES", "50"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def contact_rows(people: list) -> list:
+    """Export rows for one company: (name, email, linkedin, title, seniority, location) tuples."""
+    rows = []
+    for p in people:
+        loc = ", ".join(filter(None, [p.get("city"), p.get("state"), p.get("country")])) or ""
+        rows.append(
+            (
+                p.get("name") or "",
+                p.get("email") or "",
+                p.get("linkedin_url") or "",
+                p.get("title") or "",
+                p.get("seniority") or "",
+                loc,
+            )
+        )
+    return rows
+
+
+def workbook_bytes(rows: list) -> bytes:
+    """.xlsx file with the "Contacts" sheet for these rows."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Contacts"
+    ws.append(EXPORT_HEADER)
+    for row in rows:
+        ws.append(row)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def _warm_worker():
+    import openpyxl  # noqa: F401  (paid once per worker, not on its first workbook)
+
+
+def get_export_pool():
+    """Shared ProcessPoolExecutor, or None when disabled or it can't be created."""
+    global _pool
+    if EXPORT_PROCESS_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # fork is unsafe in a threaded server; forkserver is cheap after the first worker
+                method = "forkserver" if sys.platform.startswith("linux") else "spawn"
+                try:
+                    _pool = ProcessPoolExecutor(
+                        max_workers=EXPORT_PROCESS_WORKERS,
+                        mp_context=multiprocessing.get_context(method),
+                        initializer=_warm_worker,
+                    )
+                except (OSError, NotImplementedError, ValueError) as e:
+                    logger.warning("Export process pool unavailable, building workbooks in-process: %s", e)
+                    return None
+    return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+class WorkbookQueue:
+    """
+    Workbooks in submission order. add() starts building (in the pool, or right away without
+    one); ready() yields finished (filename, bytes) from the front without waiting, drain()
+    waits for the rest.
+    """
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self._pending = deque()
+
+    def add(self, filename: str, rows: list):
+        if self.pool is not None:
+            try:
+                self._pending.append((filename, rows, self.pool.submit(workbook_bytes, rows)))
+                return
+            except (BrokenProcessPool, RuntimeError) as e:
+                self._fall_back(e)
+        self._pending.append((filename, rows, workbook_bytes(rows)))
+
+    def ready(self):
+        while self._pending and self._done(self._pending[0][2]):
+            yield self._pop()
+
+    def drain(self):
+        while self._pending:
+            yield self._pop()
+
+    @staticmethod
+    def _done(result) -> bool:
+        return isinstance(result, bytes) or result.done()
+
+    def _pop(self) -> tuple:
+        filename, rows, result = self._pending.popleft()
+        if isinstance(result, bytes):
+            return filename, result
+        try:
+            return filename, result.result()
+        except (BrokenProcessPool, CancelledError) as e:
+            # Cancelled: another export discarded the shared pool while this one was queued
+            self._fall_back(e)
+            return filename, workbook_bytes(rows)
+
+    def _fall_back(self, error):
+        if self.pool is not None:
+            logger.warning("Export process pool failed, building workbooks in-process: %s", error)
+            _discard_pool(self.pool)
+            self.pool = None
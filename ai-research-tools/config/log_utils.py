@@ -0,0 +1,125 @@
+"""
+Logging helpers: lazy, size-capped payload formatting and a background (queue-based) handler.
+
+- LazyJson(obj) / KeyValues(dict) are passed as logging *arguments*; they are only turned
+  into text when the record is handled, so disabled levels cost nothing.
+  Long lists are cut to LOG_MAX_LIST_ITEMS items and the text to LOG_MAX_CHARS.
+- BackgroundStreamHandler renders the message on the calling thread (its arguments may be
+  mutated right after the call) and formats / writes the record on a listener thread, so
+  request threads never block on stdout.
+- JsonFormatter writes one JSON object per line (LOG_FORMAT=json), including `extra` fields.
+
+settings.LOGGING wires these up.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_MAX_LIST_ITEMS = int(os.getenv("LOG_MAX_LIST_ITEMS", "10"))
+LOG_MAX_CHARS = int(os.getenv("LOG_MAX_CHARS", "2000"))
+
+# Attributes every LogRecord has; anything else on a record came from `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def truncate(obj, max_items: int = LOG_MAX_LIST_ITEMS):
+    """Copy of obj with lists/tuples longer than max_items cut (plus an "... N more" marker)."""
+    if isinstance(obj, dict):
+        return {k: truncate(v, max_items) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        if len(obj) > max_items:
+            return [truncate(v, max_items) for v in obj[:max_items]] + [
+                "... %d more" % (len(obj) - max_items)
+            ]
+        return [truncate(v, max_items) for v in obj]
+    return obj
+
+
+class LazyJson:
+    """JSON text of obj (big lists truncated), computed only if the record is handled."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self):
+        text = json.dumps(truncate(self.obj), sort_keys=True, default=str)
+        if len(text) > LOG_MAX_CHARS:
+            text = text[:LOG_MAX_CHARS] + "...(%d chars)" % len(text)
+        return text
+
+
+class KeyValues:
+    """`k=v k2=v2` text of a dict, computed only if the record is handled."""
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: dict):
+        self.items = items
+
+    def __str__(self):
+        return " ".join("%s=%s" % (k, v) for k, v in self.items.items())
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, extra fields, exception."""
+
+    def format(self, record):
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class BackgroundStreamHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler with its own listener thread writing to a stream (stdout by default).
+    The message is rendered by the logging caller, the record formatted and written by the
+    listener thread.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.target = logging.StreamHandler(stream or sys.stdout)
+        self.listener = logging.handlers.QueueListener(self.queue, self.target)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def setFormatter(self, fmt):
+        super().setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Render msg % args now: args are often dicts the caller keeps changing (responses
+        # marked _stale, payloads), which the listener thread must not read later. LazyJson
+        # truncation keeps this cheap, and disabled levels never get here. Exception text
+        # is captured now too, while the traceback is still meaningful.
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            formatter = self.formatter or logging.Formatter()
+            record.exc_text = formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
@@ -0,0 +1,275 @@
+"""
+In-process metrics (counters and histograms) exposed on /metrics in the Prometheus text format.
+
+Modules declare their metrics once at import time and update them inline:
+
+    APOLLO_REQUESTS = counter("apollo_requests_total", "Apollo HTTP calls", ["endpoint", "status"])
+    APOLLO_REQUESTS.inc(endpoint="mixed_companies/search", status="200")
+
+Multiple worker processes: set METRICS_MULTIPROC_DIR to a directory shared by the workers.
+Each process then writes its values to <dir>/metrics-<pid>.json (at most every
+METRICS_FLUSH_SECONDS, and at exit), and /metrics in any worker sums the files of all workers.
+Without it, /metrics shows the serving process only.
+
+/metrics needs either `Authorization: Bearer <METRICS_TOKEN>` (for scrapers) or a logged-in
+super admin session.
+"""
+
+import atexit
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = (os.getenv("METRICS_MULTIPROC_DIR") or "").strip() or None
+FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+METRICS_TOKEN = (os.getenv("METRICS_TOKEN") or "").strip()
+
+# Seconds; covers fast cache hits up to Apollo's slowest searches
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_metrics = {}
+_last_flush = 0.0
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        # label values tuple -> value
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError("%s expects labels %s, got %s" % (self.name, self.labelnames, sorted(labels)))
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def dump(self) -> dict:
+        return {
+            "type": self.kind,
+            "help": self.help,
+            "labelnames": list(self.labelnames),
+            "samples": [[list(k), v] for k, v in self._values.items()],
+        }
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _maybe_flush()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # per-bucket counts (last = +Inf), sum, count
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            i = 0
+            for bound in self.buckets:
+                if value <= bound:
+                    break
+                i += 1
+            entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+        _maybe_flush()
+
+    def mean(self, **labels):
+        """Average observed value for these labels in this process, or None before the first one."""
+        with _lock:
+            entry = self._values.get(self._key(labels))
+            return entry[1] / entry[2] if entry else None
+
+    def dump(self) -> dict:
+        d = super().dump()
+        d["buckets"] = list(self.buckets)
+        return d
+
+
+def _register(cls, name, *args, **kwargs):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError("Metric %s already registered as %s" % (name, metric.kind))
+        return metric
+
+
+def counter(name: str, help_text: str, labelnames=()) -> Counter:
+    """Process-wide counter (created on first call, returned as-is afterwards)."""
+    return _register(Counter, name, help_text, labelnames)
+
+
+def histogram(name: str, help_text: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+    """Process-wide histogram (created on first call, returned as-is afterwards)."""
+    return _register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+
+def _snapshot() -> dict:
+    with _lock:
+        return {name: m.dump() for name, m in _metrics.items()}
+
+
+def _process_file() -> Path:
+    return Path(MULTIPROC_DIR) / ("metrics-%d.json" % os.getpid())
+
+
+def flush() -> None:
+    """Write this process's values to METRICS_MULTIPROC_DIR (no-op without it)."""
+    global _last_flush
+    if not MULTIPROC_DIR:
+        return
+    _last_flush = time.monotonic()
+    try:
+        Path(MULTIPROC_DIR).mkdir(parents=True, exist_ok=True)
+        path = _process_file()
+        tmp = path.with_suffix(".tmp%d" % threading.get_ident())
+        tmp.write_text(json.dumps(_snapshot()))
+        os.replace(tmp, path)
+    except Exception:
+        logger.warning("Could not write metrics to %s", MULTIPROC_DIR, exc_info=True)
+
+
+def _maybe_flush() -> None:
+    if MULTIPROC_DIR and time.monotonic() - _last_flush >= FLUSH_SECONDS:
+        flush()
+
+
+def _reset_after_fork() -> None:
+    """A forked worker starts from zero; its parent's values are in the parent's file."""
+    global _last_flush
+    _last_flush = 0.0
+    for m in _metrics.values():
+        m._values = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+atexit.register(flush)
+
+
+def _merge(dumps: list) -> dict:
+    merged = {}
+    for dump in dumps:
+        for name, d in dump.items():
+            target = merged.get(name)
+            if target is None:
+                target = merged[name] = dict(d, samples={})
+            samples = target["samples"]
+            for labels, value in d["samples"]:
+                key = tuple(labels)
+                if d["type"] == "histogram":
+                    current = samples.get(key)
+                    if current is None:
+                        samples[key] = [list(value[0]), value[1], value[2]]
+                    elif len(current[0]) == len(value[0]):
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                else:
+                    samples[key] = samples.get(key, 0) + value
+    return merged
+
+
+def collect() -> dict:
+    """name -> metric dump with samples summed over all worker processes."""
+    if not MULTIPROC_DIR:
+        return _merge([_snapshot()])
+    flush()
+    dumps = []
+    for path in Path(MULTIPROC_DIR).glob("metrics-*.json"):
+        try:
+            dumps.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return _merge(dumps)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{%s}" % ",".join('%s="%s"' % (n, _escape(str(v))) for n, v in pairs)
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return repr(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+
+def render_text(merged: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name in sorted(merged):
+        d = merged[name]
+        names = d["labelnames"]
+        lines.append("# HELP %s %s" % (name, d["help"].replace("\\", "\\\\").replace("\n", "\\n")))
+        lines.append("# TYPE %s %s" % (name, d["type"]))
+        for key in sorted(d["samples"]):
+            value = d["samples"][key]
+            if d["type"] == "histogram":
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(list(d["buckets"]) + ["+Inf"], counts):
+                    cumulative += n
+                    le = bound if bound == "+Inf" else _number(float(bound))
+                    lines.append("%s_bucket%s %d" % (name, _labels_text(names, key, [("le", le)]), cumulative))
+                lines.append("%s_sum%s %s" % (name, _labels_text(names, key), _number(total)))
+                lines.append("%s_count%s %d" % (name, _labels_text(names, key), count))
+            else:
+                lines.append("%s%s %s" % (name, _labels_text(names, key), _number(value)))
+    return "\n".join(lines) + "\n"
+
+
+def _authorized(request) -> bool:
+    auth = request.headers.get("Authorization") or ""
+    if METRICS_TOKEN and auth.startswith("Bearer "):
+        return hmac.compare_digest(auth[len("Bearer "):].strip(), METRICS_TOKEN)
+    return request.session.get("super_admin") is True
+
+
+def metrics_view(request):
+    """GET /metrics: all metrics in the Prometheus text format."""
+    if request.method != "GET":
+        return HttpResponse(status=405, headers={"Allow": "GET"})
+    if not _authorized(request):
+        return HttpResponse(
+            "Unauthorized\n",
+            status=401,
+            content_type="text/plain",
+            headers={"WWW-Authenticate": 'Bearer realm="metrics"'},
+        )
+    return HttpResponse(
+        render_text(collect()),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
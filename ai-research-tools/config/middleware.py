@@ -1,17 +1,22 @@
 """
 Middleware: require login for entire site. Only staff/superuser can access.
 Unauthenticated or non-staff users are redirected to login page.
+/api/* also accepts `Authorization: Bearer <API token>` (apollo_ingest/api_tokens.py).
 """
 
 from django.conf import settings
+from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.utils.deprecation import MiddlewareMixin
 
+from apollo_ingest.api_tokens import verify_token
+
 
 class LoginRequiredMiddleware(MiddlewareMixin):
     """
     DB-free auth gate for serverless deploys (Vercel).
     Uses signed-cookie session flag `super_admin=True`.
+    Bearer API tokens on /api/* are the exception: checked against the DB, cached per process.
     """
 
     def process_request(self, request):
@@ -26,6 +31,29 @@ class LoginRequiredMiddleware(MiddlewareMixin):
             return None
         if path.startswith("/static/") or path == "/favicon.ico":
             return None
+        # Scrapers authenticate with a bearer token; metrics_view checks token or session itself
+        if path == "/metrics":
+            return None
+        # Warm-up pings (cron / uptime checks) carry no session; the view exposes timings only
+        # and checks WARMUP_TOKEN itself before any outbound step
+        if path == "/_warmup/":
+            return None
+
+        # Scripted clients: API token instead of session + CSRF
+        if path.startswith("/api/"):
+            auth = request.headers.get("Authorization", "")
+            if auth.startswith("Bearer "):
+                token_id = verify_token(auth[len("Bearer "):].strip())
+                if token_id is None:
+                    return JsonResponse(
+                        {"error": "Invalid, expired or revoked API token"},
+                        status=401,
+                        headers={"WWW-Authenticate": 'Bearer realm="api"'},
+                    )
+                request.api_token_id = token_id
+                # No session cookie is involved, so there is nothing for CSRF to protect
+                request._dont_enforce_csrf_checks = True
+                return None
 
         # Require super admin session
         if request.session.get("super_admin") is not True:
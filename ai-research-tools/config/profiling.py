@@ -0,0 +1,219 @@
+"""
+Opt-in profiling of single requests, for super admins.
+
+Send `X-Profile: cprofile` (or `sample`) or add `?_profile=cprofile` / `?_profile=sample` to any
+request. ProfilingMiddleware (after LoginRequiredMiddleware, and only for super_admin sessions)
+runs the request under:
+
+- cprofile: the deterministic profiler; download as a pstats file (snakeviz, `python -m pstats`)
+- sample:   a sampling profiler reading the request thread's stack every PROFILE_SAMPLE_MS;
+            download as collapsed stacks (flamegraph.pl, speedscope)
+
+Each profile is saved in PROFILE_DIR with a metadata file (path, status, duration, ...); the
+response carries X-Profile-Id and X-Profile-Url. Browse with /_profiles/ and download with
+/_profiles/<id>/. Only the newest PROFILE_KEEP profiles are kept.
+
+Only the request thread is profiled; for streaming responses only the time until the response
+object is returned is covered.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.http import FileResponse, Http404, JsonResponse
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "ai-research-profiles"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_SAMPLE_MS = float(os.getenv("PROFILE_SAMPLE_MS", "5"))
+
+MODES = ("cprofile", "sample")
+_ID_RE = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+_EXTENSIONS = {"cprofile": ".prof", "sample": ".collapsed"}
+
+# The deterministic profiler is process-global; only one request can use it at a time
+_cprofile_lock = threading.Lock()
+
+
+def _frame_label(code) -> str:
+    """`func (pkg/module.py)` with the last two path components, for collapsed stacks."""
+    parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    name = getattr(code, "co_qualname", code.co_name)
+    return "%s (%s)" % (name, "/".join(parts[-2:]))
+
+
+class StackSampler(threading.Thread):
+    """Samples one thread's call stack at a fixed interval; counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.reverse()
+            self.stacks[";".join(labels)] += 1
+            self.samples += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def collapsed(self) -> str:
+        return "".join("%s %d\n" % (stack, n) for stack, n in self.stacks.most_common())
+
+
+def _requested_mode(request):
+    mode = (request.headers.get("X-Profile") or request.GET.get("_profile") or "").strip().lower()
+    return mode if mode in MODES else None
+
+
+def _new_profile_id() -> str:
+    return "%s-%s" % (datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S"), secrets.token_hex(4))
+
+
+def _newest_first(paths) -> list:
+    # Ids only resolve to the second; the write time orders profiles saved within one
+    return sorted(paths, key=lambda path: (path.stat().st_mtime_ns, path.name), reverse=True)
+
+
+def _prune() -> None:
+    metas = _newest_first(PROFILE_DIR.glob("*.json"))
+    for meta in metas[PROFILE_KEEP:]:
+        for path in PROFILE_DIR.glob(meta.stem + ".*"):
+            path.unlink(missing_ok=True)
+
+
+def _save(profile_id: str, mode: str, write_data, meta: dict) -> None:
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    write_data(PROFILE_DIR / (profile_id + _EXTENSIONS[mode]))
+    (PROFILE_DIR / (profile_id + ".json")).write_text(json.dumps(meta, indent=2))
+    _prune()
+
+
+class ProfilingMiddleware:
+    """Profiles requests that ask for it (see module docstring). Super admin sessions only."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = _requested_mode(request)
+        if mode is None or request.session.get("super_admin") is not True:
+            return self.get_response(request)
+        if mode == "cprofile":
+            if not _cprofile_lock.acquire(blocking=False):
+                response = self.get_response(request)
+                response["X-Profile-Error"] = "profiler busy with another request"
+                return response
+            try:
+                profiler = cProfile.Profile()
+                started = time.perf_counter()
+                profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    profiler.disable()
+                duration = time.perf_counter() - started
+            finally:
+                _cprofile_lock.release()
+            write_data = profiler.dump_stats
+            extra = {}
+        else:
+            sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_MS / 1000.0)
+            started = time.perf_counter()
+            sampler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                sampler.stop()
+            duration = time.perf_counter() - started
+
+            def write_data(path):
+                path.write_text(sampler.collapsed())
+
+            extra = {"samples": sampler.samples, "sample_interval_ms": PROFILE_SAMPLE_MS}
+
+        profile_id = _new_profile_id()
+        meta = {
+            "id": profile_id,
+            "mode": mode,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "method": request.method,
+            "path": request.path,
+            "query": {k: v for k, v in request.GET.items() if k != "_profile"},
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "pid": os.getpid(),
+            **extra,
+        }
+        try:
+            _save(profile_id, mode, write_data, meta)
+        except Exception:
+            logger.warning("Could not save profile %s", profile_id, exc_info=True)
+            response["X-Profile-Error"] = "could not save profile"
+            return response
+        logger.info("Saved %s profile %s for %s %s", mode, profile_id, request.method, request.path)
+        response["X-Profile-Id"] = profile_id
+        response["X-Profile-Url"] = "/_profiles/%s/" % profile_id
+        return response
+
+
+def _require_super_admin(request):
+    if request.session.get("super_admin") is not True:
+        raise Http404()
+
+
+def profiles_list_view(request):
+    """GET /_profiles/: metadata of the stored profiles, newest first."""
+    _require_super_admin(request)
+    profiles = []
+    if PROFILE_DIR.is_dir():
+        for meta in _newest_first(PROFILE_DIR.glob("*.json")):
+            try:
+                data = json.loads(meta.read_text())
+            except (OSError, ValueError):
+                continue
+            data["download_url"] = "/_profiles/%s/" % meta.stem
+            profiles.append(data)
+    return JsonResponse({"profile_dir": str(PROFILE_DIR), "profiles": profiles})
+
+
+def profile_download_view(request, profile_id: str):
+    """GET /_profiles/<id>/: the profile file (.prof pstats or .collapsed stacks)."""
+    _require_super_admin(request)
+    if not _ID_RE.match(profile_id):
+        raise Http404()
+    for mode, ext in _EXTENSIONS.items():
+        path = PROFILE_DIR / (profile_id + ext)
+        if path.is_file():
+            return FileResponse(
+                open(path, "rb"),
+                as_attachment=True,
+                filename=path.name,
+                content_type="application/octet-stream" if mode == "cprofile" else "text/plain",
+            )
+    raise Http404()
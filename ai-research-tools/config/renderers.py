@@ -0,0 +1,75 @@
+"""
+Fast JSON for the API: DRF renderer/parser backed by orjson, with the stdlib as fallback.
+
+orjson is optional (requirements.txt lists it; without it everything goes through DRF's
+stdlib JSONRenderer / JSONParser unchanged). Output matches DRF's compact JSON: no whitespace,
+non-ASCII kept as UTF-8, U+2028/U+2029 escaped, DRF's encoder for datetimes (UTC as `Z`) and
+for types orjson doesn't know (Decimal, lazy strings, querysets, ...). Requests for indented
+output (browsable API, `Accept: application/json; indent=4`) and anything orjson rejects (ints
+over 64 bits) fall back to the stdlib renderer. One difference: NaN / Infinity render as null,
+where DRF's strict JSON raises.
+
+dumps() / loads() are the same codec for code outside DRF views (NDJSON streams, the export).
+"""
+
+import json
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Datetimes go to DRF's encoder: orjson writes UTC as +00:00, DRF as Z
+_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+_default = JSONEncoder().default
+
+
+def dumps(data) -> bytes:
+    """Compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_default, option=_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def loads(data):
+    """Parse JSON bytes / str; raises ValueError on invalid input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same as DRF: these are valid JSON but not valid JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % exc)
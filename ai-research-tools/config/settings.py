@@ -60,6 +60,8 @@ INSTALLED_APPS = [
 SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
 
 MIDDLEWARE = [
+    # First, so Server-Timing `total` covers the whole stack (see config/timing.py)
+    "config.timing.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -69,6 +71,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "config.middleware.LoginRequiredMiddleware",
+    # After the login gate: only super_admin sessions can ask for a profile (see config/profiling.py)
+    "config.profiling.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -157,6 +161,16 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 # Django REST Framework
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    # orjson-backed JSON (config/renderers.py); falls back to the stdlib when orjson is missing
+    "DEFAULT_RENDERER_CLASSES": [
+        "config.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 # DRF Spectacular (Swagger) Settings
@@ -171,3 +185,26 @@ SPECTACULAR_SETTINGS = {
 LOGIN_URL = "/login/"
 LOGIN_REDIRECT_URL = "/"
 LOGOUT_REDIRECT_URL = "/login/"
+
+# Logging: records go through a queue to a background thread that formats and writes them to
+# stdout (see config/log_utils.py). LOG_FORMAT=json for one JSON object per line.
+# APOLLO_LOG_LEVEL=DEBUG adds the full (truncated) Apollo request bodies.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").strip().lower()
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+        "json": {"()": "config.log_utils.JsonFormatter"},
+    },
+    "handlers": {
+        "background": {
+            "class": "config.log_utils.BackgroundStreamHandler",
+            "formatter": "json" if LOG_FORMAT == "json" else "text",
+        },
+    },
+    "root": {"handlers": ["background"], "level": os.getenv("LOG_LEVEL", "INFO")},
+    "loggers": {
+        "apollo_ingest": {"level": os.getenv("APOLLO_LOG_LEVEL", "INFO")},
+    },
+}
@@ -0,0 +1,379 @@
+import contextvars
+import datetime
+import decimal
+import io
+import json
+import logging
+import os
+import pstats
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from unittest import mock
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from . import metrics, profiling, warmup
+from .log_utils import BackgroundStreamHandler, JsonFormatter, KeyValues, LazyJson
+from .metrics import Counter, Histogram, collect, counter, histogram, render_text
+from .profiling import ProfilingMiddleware
+from .renderers import FastJSONParser, FastJSONRenderer, dumps, loads
+from .simple_auth import ADMIN_EMAIL, ADMIN_PASSWORD
+from .timing import ServerTimingMiddleware, current_timings, phase, record, start_timing, stop_timing, timed
+
+
+class TimingTests(SimpleTestCase):
+    def test_phases_are_noops_outside_a_timed_request(self):
+        self.assertIsNone(current_timings())
+        with phase("apollo") as p:
+            self.assertIs(p, phase("other"))  # shared no-op
+        record("apollo", 1.0)
+        self.assertIsNone(current_timings())
+
+    def test_collects_phases(self):
+        @timed("normalize")
+        def normalize():
+            return 42
+
+        timings, token = start_timing()
+        try:
+            with phase("apollo"):
+                pass
+            with phase("apollo"):
+                pass
+            record("apollo-queue", 0.25)
+            self.assertEqual(normalize(), 42)
+            # Worker threads started with a copied context report to the same collector
+            ctx = contextvars.copy_context()
+            thread = threading.Thread(target=ctx.run, args=(record, "enrich", 0.5))
+            thread.start()
+            thread.join()
+        finally:
+            stop_timing(token)
+
+        self.assertIsNone(current_timings())
+        phases = timings.as_dict()
+        self.assertEqual({name: p["count"] for name, p in phases.items()}, {"apollo": 2, "apollo-queue": 1, "normalize": 1, "enrich": 1})
+        self.assertEqual(phases["apollo-queue"]["ms"], 250.0)
+        header = timings.header_value()
+        self.assertIn('apollo;dur=', header)
+        self.assertIn('desc="2 calls"', header)
+        self.assertIn('apollo-queue;dur=250.0;desc="1 call"', header)
+        self.assertRegex(header, r", total;dur=\d+\.\d$")
+
+
+class ServerTimingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        def view(request):
+            with phase("apollo"):
+                pass
+            return HttpResponse("ok")
+
+        self.middleware = ServerTimingMiddleware(view)
+        self.middleware.sample_rate = 0.0
+
+    def test_unsampled_request_is_not_timed(self):
+        response = self.middleware(RequestFactory().get("/"))
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_forced_request_gets_header_and_log_line(self):
+        request = RequestFactory().get("/", HTTP_X_SERVER_TIMING="1")
+        with self.assertLogs("config.timing", "INFO") as logs:
+            response = self.middleware(request)
+        self.assertRegex(response["Server-Timing"], r'^apollo;dur=\d+\.\d;desc="1 call", total;dur=\d+\.\d$')
+        (log_record,) = logs.records
+        self.assertEqual(log_record.request_timing["status"], 200)
+        self.assertEqual(log_record.request_timing["phases"]["apollo"]["count"], 1)
+
+    def test_sample_rate(self):
+        self.middleware.sample_rate = 1.0
+        self.assertTrue(self.middleware(RequestFactory().get("/")).has_header("Server-Timing"))
+
+    def test_whole_stack(self):
+        response = self.client.get("/login/", HTTP_X_SERVER_TIMING="1")
+        self.assertRegex(response["Server-Timing"], r"total;dur=\d+\.\d$")
+
+
+class MetricsTests(SimpleTestCase):
+    def test_text_format(self):
+        requests_total = Counter("test_requests_total", "Calls\nby status", ["endpoint", "status"])
+        requests_total.inc(endpoint="search", status="200")
+        requests_total.inc(2, endpoint="search", status="200")
+        requests_total.inc(endpoint='say "hi"', status="500")
+        latency = Histogram("test_duration_seconds", "Latency", ["endpoint"], buckets=(1.0, 0.1))
+        for value in (0.25, 0.5, 4.0):
+            latency.observe(value, endpoint="search")
+        text = render_text(metrics._merge([{m.name: m.dump() for m in (requests_total, latency)}]))
+        self.assertEqual(
+            text.splitlines(),
+            [
+                "# HELP test_duration_seconds Latency",
+                "# TYPE test_duration_seconds histogram",
+                'test_duration_seconds_bucket{endpoint="search",le="0.1"} 0',
+                'test_duration_seconds_bucket{endpoint="search",le="1"} 2',
+                'test_duration_seconds_bucket{endpoint="search",le="+Inf"} 3',
+                'test_duration_seconds_sum{endpoint="search"} 4.75',
+                'test_duration_seconds_count{endpoint="search"} 3',
+                "# HELP test_requests_total Calls\\nby status",
+                "# TYPE test_requests_total counter",
+                'test_requests_total{endpoint="say \\"hi\\"",status="500"} 1',
+                'test_requests_total{endpoint="search",status="200"} 3',
+            ],
+        )
+        self.assertEqual(latency.mean(endpoint="search"), 4.75 / 3)
+        self.assertIsNone(latency.mean(endpoint="other"))
+
+    def test_registry(self):
+        metric = counter("test_registry_total", "Registry", ["kind"])
+        self.assertIs(counter("test_registry_total", "Registry", ["kind"]), metric)
+        with self.assertRaises(ValueError):
+            histogram("test_registry_total", "Registry")
+        with self.assertRaises(ValueError):
+            metric.inc(other="x")
+
+    def test_worker_files_are_summed(self):
+        calls = counter("test_multiproc_total", "Calls", ["endpoint"])
+        latency = histogram("test_multiproc_seconds", "Latency", ["endpoint"], buckets=(1.0,))
+        calls.inc(endpoint="search")
+        latency.observe(0.5, endpoint="search")
+        other_worker = {
+            calls.name: dict(calls.dump(), samples=[[["search"], 2], [["tags"], 1]]),
+            latency.name: dict(latency.dump(), samples=[[["search"], [[0, 1], 3.0, 1]]]),
+        }
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(metrics, "MULTIPROC_DIR", tmp):
+            Path(tmp, "metrics-999999.json").write_text(json.dumps(other_worker))
+            merged = collect()
+            self.assertTrue(Path(tmp, "metrics-%d.json" % os.getpid()).exists())
+        self.assertEqual(merged[calls.name]["samples"], {("search",): 3, ("tags",): 1})
+        self.assertEqual(merged[latency.name]["samples"], {("search",): [[1, 1], 3.5, 2]})
+
+
+class MetricsViewTests(SimpleTestCase):
+    def setUp(self):
+        counter("test_view_total", "View test").inc()
+
+    def test_needs_token_or_super_admin(self):
+        with mock.patch.object(metrics, "METRICS_TOKEN", "scrape-token"):
+            self.assertEqual(self.client.get("/metrics").status_code, 401)
+            self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn("\ntest_view_total ", response.content.decode())
+
+        self.client.post("/login/", {"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+        self.assertEqual(self.client.post("/metrics").status_code, 405)
+
+
+class ProfilingTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.profile_dir = Path(tmp.name)
+        for name, value in (("PROFILE_DIR", self.profile_dir), ("PROFILE_SAMPLE_MS", 1.0)):
+            patcher = mock.patch.object(profiling, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        def slow_view(request):
+            time.sleep(0.05)
+            return HttpResponse("ok")
+
+        self.middleware = ProfilingMiddleware(slow_view)
+
+    def request(self, path: str, super_admin: bool = True, **headers):
+        request = RequestFactory().get(path, **headers)
+        request.session = {"super_admin": True} if super_admin else {}
+        return request
+
+    def test_only_super_admins_can_profile(self):
+        response = self.middleware(self.request("/?_profile=cprofile", super_admin=False))
+        self.assertFalse(response.has_header("X-Profile-Id"))
+        response = self.middleware(self.request("/", HTTP_X_PROFILE="unknown"))
+        self.assertFalse(response.has_header("X-Profile-Id"))
+        self.assertEqual(list(self.profile_dir.iterdir()), [])
+
+    def test_sample_profile(self):
+        response = self.middleware(self.request("/search/?q=x&_profile=sample"))
+        profile_id = response["X-Profile-Id"]
+        self.assertEqual(response["X-Profile-Url"], "/_profiles/%s/" % profile_id)
+        meta = json.loads((self.profile_dir / (profile_id + ".json")).read_text())
+        self.assertEqual((meta["mode"], meta["path"], meta["query"], meta["status"]), ("sample", "/search/", {"q": "x"}, 200))
+        self.assertGreater(meta["samples"], 0)
+        self.assertIn("slow_view", (self.profile_dir / (profile_id + ".collapsed")).read_text())
+
+    def test_cprofile_is_one_request_at_a_time(self):
+        with profiling._cprofile_lock:
+            response = self.middleware(self.request("/", HTTP_X_PROFILE="cprofile"))
+        self.assertEqual(response["X-Profile-Error"], "profiler busy with another request")
+        self.assertFalse(response.has_header("X-Profile-Id"))
+
+    def test_keeps_newest_profiles(self):
+        with mock.patch.object(profiling, "PROFILE_KEEP", 1):
+            first = self.middleware(self.request("/", HTTP_X_PROFILE="cprofile"))["X-Profile-Id"]
+            second = self.middleware(self.request("/", HTTP_X_PROFILE="cprofile"))["X-Profile-Id"]
+        self.assertNotEqual(first, second)
+        self.assertEqual(sorted(p.name for p in self.profile_dir.iterdir()), [second + ".json", second + ".prof"])
+
+    def test_list_and_download(self):
+        self.assertNotEqual(self.client.get("/_profiles/").status_code, 200)
+        self.client.post("/login/", {"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        profile_id = self.client.get("/_profiles/", HTTP_X_PROFILE="cprofile")["X-Profile-Id"]
+
+        (listed,) = self.client.get("/_profiles/").json()["profiles"]
+        self.assertEqual((listed["id"], listed["download_url"]), (profile_id, "/_profiles/%s/" % profile_id))
+
+        response = self.client.get(listed["download_url"])
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="%s.prof"' % profile_id)
+        download = self.profile_dir / "download.prof"
+        download.write_bytes(b"".join(response.streaming_content))
+        self.assertGreater(pstats.Stats(str(download)).total_calls, 0)
+
+        self.assertEqual(self.client.get("/_profiles/20260101T000000-00000000/").status_code, 404)
+        self.assertEqual(self.client.get("/_profiles/..%2Fsecret/").status_code, 404)
+
+
+class Unprintable:
+    def __str__(self):
+        raise AssertionError("rendered a disabled record")
+
+
+class LogUtilsTests(SimpleTestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.handler = BackgroundStreamHandler(self.stream)
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger("config.tests.background")
+        self.logger.addHandler(self.handler)
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def output(self) -> str:
+        self.handler.close()  # stops the listener after it drained the queue
+        return self.stream.getvalue()
+
+    def test_message_is_rendered_by_the_caller(self):
+        self.handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        payload = {"organizations": list(range(12))}
+        self.logger.info("response %s", LazyJson(payload))
+        payload["_stale"] = True
+        payload["organizations"].clear()
+        self.logger.debug("disabled %s", Unprintable())
+        self.assertEqual(
+            self.output(),
+            'INFO response {"organizations": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, "... 2 more"]}\n',
+        )
+
+    def test_exception_text_is_captured(self):
+        self.handler.setFormatter(JsonFormatter())
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            self.logger.exception("failed %s", KeyValues({"page": 2, "per_page": 100}), extra={"apollo_credits": 3})
+        (line,) = self.output().splitlines()
+        data = json.loads(line)
+        self.assertEqual((data["level"], data["message"], data["apollo_credits"]), ("ERROR", "failed page=2 per_page=100", 3))
+        self.assertIn("ValueError: boom", data["exception"])
+
+    def test_close_is_idempotent(self):
+        self.logger.info("one")
+        self.assertEqual(self.output(), "one\n")
+        self.handler.close()
+
+
+class WarmupTests(SimpleTestCase):
+    def setUp(self):
+        # The outbound steps are mocked: only who may trigger them is under test here
+        self.apollo_http = self.patch("_apollo_http")
+        self.openai = self.patch("_openai")
+        self.patch("WARMUP_TOKEN", "warm-token")
+
+    def patch(self, name, value=mock.DEFAULT):
+        patcher = mock.patch.object(warmup, name, value)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def warmup(self, path: str = "/_warmup/", **headers) -> dict:
+        response = self.client.get(path, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_anonymous_ping_does_only_local_work(self):
+        for headers in ({}, {"HTTP_AUTHORIZATION": "Bearer wrong"}):
+            data = self.warmup(**headers)
+            self.assertFalse(data["authorized"])
+            self.assertEqual(list(data["steps"]), ["urls", "apollo_http", "openai", "export", "search_form"])
+            self.assertTrue(all(step["ok"] for step in data["steps"].values()))
+            self.apollo_http.assert_called_with(False)
+            self.openai.assert_called_with(False)
+
+    def test_token_or_super_admin_opens_connections(self):
+        self.assertTrue(self.warmup(HTTP_AUTHORIZATION="Bearer warm-token")["authorized"])
+        self.apollo_http.assert_called_with(True)
+        self.openai.assert_called_with(True)
+
+        self.warmup("/_warmup/?connect=0", HTTP_AUTHORIZATION="Bearer warm-token")
+        self.apollo_http.assert_called_with(False)
+
+        self.client.post("/login/", {"username": ADMIN_EMAIL, "password": ADMIN_PASSWORD})
+        self.assertTrue(self.warmup()["authorized"])
+
+    def test_failed_step_reports_error_type(self):
+        self.apollo_http.side_effect = OSError("unreachable host 10.0.0.1")
+        step = self.warmup(HTTP_AUTHORIZATION="Bearer warm-token")["steps"]["apollo_http"]
+        self.assertEqual((step["ok"], step["error"]), (False, "OSError"))
+        self.assertEqual(self.client.post("/_warmup/").status_code, 405)
+
+
+class FastJSONTests(SimpleTestCase):
+    data = {
+        "text": "line\u2028separator\u2029 Zürich 東京",
+        "numbers": [1, 1.5, 2**70, -0.0, True, None],
+        "created": datetime.datetime(2026, 10, 19, 1, 2, 3, 456789, tzinfo=datetime.timezone.utc),
+        "naive": datetime.datetime(2026, 10, 19, 1, 2, 3),
+        "day": datetime.date(2026, 10, 19),
+        "revenue": decimal.Decimal("1.10"),
+        "id": uuid.UUID(int=5),
+        "label": gettext_lazy("Companies"),
+        "tags": {"saas"},
+        "by_page": {1: "a", None: "b"},
+        "nested": [{"a": {"b": [()]}}],
+    }
+
+    def test_renderer_matches_drf(self):
+        expected = JSONRenderer().render(self.data)
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+        # dumps() is the same codec without the JavaScript-safe escapes
+        self.assertEqual(dumps(self.data), expected.replace(b"\\u2028", "\u2028".encode()).replace(b"\\u2029", "\u2029".encode()))
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+        # Documented difference: DRF's strict JSON raises instead
+        self.assertEqual(FastJSONRenderer().render({"ratio": float("nan")}), b'{"ratio":null}')
+        indented = "application/json; indent=2"
+        self.assertEqual(
+            FastJSONRenderer().render(self.data, indented), JSONRenderer().render(self.data, indented)
+        )
+
+    def test_parser_matches_drf(self):
+        body = JSONRenderer().render({"domains": ["a.com", "ü.de"], "per_page": 100, "x": [1.5, None, 2**70]})
+
+        def parse(parser, raw, encoding="utf-8"):
+            return parser.parse(io.BytesIO(raw), "application/json", {"encoding": encoding})
+
+        self.assertEqual(parse(FastJSONParser(), body), parse(JSONParser(), body))
+        self.assertEqual(loads(body), parse(JSONParser(), body))
+        latin1 = '{"city": "Zürich"}'.encode("latin-1")
+        self.assertEqual(parse(FastJSONParser(), latin1, "latin-1"), {"city": "Zürich"})
+        for raw in (b"", b"{", b'{"a": NaN}', b"[1,]"):
+            for parser in (FastJSONParser(), JSONParser()):
+                with self.assertRaises(ParseError):
+                    parse(parser, raw)
+
@@ -0,0 +1,190 @@
+"""
+Per-request phase timing: where did a request spend its time (Apollo, enrichment, normalization,
+XLSX writing, template rendering, OpenAI)?
+
+Code marks phases with `with phase("apollo"): ...` (or `record("apollo-queue", seconds)` for a
+duration measured elsewhere). ServerTimingMiddleware turns recording on for sampled requests,
+then adds the totals to the `Server-Timing` response header (visible in the browser's network
+panel) and writes one structured log line per request.
+
+When a request is not sampled there is no collector in context and phase() returns a shared
+no-op context manager, so instrumented code pays one context-variable lookup per phase.
+
+Env:
+  SERVER_TIMING_SAMPLE_RATE  fraction of requests timed (default 1 with DEBUG, else 0)
+  A request with header `X-Server-Timing: 1` is always timed.
+"""
+
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+from .log_utils import LazyJson
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("request_timings", default=None)
+
+
+def _sample_rate() -> float:
+    default = "1" if settings.DEBUG else "0"
+    try:
+        return float(os.getenv("SERVER_TIMING_SAMPLE_RATE", default))
+    except ValueError:
+        return 0.0
+
+
+class RequestTimings:
+    """Total duration and call count per phase name for one request (thread-safe)."""
+
+    __slots__ = ("started", "phases", "_lock")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # name -> [seconds, count]
+        self.phases = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.phases.get(name)
+            if entry is None:
+                self.phases[name] = [seconds, 1]
+            else:
+                entry[0] += seconds
+                entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                name: {"ms": round(seconds * 1000, 1), "count": count}
+                for name, (seconds, count) in self.phases.items()
+            }
+
+    def header_value(self) -> str:
+        """Server-Timing header: one metric per phase plus `total`."""
+        with self._lock:
+            items = list(self.phases.items())
+        parts = [
+            '%s;dur=%.1f;desc="%d call%s"' % (name, seconds * 1000, count, "" if count == 1 else "s")
+            for name, (seconds, count) in items
+        ]
+        parts.append("total;dur=%.1f" % (self.elapsed() * 1000))
+        return ", ".join(parts)
+
+
+class _Phase:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.timings.add(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class _NoopPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopPhase()
+
+
+def current_timings():
+    """Collector for the current request, or None when it is not being timed."""
+    return _current.get()
+
+
+def phase(name: str):
+    """Context manager timing the block as phase `name` (no-op when the request is not timed)."""
+    timings = _current.get()
+    if timings is None:
+        return _NOOP
+    return _Phase(timings, name)
+
+
+def record(name: str, seconds: float) -> None:
+    """Add an already-measured duration to phase `name`."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def timed(name: str):
+    """Decorator: time every call of the function as phase `name`."""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            timings = _current.get()
+            if timings is None:
+                return func(*args, **kwargs)
+            with _Phase(timings, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def start_timing():
+    """Start collecting for the current context; returns (collector, token for stop_timing)."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def stop_timing(token) -> None:
+    _current.reset(token)
+
+
+class ServerTimingMiddleware:
+    """
+    Times sampled requests (see module docstring) and reports the phases in the Server-Timing
+    header and a `request_timing` JSON log line. Place first in MIDDLEWARE so `total` covers
+    the whole stack.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = _sample_rate()
+
+    def __call__(self, request):
+        forced = request.headers.get("X-Server-Timing") == "1"
+        if not forced and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return self.get_response(request)
+        timings, token = start_timing()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_timing(token)
+        response["Server-Timing"] = timings.header_value()
+        data = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "total_ms": round(timings.elapsed() * 1000, 1),
+            "phases": timings.as_dict(),
+        }
+        logger.info("request_timing %s", LazyJson(data), extra={"request_timing": data})
+        return response
@@ -4,26 +4,58 @@ URL configuration for config project.
 
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
+from django.utils.module_loading import import_string
 
+from config.metrics import metrics_view
+from config.profiling import profile_download_view, profiles_list_view
 from config.simple_auth import login_view, logout_view
+from config.warmup import warmup_view
 from apollo_ingest.views import (
     company_search_view,
     CompanySearchAPIView,
+    DeepSearchAPIView,
+    LookalikeCrawlAPIView,
     TagsSearchAPIView,
     PeopleSearchAPIView,
+    DomainLookupAPIView,
+    ApolloStatusAPIView,
+    PlanAPIView,
+    SavedSearchChangesAPIView,
+    SavedSearchListAPIView,
     export_companies_view,
 )
 
+
+def lazy_view(dotted_path: str, **initkwargs):
+    """
+    Class-based view imported on its first request instead of at URLconf load, for views whose
+    modules are slow to import and rarely used (keeps them off serverless cold starts).
+    """
+    view = None
+
+    def lazy(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    # APIView.as_view() is csrf_exempt (DRF enforces CSRF itself); the middleware only sees this wrapper
+    lazy.csrf_exempt = True
+    return lazy
+
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     # Auth: login required for entire site
     path("login/", login_view, name="login"),
     path("logout/", logout_view, name="logout"),
+    # Prometheus scrape target (bearer METRICS_TOKEN or super admin session, see config/metrics.py)
+    path("metrics", metrics_view, name="metrics"),
+    # Request profiles (X-Profile: cprofile|sample, see config/profiling.py)
+    path("_profiles/", profiles_list_view, name="profiles"),
+    path("_profiles/<str:profile_id>/", profile_download_view, name="profile_download"),
+    # Serverless warm-up: lazy imports and pooled clients (see config/warmup.py)
+    path("_warmup/", warmup_view, name="warmup"),
     # UI
     path("", company_search_view, name="company_search"),
     path("openai-thinking/", include("openai_thinking.urls")),
@@ -33,15 +65,42 @@ urlpatterns = [
         CompanySearchAPIView.as_view(),
         name="api_company_search",
     ),
+    path(
+        "api/companies/search/deep/",
+        DeepSearchAPIView.as_view(),
+        name="api_company_deep_search",
+    ),
+    path(
+        "api/companies/lookalikes/crawl/",
+        LookalikeCrawlAPIView.as_view(),
+        name="api_company_lookalike_crawl",
+    ),
+    path(
+        "api/companies/lookup-domains/",
+        DomainLookupAPIView.as_view(),
+        name="api_company_domain_lookup",
+    ),
+    path("api/saved-searches/", SavedSearchListAPIView.as_view(), name="api_saved_searches"),
+    path(
+        "api/saved-searches/changes/",
+        SavedSearchChangesAPIView.as_view(),
+        name="api_saved_search_changes",
+    ),
     path("api/tags/search/", TagsSearchAPIView.as_view(), name="api_tags_search"),
     path("api/people/search/", PeopleSearchAPIView.as_view(), name="api_people_search"),
     path("api/export/companies/", export_companies_view, name="api_export_companies"),
-    # Swagger / OpenAPI
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("api/plan/", PlanAPIView.as_view(), name="api_plan"),
+    path("api/apollo/status/", ApolloStatusAPIView.as_view(), name="api_apollo_status"),
+    # Swagger / OpenAPI (drf_spectacular.views imports the schema generator: load on first use)
+    path("api/schema/", lazy_view("drf_spectacular.views.SpectacularAPIView"), name="schema"),
     path(
         "api/docs/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
+        lazy_view("drf_spectacular.views.SpectacularSwaggerView", url_name="schema"),
         name="swagger-ui",
     ),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    path(
+        "api/redoc/",
+        lazy_view("drf_spectacular.views.SpectacularRedocView", url_name="schema"),
+        name="redoc",
+    ),
 ]
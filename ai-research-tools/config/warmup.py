@@ -0,0 +1,99 @@
+"""
+Warm-up endpoint for serverless instances: GET /_warmup/ pays the one-off costs a cold start
+defers (lazy imports, pooled HTTP clients, URL resolver) so the next user request doesn't.
+
+Point a cron / uptime check at it. It needs no login and returns only step names, timings and
+error types. Steps are idempotent; on a warm instance only the Apollo HEAD costs anything.
+
+Anonymous pings only do local work (imports, HTTP session, URL resolver, search form).
+Opening the Apollo connection and building the OpenAI client also need
+`Authorization: Bearer <WARMUP_TOKEN>` or a logged-in super admin session, so anonymous hits
+can't make the instance open outbound connections.
+
+  ?connect=0  skip opening a connection to Apollo (on by default when authorized)
+"""
+
+import hmac
+import logging
+import os
+import time
+
+from django.http import JsonResponse
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+WARMUP_TOKEN = (os.getenv("WARMUP_TOKEN") or "").strip()
+
+
+def _urls():
+    get_resolver().url_patterns
+
+
+def _apollo_http(connect: bool):
+    from apollo_ingest.apollo_service import APOLLO_API_BASE_URL, get_http_session
+
+    session = get_http_session()
+    if connect:
+        # Any response will do: the point is a pooled TCP/TLS connection for the first real call
+        session.head(APOLLO_API_BASE_URL, timeout=5)
+
+
+def _openai(build_client: bool):
+    from openai_thinking.openai_service import get_client
+
+    if build_client and (os.getenv("OPEN_AI_API_KEY") or "").strip():
+        get_client()
+    else:
+        import openai  # noqa: F401  (at least pay for the import)
+
+
+def _export():
+    import openpyxl  # noqa: F401
+
+
+def _search_form():
+    from apollo_ingest.companies_form import CompanySearchForm
+
+    CompanySearchForm()
+
+
+def _authorized(request) -> bool:
+    auth = request.headers.get("Authorization") or ""
+    if WARMUP_TOKEN and auth.startswith("Bearer "):
+        return hmac.compare_digest(auth[len("Bearer "):].strip(), WARMUP_TOKEN)
+    return request.session.get("super_admin") is True
+
+
+def warmup_view(request):
+    """GET /_warmup/: run every warm-up step, report per-step time in ms."""
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+    authorized = _authorized(request)
+    # Anonymous pings get the session and the imports, not the connection or the client
+    connect = authorized and request.GET.get("connect", "1") != "0"
+    steps = (
+        ("urls", _urls),
+        ("apollo_http", lambda: _apollo_http(connect)),
+        ("openai", lambda: _openai(authorized)),
+        ("export", _export),
+        ("search_form", _search_form),
+    )
+    results = {}
+    started = time.perf_counter()
+    for name, func in steps:
+        t0 = time.perf_counter()
+        try:
+            func()
+            results[name] = {"ok": True}
+        except Exception as e:
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            results[name] = {"ok": False, "error": type(e).__name__}
+        results[name]["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return JsonResponse(
+        {
+            "steps": results,
+            "authorized": authorized,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+    )
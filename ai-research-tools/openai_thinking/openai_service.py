@@ -4,19 +4,58 @@ Uses OPEN_AI_API_KEY from environment (.env).
 """
 
 import os
-from openai import OpenAI
+import threading
+import time
+
+from config.metrics import counter, histogram
+from config.timing import phase
 
 
 # GPT-5.2 extended thinking: use "high" or "xhigh" for deeper reasoning
 DEFAULT_REASONING_EFFORT = "high"
 
+OPENAI_REQUESTS = counter(
+    "openai_requests_total", "OpenAI calls by API and outcome (ok / error)", ["api", "model", "outcome"]
+)
+OPENAI_LATENCY = histogram(
+    "openai_request_duration_seconds", "OpenAI call latency", ["api", "model"]
+)
+OPENAI_TOKENS = counter(
+    "openai_tokens_total", "OpenAI tokens used by kind (prompt / completion)", ["model", "kind"]
+)
+
+
+def _record_usage(api: str, model: str, started: float, usage: dict, error) -> None:
+    OPENAI_REQUESTS.inc(api=api, model=model, outcome="error" if error else "ok")
+    OPENAI_LATENCY.observe(time.monotonic() - started, api=api, model=model)
+    if usage:
+        OPENAI_TOKENS.inc(usage.get("prompt_tokens") or 0, model=model, kind="prompt")
+        OPENAI_TOKENS.inc(usage.get("completion_tokens") or 0, model=model, kind="completion")
+
+
+_clients = {}
+_clients_lock = threading.Lock()
 
-def get_client() -> OpenAI:
-    """Build OpenAI client from OPEN_AI_API_KEY in env."""
+
+def get_client():
+    """
+    OpenAI client for OPEN_AI_API_KEY in env, built once per key and reused (its HTTP connection
+    pool stays open). The SDK is imported here, not at module load: it takes ~0.5s to import and
+    only /openai-thinking/ needs it.
+    """
     api_key = os.getenv("OPEN_AI_API_KEY")
     if not api_key or not api_key.strip():
         raise RuntimeError("Missing OPEN_AI_API_KEY in environment (.env)")
-    return OpenAI(api_key=api_key.strip())
+    api_key = api_key.strip()
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                from openai import OpenAI
+
+                client = _clients[api_key] = OpenAI(api_key=api_key)
+    return client
 
 
 def chat_with_thinking(
@@ -30,6 +69,7 @@ def chat_with_thinking(
     Returns dict with keys: reply, reasoning (if any), usage, error.
     """
     result = {"reply": "", "reasoning": "", "usage": None, "error": None}
+    started = time.monotonic()
     try:
         client = get_client()
         kwargs = {
@@ -41,7 +81,8 @@ def chat_with_thinking(
         if reasoning_effort and reasoning_effort != "none":
             kwargs["reasoning_effort"] = reasoning_effort
 
-        response = client.chat.completions.create(**kwargs)
+        with phase("openai"):
+            response = client.chat.completions.create(**kwargs)
         choice = response.choices[0] if response.choices else None
         if not choice:
             result["error"] = "Empty response from model"
@@ -64,6 +105,8 @@ def chat_with_thinking(
     except Exception as e:
         result["error"] = str(e)
         return result
+    finally:
+        _record_usage("chat.completions", model, started, result["usage"], result["error"])
 
 
 def _parse_responses_output(response) -> tuple[str, list[dict]]:
@@ -112,6 +155,7 @@ def chat_with_web_search(
         "usage": None,
         "error": None,
     }
+    started = time.monotonic()
     try:
         client = get_client()
         kwargs = {
@@ -124,7 +168,8 @@ def chat_with_web_search(
         if reasoning_effort and reasoning_effort != "none":
             kwargs["reasoning"] = {"effort": reasoning_effort}
 
-        response = client.responses.create(**kwargs)
+        with phase("openai"):
+            response = client.responses.create(**kwargs)
         result["reply"], result["citations"] = _parse_responses_output(response)
         if not result["reply"]:
             result["error"] = "Empty response from model"
@@ -141,3 +186,5 @@ def chat_with_web_search(
     except Exception as e:
         result["error"] = str(e)
         return result
+    finally:
+        _record_usage("responses", model, started, result["usage"], result["error"])
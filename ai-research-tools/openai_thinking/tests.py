@@ -1,3 +1,122 @@
-from django.test import TestCase
+import os
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import openai_service
+from .openai_service import (
+    OPENAI_REQUESTS,
+    OPENAI_TOKENS,
+    _parse_responses_output,
+    chat_with_thinking,
+    chat_with_web_search,
+    get_client,
+)
+
+
+def fake_client(chat_response=None, responses_response=None):
+    return SimpleNamespace(
+        chat=SimpleNamespace(completions=SimpleNamespace(create=mock.Mock(return_value=chat_response))),
+        responses=SimpleNamespace(create=mock.Mock(return_value=responses_response)),
+    )
+
+
+def metric_value(metric, **labels):
+    return metric._values.get(metric._key(labels), 0)
+
+
+class GetClientTests(SimpleTestCase):
+    def test_missing_key(self):
+        with mock.patch.dict(os.environ, {"OPEN_AI_API_KEY": " "}):
+            with self.assertRaises(RuntimeError):
+                get_client()
+
+    def test_client_reused_per_key(self):
+        client = object()
+        with mock.patch.dict(os.environ, {"OPEN_AI_API_KEY": " test-key "}), mock.patch.dict(
+            openai_service._clients, {"test-key": client}
+        ):
+            self.assertIs(get_client(), client)
+            self.assertIs(get_client(), client)
+
+
+class ChatWithThinkingTests(SimpleTestCase):
+    def test_missing_key_is_reported(self):
+        with mock.patch.dict(os.environ, {"OPEN_AI_API_KEY": ""}):
+            result = chat_with_thinking("hi")
+        self.assertEqual(result["reply"], "")
+        self.assertIn("OPEN_AI_API_KEY", result["error"])
+
+    def test_reply_reasoning_and_usage(self):
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=" Hello ", reasoning_content=" because "))],
+            usage=SimpleNamespace(prompt_tokens=3, completion_tokens=5, total_tokens=8),
+        )
+        client = fake_client(chat_response=response)
+        with mock.patch.object(openai_service, "get_client", return_value=client):
+            result = chat_with_thinking("hi", reasoning_effort="none")
+        self.assertEqual(result["reply"], "Hello")
+        self.assertEqual(result["reasoning"], "because")
+        self.assertEqual(result["usage"], {"prompt_tokens": 3, "completion_tokens": 5, "total_tokens": 8})
+        self.assertIsNone(result["error"])
+        self.assertNotIn("reasoning_effort", client.chat.completions.create.call_args.kwargs)
+
+    def test_empty_response(self):
+        client = fake_client(chat_response=SimpleNamespace(choices=[], usage=None))
+        with mock.patch.object(openai_service, "get_client", return_value=client):
+            result = chat_with_thinking("hi")
+        self.assertEqual(result["error"], "Empty response from model")
+
+
+class ResponsesOutputTests(SimpleTestCase):
+    def test_text_and_citations(self):
+        citation = SimpleNamespace(type="url_citation", url="https://example.com", title="Example", start_index=0, end_index=5)
+        response = SimpleNamespace(
+            output=[
+                SimpleNamespace(type="web_search_call"),
+                SimpleNamespace(
+                    type="message",
+                    content=[
+                        SimpleNamespace(type="output_text", text="First ", annotations=[citation]),
+                        SimpleNamespace(type="output_text", text="second", annotations=[]),
+                    ],
+                ),
+            ]
+        )
+        text, citations = _parse_responses_output(response)
+        self.assertEqual(text, "First \nsecond")
+        self.assertEqual(
+            citations, [{"url": "https://example.com", "title": "Example", "start_index": 0, "end_index": 5}]
+        )
+
+    def test_output_text_fallback(self):
+        self.assertEqual(_parse_responses_output(SimpleNamespace(output=[], output_text=" Plain ")), ("Plain", []))
+
+    def test_web_search_usage(self):
+        response = SimpleNamespace(output=[], output_text="Answer", usage=SimpleNamespace(input_tokens=2, output_tokens=4, total_tokens=6))
+        client = fake_client(responses_response=response)
+        with mock.patch.object(openai_service, "get_client", return_value=client):
+            result = chat_with_web_search("hi")
+        self.assertEqual(result["reply"], "Answer")
+        self.assertEqual(result["usage"], {"prompt_tokens": 2, "completion_tokens": 4, "total_tokens": 6})
+        self.assertEqual(client.responses.create.call_args.kwargs["reasoning"], {"effort": "high"})
+
+
+class UsageMetricsTests(SimpleTestCase):
+    def test_calls_and_tokens_are_counted(self):
+        model = "metrics-test-model"
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Hello", reasoning_content=None))],
+            usage=SimpleNamespace(prompt_tokens=3, completion_tokens=5, total_tokens=8),
+        )
+        with mock.patch.object(openai_service, "get_client", return_value=fake_client(chat_response=response)):
+            chat_with_thinking("hi", model=model)
+            chat_with_thinking("hi", model=model)
+        with mock.patch.object(openai_service, "get_client", return_value=fake_client(chat_response=SimpleNamespace(choices=[], usage=None))):
+            chat_with_thinking("hi", model=model)
+
+        self.assertEqual(metric_value(OPENAI_REQUESTS, api="chat.completions", model=model, outcome="ok"), 2)
+        self.assertEqual(metric_value(OPENAI_REQUESTS, api="chat.completions", model=model, outcome="error"), 1)
+        self.assertEqual(metric_value(OPENAI_TOKENS, model=model, kind="prompt"), 6)
+        self.assertEqual(metric_value(OPENAI_TOKENS, model=model, kind="completion"), 10)
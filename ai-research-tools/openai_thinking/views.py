@@ -2,6 +2,8 @@ from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import ensure_csrf_cookie
 
+from config.timing import phase
+
 from .openai_service import chat_with_thinking, chat_with_web_search
 
 
@@ -47,4 +49,5 @@ def thinking_test_view(request):
                 context["reasoning"] = result.get("reasoning") or ""
             context["usage"] = result.get("usage")
             context["error"] = result.get("error")
-    return render(request, "openai_thinking/thinking_test.html", context)
+    with phase("render"):
+        return render(request, "openai_thinking/thinking_test.html", context)
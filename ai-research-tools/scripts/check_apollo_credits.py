@@ -6,6 +6,7 @@ Reports Apollo credit usage (usage_stats) before/after each phase.
 Usage:
   export APOLLO_API_KEY=your_key
   export API_BASE_URL=http://127.0.0.1:8000   # optional; your Django app
+  export API_TOKEN=ari_...                      # optional; skips the login form (manage.py api_tokens create)
   python scripts/check_apollo_credits.py
 
 Requires: requests (pip install requests)
@@ -24,6 +25,7 @@ except ImportError:
 APOLLO_BASE = "https://api.apollo.io/api/v1"
 APOLLO_KEY = os.environ.get("APOLLO_API_KEY")
 API_BASE = os.environ.get("API_BASE_URL", "http://127.0.0.1:8000").rstrip("/")
+API_TOKEN = os.environ.get("API_TOKEN", "").strip()
 
 
 def apollo_headers():
@@ -80,10 +82,13 @@ def search_companies_apollo(per_page=100, page=1):
 
 
 def login_your_api():
-    """Login to your Django app; returns session with cookies."""
+    """Login to your Django app; returns session with cookies (or with the API token header)."""
     import re
     s = requests.Session()
     s.headers["User-Agent"] = "ApolloCreditsCheck/1.0"
+    if API_TOKEN:
+        s.headers["Authorization"] = f"Bearer {API_TOKEN}"
+        return s
     r0 = s.get(f"{API_BASE}/login/", timeout=10)
     csrf = ""
     if "csrfmiddlewaretoken" in r0.text:
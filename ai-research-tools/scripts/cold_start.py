@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for the Vercel entry point (api/wsgi.py). For each path, starts fresh
+Python processes that import api.wsgi and serve exactly one request through the WSGI `app`,
+and reports import time, time to first response and which heavy modules got loaded.
+
+Usage:
+  python scripts/cold_start.py --runs 5 --output cold.json
+  python scripts/cold_start.py --paths /login/,/api/schema/ --compare cold.json --max-regression 0.2
+  python scripts/cold_start.py --importtime 25        # slowest imports of a /login/ cold start
+
+Paths other than /login/ are requested with a super admin session cookie (created after the
+timed import, outside the measurement), so they reach their views instead of the login redirect.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATHS = ("/login/", "/", "/openai-thinking/", "/api/schema/")
+# Modules that should only load on the paths that need them
+HEAVY_MODULES = (
+    "openpyxl",
+    "openai",
+    "drf_spectacular.views",
+    "drf_spectacular.openapi",
+    "apollo_ingest.companies_form",
+)
+
+# Runs in the child process: one cold start serving one request; prints a JSON line
+_PROBE = r"""
+import io, json, os, sys, time
+t0 = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+from api.wsgi import app
+t1 = time.perf_counter()
+path, heavy = sys.argv[1], sys.argv[2].split(",")
+environ = {
+    "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": "", "SCRIPT_NAME": "",
+    "SERVER_NAME": "localhost", "SERVER_PORT": "80", "HTTP_HOST": "localhost",
+    "SERVER_PROTOCOL": "HTTP/1.1", "wsgi.version": (1, 0), "wsgi.url_scheme": "http",
+    "wsgi.input": io.BytesIO(b""), "wsgi.errors": sys.stderr,
+    "wsgi.multithread": False, "wsgi.multiprocess": True, "wsgi.run_once": False,
+}
+if path != "/login/":
+    from django.conf import settings
+    from django.contrib.sessions.backends.signed_cookies import SessionStore
+    s = SessionStore(); s["super_admin"] = True; s.save()
+    environ["HTTP_COOKIE"] = "%s=%s" % (settings.SESSION_COOKIE_NAME, s.session_key)
+t2 = time.perf_counter()
+status = []
+body = b"".join(app(environ, lambda st, headers, exc_info=None: status.append(st)))
+t3 = time.perf_counter()
+print(json.dumps({
+    "status": int(status[0].split()[0]),
+    "bytes": len(body),
+    "import_ms": (t1 - t0) * 1000,
+    "first_response_ms": (t3 - t2) * 1000,
+    "total_ms": (t1 - t0 + t3 - t2) * 1000,
+    "modules": len(sys.modules),
+    "heavy_loaded": [m for m in heavy if m in sys.modules],
+}))
+"""
+
+
+def _child_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (str(PROJECT_DIR), env.get("PYTHONPATH")) if p)
+    env.setdefault("LOG_LEVEL", "WARNING")
+    return env
+
+
+def probe(path: str) -> dict:
+    """One cold start serving `path`."""
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _PROBE, path, ",".join(HEAVY_MODULES)],
+        cwd=PROJECT_DIR,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if out.returncode != 0:
+        raise RuntimeError("Cold start for %s failed:\n%s" % (path, out.stderr[-2000:]))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_path(path: str, runs: int) -> dict:
+    samples = [probe(path) for _ in range(runs)]
+
+    def stat(key):
+        values = [s[key] for s in samples]
+        return {"median": round(statistics.median(values), 1), "min": round(min(values), 1)}
+
+    return {
+        "path": path,
+        "runs": runs,
+        "status": samples[-1]["status"],
+        "import_ms": stat("import_ms"),
+        "first_response_ms": stat("first_response_ms"),
+        "total_ms": stat("total_ms"),
+        "modules": samples[-1]["modules"],
+        "heavy_loaded": samples[-1]["heavy_loaded"],
+    }
+
+
+def import_profile(path: str, top: int) -> list:
+    """Slowest imports (cumulative) of one cold start, from `python -X importtime`."""
+    out = subprocess.run(
+        [sys.executable, "-W", "ignore", "-X", "importtime", "-c", _PROBE, path, ""],
+        cwd=PROJECT_DIR,
+        env=_child_env(),
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line.split(":", 1)[1].split("|"))
+        rows.append({"module": name, "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    rows.sort(key=lambda r: r["cumulative_ms"], reverse=True)
+    return rows[:top]
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list:
+    """Regressions of current vs baseline: median total_ms up by more than max_regression."""
+    problems = []
+    base_by_path = {r["path"]: r for r in baseline.get("results", [])}
+    for result in current.get("results", []):
+        base = base_by_path.get(result["path"])
+        if not base:
+            continue
+        before, after = base["total_ms"]["median"], result["total_ms"]["median"]
+        if after > before * (1 + max_regression):
+            problems.append("%s total %.0fms -> %.0fms" % (result["path"], before, after))
+    return problems
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start time of api/wsgi.py per path.")
+    parser.add_argument("--paths", default=",".join(DEFAULT_PATHS), help="Comma-separated request paths")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per path")
+    parser.add_argument("--importtime", type=int, metavar="N", default=0, help="Only print the N slowest imports")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+
+    if args.importtime:
+        for row in import_profile(paths[0], args.importtime):
+            print(f"{row['cumulative_ms']:9.1f}ms  {row['self_ms']:8.1f}ms self  {row['module']}")
+        return
+
+    results = []
+    for path in paths:
+        r = run_path(path, args.runs)
+        results.append(r)
+        print(
+            f"{path:20s} status={r['status']} import={r['import_ms']['median']}ms "
+            f"first_response={r['first_response_ms']['median']}ms total={r['total_ms']['median']}ms "
+            f"modules={r['modules']} heavy={','.join(r['heavy_loaded']) or '-'}"
+        )
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_rev": _git_rev(),
+            "python": sys.version.split()[0],
+            "runs": args.runs,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        for result in results:
+            base = next((b for b in baseline.get("results", []) if b["path"] == result["path"]), None)
+            if base:
+                print(
+                    f"{result['path']:20s} total {base['total_ms']['median']}ms -> {result['total_ms']['median']}ms"
+                )
+        problems = compare(report, baseline, args.max_regression)
+        if problems:
+            print("REGRESSIONS:")
+            for p in problems:
+                print("  " + p)
+            sys.exit(1)
+        print("No regressions beyond %.0f%%" % (100 * args.max_regression))
+
+
+if __name__ == "__main__":
+    main()
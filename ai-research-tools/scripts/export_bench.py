@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Export workbook throughput: builds the per-company .xlsx files of a ZIP export in-process and
+with process pools of increasing size (apollo_ingest/workbooks.py), writing them to a ZIP in
+company order like export_companies_view.
+
+Usage:
+  python scripts/export_bench.py                          # 500 companies x 100 people
+  python scripts/export_bench.py --companies 1000 --people 50 --workers 1,2,4,8
+"""
+
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from apollo_ingest.workbooks import WorkbookQueue, _warm_worker, contact_rows  # noqa: E402
+
+
+def fake_people(company: int, n: int) -> list:
+    return [
+        {
+            "name": "Person %s-%s" % (company, i),
+            "email": "person%s.%s@example.com" % (company, i),
+            "linkedin_url": "https://www.linkedin.com/in/person-%s-%s" % (company, i),
+            "title": "VP Engineering",
+            "seniority": "vp",
+            "city": "Toronto",
+            "state": "Ontario",
+            "country": "Canada",
+        }
+        for i in range(n)
+    ]
+
+
+def run(companies: list, pool) -> tuple:
+    """(seconds, zip size) for one export."""
+    t0 = time.perf_counter()
+    buffer = io.BytesIO()
+    queue = WorkbookQueue(pool)
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i, people in enumerate(companies):
+            queue.add("company_%04d.xlsx" % i, contact_rows(people))
+            for filename, data in queue.ready():
+                zf.writestr(filename, data)
+        for filename, data in queue.drain():
+            zf.writestr(filename, data)
+    names = zipfile.ZipFile(buffer).namelist()
+    assert names == sorted(names), "ZIP out of company order"
+    return time.perf_counter() - t0, len(buffer.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--people", type=int, default=100)
+    parser.add_argument("--workers", default="1,2,4", help="Pool sizes to try (comma-separated)")
+    args = parser.parse_args()
+
+    companies = [fake_people(c, args.people) for c in range(args.companies)]
+    print("%s companies x %s people, %s CPUs" % (args.companies, args.people, os.cpu_count()))
+    baseline, size = run(companies, None)
+    print("%-12s %8.2fs %8.1f companies/s  (%.1f MB zip)" % ("in-process", baseline, args.companies / baseline, size / 1e6))
+    for workers in [int(w) for w in args.workers.split(",") if w.strip()]:
+        context = multiprocessing.get_context("forkserver" if sys.platform.startswith("linux") else "spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_warm_worker) as pool:
+            list(pool.map(abs, range(workers * 2)))  # start the workers outside the timing
+            seconds, _ = run(companies, pool)
+        print(
+            "%-12s %8.2fs %8.1f companies/s  x%.2f"
+            % ("%s workers" % workers, seconds, args.companies / seconds, baseline / seconds)
+        )
+
+
+if __name__ == "__main__":
+    main()
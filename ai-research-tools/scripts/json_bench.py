@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+JSON codec benchmark for the API (config/renderers.py): DRF's stdlib JSONRenderer/JSONParser
+vs FastJSONRenderer/FastJSONParser on realistic payloads built from the fake Apollo data.
+
+Payloads:
+  company_search  100 normalized companies (POST /api/companies/search/ response)
+  people_search   100 enriched people (POST /api/people/search/ response)
+  tags_search     industry tags (GET /api/tags/search/ response)
+  export_body     100 companies with 100 people each (POST /api/export/companies/ body)
+
+Usage:
+  python scripts/json_bench.py
+  python scripts/json_bench.py --iterations 50 --output json_bench.json
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+
+def build_payloads() -> dict:
+    from apollo_ingest.fake_apollo import company_search_response, fake_match, tags_search_response
+    from apollo_ingest.normalizers import COMPANY, PERSON
+
+    companies = COMPANY.many("dict")(company_search_response({"per_page": 100})["organizations"])
+
+    def people(org_index, n):
+        return PERSON.many("dict")([fake_match("bench-%s-%s" % (org_index, i), True) for i in range(n)])
+
+    return {
+        "company_search": {"companies": companies, "total_count": 2500, "page": 1, "per_page": 100},
+        "people_search": {"people": people(0, 100), "total_count": 100, "page": 1, "per_page": 100},
+        "tags_search": {"tags": tags_search_response({})["tags"]},
+        "export_body": {
+            "companies": [dict(c, people=people(i, 100)) for i, c in enumerate(companies)],
+            "job_titles": ["CEO", "CTO", "VP Engineering"],
+            "seniorities": ["c_suite", "vp"],
+        },
+    }
+
+
+def best_ms(fn, iterations: int) -> float:
+    """Fastest of `iterations` runs, in ms (least disturbed by GC and other processes)."""
+    best = float("inf")
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    import django
+
+    django.setup()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+
+    from config import renderers
+
+    if renderers.orjson is None:
+        print("orjson is not installed: FastJSON* fall back to the stdlib, expect no difference")
+    codecs = {
+        "stdlib": (JSONRenderer(), JSONParser()),
+        "fast": (renderers.FastJSONRenderer(), renderers.FastJSONParser()),
+    }
+    results = []
+    print("%-15s %9s %12s %12s %8s %12s %12s %8s" % (
+        "payload", "KB", "render std", "render fast", "x", "parse std", "parse fast", "x"))
+    for name, payload in build_payloads().items():
+        raw = JSONRenderer().render(payload)
+        row = {"payload": name, "bytes": len(raw)}
+        for codec, (renderer, json_parser) in codecs.items():
+            row["render_%s_ms" % codec] = best_ms(lambda: renderer.render(payload), args.iterations)
+            row["parse_%s_ms" % codec] = best_ms(lambda: json_parser.parse(io.BytesIO(raw)), args.iterations)
+        assert json.loads(codecs["fast"][0].render(payload)) == json.loads(raw), name
+        row["render_speedup"] = row["render_stdlib_ms"] / row["render_fast_ms"]
+        row["parse_speedup"] = row["parse_stdlib_ms"] / row["parse_fast_ms"]
+        results.append(row)
+        print("%-15s %9.1f %10.2fms %10.2fms %7.1fx %10.2fms %10.2fms %7.1fx" % (
+            name, row["bytes"] / 1024,
+            row["render_stdlib_ms"], row["render_fast_ms"], row["render_speedup"],
+            row["parse_stdlib_ms"], row["parse_fast_ms"], row["parse_speedup"],
+        ))
+    if args.output:
+        Path(args.output).write_text(json.dumps({"iterations": args.iterations, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Load test for the Django API endpoints: /api/companies/search/, /api/people/search/ and
+/api/export/companies/. Logs in like check_apollo_credits.login_your_api (one session per
+worker thread), drives each endpoint at the given concurrency levels and reports requests/s,
+p50/p95/p99 latency, error rate and peak server RSS per endpoint. Results are saved as JSON
+so runs can be compared.
+
+Usage (self-contained: starts the fake Apollo server and a Django server against it):
+  python scripts/load_test.py --spawn --concurrency 1,4,16 --requests 200 --output run.json
+
+Against a server you started yourself (pointed at `manage.py fake_apollo`):
+  python scripts/load_test.py --base-url http://127.0.0.1:8000 --server-pid <pid>
+
+Compare with an earlier run (exit code 1 on regression):
+  python scripts/load_test.py --spawn --output new.json --compare run.json --max-regression 0.2
+
+Requires: requests (pip install requests)
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+try:
+    import requests
+except ImportError:
+    print("Install: pip install requests")
+    sys.exit(1)
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+ENDPOINTS = ("companies", "people", "export")
+ADMIN_EMAIL = "admin@skyapollo.com"
+ADMIN_PASSWORD = "skyapollo@admin123"
+
+
+def login(base_url: str) -> requests.Session:
+    """Same flow as check_apollo_credits.login_your_api: GET /login/, scrape CSRF, POST credentials."""
+    s = requests.Session()
+    s.headers["User-Agent"] = "ApolloLoadTest/1.0"
+    r0 = s.get(f"{base_url}/login/", timeout=10)
+    csrf = ""
+    if "csrfmiddlewaretoken" in r0.text:
+        m = re.search(r'name="csrfmiddlewaretoken"\s+value="([^"]+)"', r0.text)
+        if m:
+            csrf = m.group(1)
+    if not csrf and "csrftoken" in s.cookies:
+        csrf = s.cookies.get("csrftoken", "")
+    s.post(
+        f"{base_url}/login/",
+        data={
+            "username": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD,
+            "csrfmiddlewaretoken": csrf,
+        },
+        allow_redirects=True,
+        timeout=10,
+    )
+    return s
+
+
+def _json_headers(session: requests.Session) -> dict:
+    return {
+        "Content-Type": "application/json",
+        "X-CSRFToken": session.cookies.get("csrftoken", ""),
+    }
+
+
+def make_request(endpoint: str, session: requests.Session, base_url: str, i: int, org_ids: list, export_size: int):
+    """Issue one request for `endpoint`; returns the response."""
+    if endpoint == "companies":
+        return session.post(
+            f"{base_url}/api/companies/search/",
+            json={"page": 1 + i % 20, "per_page": 25},
+            headers=_json_headers(session),
+            timeout=120,
+        )
+    if endpoint == "people":
+        return session.post(
+            f"{base_url}/api/people/search/",
+            json={"organization_id": org_ids[i % len(org_ids)], "per_page": 25},
+            headers=_json_headers(session),
+            timeout=120,
+        )
+    start = (i * export_size) % len(org_ids)
+    companies = [
+        {"id": oid, "name": "Company %s" % oid[:6]}
+        for oid in (org_ids[start:] + org_ids[:start])[:export_size]
+    ]
+    return session.post(
+        f"{base_url}/api/export/companies/",
+        json={"companies": companies, "job_titles": [], "seniorities": []},
+        headers=_json_headers(session),
+        timeout=300,
+    )
+
+
+def read_rss_kb(pid: int):
+    """Resident set size of `pid` in KiB (Linux /proc, or psutil if installed)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        import psutil
+
+        return psutil.Process(pid).memory_info().rss // 1024
+    except Exception:
+        return None
+
+
+class RssSampler(threading.Thread):
+    """Samples a process's RSS every `interval` seconds and keeps the peak."""
+
+    def __init__(self, pid, interval: float = 0.05):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_kb = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            kb = read_rss_kb(self.pid)
+            if kb is not None and (self.peak_kb is None or kb > self.peak_kb):
+                self.peak_kb = kb
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def percentile(sorted_values: list, p: float):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * p
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def run_level(endpoint, base_url, concurrency, total_requests, org_ids, export_size, server_pid):
+    """Run `total_requests` requests with `concurrency` workers; returns a stats dict."""
+    sessions = [login(base_url) for _ in range(concurrency)]
+    latencies = []
+    errors = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(total_requests))
+
+    def worker(session):
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                return
+            t0 = time.perf_counter()
+            try:
+                r = make_request(endpoint, session, base_url, i, org_ids, export_size)
+                code = r.status_code
+                r.content  # read the full body
+                ok = 200 <= code < 300
+            except Exception as e:
+                code = type(e).__name__
+                ok = False
+            elapsed = time.perf_counter() - t0
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(code)] = statuses.get(str(code), 0) + 1
+                if not ok:
+                    errors.append(code)
+
+    sampler = RssSampler(server_pid) if server_pid else None
+    if sampler:
+        sampler.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(s,)) for s in sessions]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    if sampler:
+        sampler.stop()
+    lat = sorted(latencies)
+
+    def ms(v):
+        return round(v * 1000, 1) if v is not None else None
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(lat),
+        "duration_s": round(wall, 3),
+        "rps": round(len(lat) / wall, 2) if wall else None,
+        "p50_ms": ms(percentile(lat, 0.50)),
+        "p95_ms": ms(percentile(lat, 0.95)),
+        "p99_ms": ms(percentile(lat, 0.99)),
+        "max_ms": ms(lat[-1] if lat else None),
+        "error_rate": round(len(errors) / len(lat), 4) if lat else None,
+        "statuses": statuses,
+        "peak_rss_mb": round(sampler.peak_kb / 1024, 1) if sampler and sampler.peak_kb else None,
+    }
+
+
+def fetch_org_ids(base_url: str, count: int = 100) -> list:
+    """Organization ids for people/export requests, from one company search."""
+    s = login(base_url)
+    r = s.post(
+        f"{base_url}/api/companies/search/",
+        json={"page": 1, "per_page": min(100, count)},
+        headers=_json_headers(s),
+        timeout=120,
+    )
+    r.raise_for_status()
+    ids = [c["id"] for c in r.json().get("companies", []) if c.get("id")]
+    if not ids:
+        raise RuntimeError("Company search returned no companies; is the Apollo stand-in running?")
+    return ids
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Nothing listening on port %s after %ss" % (port, timeout))
+
+
+def spawn_stack(args):
+    """Start `manage.py fake_apollo` and `manage.py runserver` wired to it. Returns (base_url, server_proc, procs)."""
+    apollo_port = _free_port()
+    web_port = _free_port()
+    env = dict(os.environ)
+    apollo_base = "http://127.0.0.1:%s/api/v1" % apollo_port
+    env.update(
+        {
+            "APOLLO_API_BASE_URL": apollo_base,
+            "APOLLO_APP_BASE_URL": apollo_base,
+            "APOLLO_API_KEYS": env.get("LOADTEST_APOLLO_KEYS", "loadtest-key-0001"),
+            # The stand-in has no rate limit unless asked; don't let the client-side key budget throttle the run
+            "APOLLO_KEY_MINUTE_LIMIT": env.get("APOLLO_KEY_MINUTE_LIMIT", "1000000"),
+            "APOLLO_KEY_DAILY_LIMIT": env.get("APOLLO_KEY_DAILY_LIMIT", "100000000"),
+            "PYTHONUNBUFFERED": "1",
+        }
+    )
+    env.pop("APOLLO_RECORD_DIR", None)
+    fake = subprocess.Popen(
+        [
+            sys.executable, "manage.py", "fake_apollo",
+            "--port", str(apollo_port),
+            "--latency-ms", str(args.apollo_latency_ms),
+            "--jitter-ms", str(args.apollo_jitter_ms),
+            "--error-rate", str(args.apollo_error_rate),
+        ],
+        cwd=PROJECT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    web = subprocess.Popen(
+        [sys.executable, "manage.py", "runserver", "127.0.0.1:%s" % web_port, "--noreload"],
+        cwd=PROJECT_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    _wait_for_port(apollo_port)
+    _wait_for_port(web_port)
+    return "http://127.0.0.1:%s" % web_port, web, [web, fake]
+
+
+def compare(current: dict, baseline: dict, max_regression: float) -> list:
+    """Regressions of current vs baseline: p95 up or rps down by more than max_regression."""
+    problems = []
+    for endpoint, levels in current.get("results", {}).items():
+        base_levels = {str(l["concurrency"]): l for l in baseline.get("results", {}).get(endpoint, [])}
+        for level in levels:
+            base = base_levels.get(str(level["concurrency"]))
+            if not base:
+                continue
+            if base.get("p95_ms") and level.get("p95_ms") and level["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+                problems.append(
+                    "%s c=%s p95 %.1fms -> %.1fms" % (endpoint, level["concurrency"], base["p95_ms"], level["p95_ms"])
+                )
+            if base.get("rps") and level.get("rps") and level["rps"] < base["rps"] * (1 - max_regression):
+                problems.append(
+                    "%s c=%s rps %.2f -> %.2f" % (endpoint, level["concurrency"], base["rps"], level["rps"])
+                )
+            if (level.get("error_rate") or 0) > (base.get("error_rate") or 0) + 0.01:
+                problems.append(
+                    "%s c=%s error rate %.2f%% -> %.2f%%"
+                    % (endpoint, level["concurrency"], 100 * (base.get("error_rate") or 0), 100 * level["error_rate"])
+                )
+    return problems
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Apollo search/export API endpoints.")
+    parser.add_argument("--base-url", default=os.environ.get("API_BASE_URL", "http://127.0.0.1:8000"))
+    parser.add_argument("--spawn", action="store_true", help="Start fake Apollo + Django server for the run")
+    parser.add_argument("--server-pid", type=int, default=None, help="PID of the Django server, for peak RSS")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="Comma-separated: companies,people,export")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per endpoint per concurrency level")
+    parser.add_argument("--export-requests", type=int, default=10, help="Requests per level for the export endpoint")
+    parser.add_argument("--export-size", type=int, default=5, help="Companies per export request")
+    parser.add_argument("--apollo-latency-ms", type=float, default=150.0, help="--spawn: fake Apollo latency")
+    parser.add_argument("--apollo-jitter-ms", type=float, default=50.0, help="--spawn: fake Apollo jitter")
+    parser.add_argument("--apollo-error-rate", type=float, default=0.0, help="--spawn: fake Apollo 5xx rate")
+    parser.add_argument("--output", default=None, help="Write results JSON here")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error("Unknown endpoint(s): %s" % ", ".join(sorted(unknown)))
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    procs = []
+    base_url = args.base_url.rstrip("/")
+    server_pid = args.server_pid
+    try:
+        if args.spawn:
+            base_url, web, procs = spawn_stack(args)
+            server_pid = web.pid
+            print(f"Spawned Django at {base_url} (pid {server_pid}) against fake Apollo")
+        org_ids = fetch_org_ids(base_url)
+        results = {}
+        for endpoint in endpoints:
+            results[endpoint] = []
+            n = args.export_requests if endpoint == "export" else args.requests
+            for c in levels:
+                stats = run_level(endpoint, base_url, c, n, org_ids, args.export_size, server_pid)
+                results[endpoint].append(stats)
+                print(
+                    f"{endpoint:10s} c={c:<3d} n={stats['requests']:<5d} rps={stats['rps']:<8} "
+                    f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms "
+                    f"err={stats['error_rate']} rss={stats['peak_rss_mb']}MB"
+                )
+    finally:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_rev": _git_rev(),
+            "base_url": base_url,
+            "spawned": args.spawn,
+            "concurrency": levels,
+            "requests": args.requests,
+            "export_requests": args.export_requests,
+            "export_size": args.export_size,
+            "apollo_latency_ms": args.apollo_latency_ms if args.spawn else None,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, args.max_regression)
+        if problems:
+            print("Regressions vs %s:" % args.compare)
+            for p in problems:
+                print("  " + p)
+            sys.exit(1)
+        print("No regressions vs %s" % args.compare)
+
+
+if __name__ == "__main__":
+    main()
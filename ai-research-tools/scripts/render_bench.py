@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Render benchmark for the company search page (company_search_view's template): time per
+render with the pre-rendered choice widgets (companies_form.PrerenderedSelectMultiple) vs
+Django's plain SelectMultiple, for an empty form and one with selected industries / titles.
+Checks that both produce the same HTML.
+
+Usage:
+  python scripts/render_bench.py
+  python scripts/render_bench.py --iterations 200
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+
+def best_ms(fn, iterations: int) -> float:
+    best = float("inf")
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    import django
+
+    django.setup()
+    from django import forms
+    from django.template.loader import get_template
+    from django.test import RequestFactory
+
+    from apollo_ingest.companies_form import (
+        INDUSTRIES_LIST,
+        JOB_TITLE_CHOICES,
+        SENIORITY_CHOICES,
+        CompanySearchForm,
+        PrerenderedSelectMultiple,
+    )
+
+    template = get_template("apollo_ingest/company_search.html")
+    request = RequestFactory().get("/")
+    selected = {
+        "industries": [INDUSTRIES_LIST[3][0], INDUSTRIES_LIST[40][0]],
+        "industries_exclude": [INDUSTRIES_LIST[7][0]],
+        "job_titles": [JOB_TITLE_CHOICES[0][0], JOB_TITLE_CHOICES[-1][0]],
+        "seniorities": [SENIORITY_CHOICES[1][0]],
+        "per_page": "25",
+    }
+
+    def make_form(data, plain: bool):
+        form = CompanySearchForm(data) if data is not None else CompanySearchForm()
+        if plain:
+            for field in form.fields.values():
+                if isinstance(field.widget, PrerenderedSelectMultiple):
+                    field.widget = forms.SelectMultiple(attrs=field.widget.attrs)
+                    field.widget.choices = field.choices
+        if data is not None:
+            form.is_valid()
+        return form
+
+    def page(data, plain: bool) -> str:
+        form = make_form(data, plain)
+        return template.render({"form": form, "companies": None, "total_count": 0, "error": None}, request)
+
+    print("%-10s %12s %14s %8s" % ("form", "plain", "pre-rendered", "x"))
+    for label, data in (("empty", None), ("selected", selected)):
+        # The CSRF token differs per render
+        a, b = (re.sub(r'name="csrfmiddlewaretoken" value="[^"]*"', "", page(data, plain)) for plain in (True, False))
+        assert a == b, "pre-rendered widgets differ from SelectMultiple (%s)" % label
+        plain = best_ms(lambda: page(data, True), args.iterations)
+        cached = best_ms(lambda: page(data, False), args.iterations)
+        print("%-10s %10.2fms %12.2fms %7.1fx" % (label, plain, cached, plain / cached))
+
+
+if __name__ == "__main__":
+    main()